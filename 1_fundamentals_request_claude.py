@@ -1,5 +1,6 @@
 from langchain_anthropic import ChatAnthropic
 import tools
+import rate_limiter
 
 MODEL = "claude-sonnet-4-5-20250929"
 chat_model = ChatAnthropic(
@@ -7,6 +8,8 @@ chat_model = ChatAnthropic(
     temperature=0.3,        
     verbose=True, # set to False for production
 )
+# share the provider's rate limits (RPM / TPM) with all other clients of this model in the process
+chat_model = rate_limiter.enable(chat_model)
 
 response = chat_model.invoke("What is LangChain? Please in max 1 sentences.")
 
@@ -18,5 +21,7 @@ print("\n---- JSON Output ----")
 print(tools.prettyfy_json(response))
 
 print("\n---- Token Usage ----")
-tools.print_token_usage(response)     
+tools.print_token_usage(response)
 
+print("---- Rate Limiter ----")
+print(rate_limiter.stats())
@@ -1,5 +1,6 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 import tools
+import rate_limiter
 
 # list of models: https://ai.google.dev/gemini-api/docs/models
 
@@ -9,6 +10,8 @@ chat_model = ChatGoogleGenerativeAI(
     temperature=0.3,        
     verbose=True, # set to False for production
 )
+# share the provider's rate limits (RPM / TPM) with all other clients of this model in the process
+chat_model = rate_limiter.enable(chat_model)
 
 response = chat_model.invoke("What is LangChain? Please in max 1 sentences.")
 
@@ -20,5 +23,7 @@ print("\n---- JSON Output ----")
 print(tools.prettyfy_json(response))
 
 print("\n---- Token Usage ----")
-tools.print_token_usage(response)    
+tools.print_token_usage(response)
 
+print("---- Rate Limiter ----")
+print(rate_limiter.stats())
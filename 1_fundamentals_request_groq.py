@@ -3,6 +3,7 @@ from langchain_groq import ChatGroq
 from dotenv import load_dotenv, find_dotenv
 load_dotenv(find_dotenv())
 import tools
+import rate_limiter
 
 if os.getenv("GROQ_API_KEY") is None:
     raise ValueError("GROQ_API_KEY not set")
@@ -16,6 +17,8 @@ chat_model = ChatGroq(
     temperature=0.3,        
     verbose=True, # set to False for production
 )
+# share the provider's rate limits (RPM / TPM) with all other clients of this model in the process
+chat_model = rate_limiter.enable(chat_model)
 
 response = chat_model.invoke("What is LangChain? Please in max 1 sentences.")
 
@@ -27,5 +30,7 @@ print("\n---- JSON Output ----")
 print(tools.prettyfy_json(response))
 
 print("\n---- Token Usage ----")
-tools.print_token_usage(response)   
+tools.print_token_usage(response)
 
+print("---- Rate Limiter ----")
+print(rate_limiter.stats())
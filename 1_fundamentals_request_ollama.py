@@ -1,8 +1,11 @@
 from langchain_ollama import ChatOllama
 import tools
+import rate_limiter
 
 MODEL = "llama3.1"
 chat_model = ChatOllama(model=MODEL)
+# share the provider's rate limits (RPM / TPM) with all other clients of this model in the process
+chat_model = rate_limiter.enable(chat_model)
 
 response = chat_model.invoke(input = "What is LangChain? Please in max 1 sentences.")
 
@@ -14,4 +17,7 @@ print("\n---- JSON Output ----")
 print(tools.prettyfy_json(response))
 
 print("\n---- Token Usage ----")
-tools.print_token_usage(response)   
\ No newline at end of file
+tools.print_token_usage(response)
+
+print("---- Rate Limiter ----")
+print(rate_limiter.stats())
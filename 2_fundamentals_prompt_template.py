@@ -1,12 +1,13 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+import model_registry
+import response_cache
 
 MODEL = "gpt-4o-mini"
-chat_model = ChatOpenAI(
-    model_name=MODEL,     
-    temperature=0.3,        
-    verbose=True,  
-)
+# langchain_openai is imported on first use (e.g. not when a batch job only loads another module)
+chat_model = model_registry.get_chat_model("openai", MODEL, temperature=0.3, verbose=True)
+# answer repeated prompts from the local response cache
+# (temperature 0.3 samples, so cached answers have to be allowed explicitly)
+chat_model = response_cache.enable(chat_model, allow_sampling=True)
 
 template = "Give me a brief summary about the color {color}."
 
@@ -15,8 +16,13 @@ prompt = ChatPromptTemplate.from_template(template)
 chain = prompt | chat_model
 print(f'Type of Chain: {type(chain)}')
 
-response_red = chain.invoke({"color":"red"})
-print(response_red.content)
+# for many inputs, run the chain with the batch runner instead (the chain is imported from here):
+#   python batch_runner.py 2_fundamentals_prompt_template:chain colors.jsonl colors_summaries.jsonl --concurrency 16
+# colors.jsonl has one line per input, e.g. {"color": "red"}
 
-response_blue = chain.invoke({"color":"blue"})
-print(response_blue.content)
+if __name__ == "__main__":
+    response_red = chain.invoke({"color":"red"})
+    print(response_red.content)
+
+    response_blue = chain.invoke({"color":"blue"})
+    print(response_blue.content)
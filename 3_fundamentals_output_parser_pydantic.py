@@ -1,10 +1,11 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
+import model_registry
+import response_cache
+from streaming_parser import StreamingListParser, ItemError
+import structured_output
 
-from dotenv import load_dotenv, find_dotenv
-load_dotenv(find_dotenv())
     
 
 # define output schema
@@ -22,14 +23,26 @@ class LibrariesOutput(BaseModel):
 
 def print_result(result: LibrariesOutput) -> None:
     print(result)
-    libraries = result.model_dump()["libraries"]
-    for library in libraries:
-        print(f"Name: {library['name']}")
-        print(f"Provider: {library['provider']}")
-        print(f"Language: {library['language']}")
-        print(f"Version: {library['version']}")
-        print(f"Url: {library['url']}")
-        print("- "*30)
+    for library in result.libraries:
+        print_library(library)
+
+
+def print_library(library: LibraryOutput) -> None:
+    print(f"Name: {library.name}")
+    print(f"Provider: {library.provider}")
+    print(f"Language: {library.language}")
+    print(f"Version: {library.version}")
+    print(f"Url: {library.url}")
+    print("- "*30)
+
+
+# "prompt": JSON schema in the prompt (format instructions) and PydanticOutputParser
+# "native": structured output mode of the provider (tool calling / JSON schema), see structured_output.py
+STRUCTURED_OUTPUT = "prompt"
+
+# print each library as soon as the model has generated it (instead of waiting for the whole list)
+# (prompt mode only, the native structured output returns the complete object)
+STREAM_LIBRARIES = True
 
 # define prompt template with format instructions (to be filled in by the parser)
 messages = [
@@ -43,16 +56,39 @@ parser = PydanticOutputParser(pydantic_object=LibrariesOutput)
 prompt_template = ChatPromptTemplate.from_messages(messages=messages).partial(format_instructions=parser.get_format_instructions())
 
 MODEL_NAME = "openai/gpt-oss-120b"
-model = ChatGroq(model=MODEL_NAME)
+# langchain_groq is imported here, on first use (and the .env file with the API key is loaded)
+model = model_registry.get_chat_model("groq", MODEL_NAME)
+# answer repeated prompts from the local response cache
+# (no temperature set means the provider default, which samples, so cached answers have to be allowed explicitly)
+model = response_cache.enable(model, allow_sampling=True)
 
 # define the chain
-chain = prompt_template | model | parser
+if STRUCTURED_OUTPUT == "native":
+    # the schema is sent through the provider's structured output support instead of the prompt
+    chain = structured_output.create_chain(ChatPromptTemplate.from_messages(messages=messages), model, LibrariesOutput, mode="native")
+else:
+    chain = prompt_template | model | parser
 
 inputs = {
     "programming_language": "Python",
     "library_count": 5
 }
-result: LibrariesOutput = chain.invoke(input=inputs)
+if STREAM_LIBRARIES and STRUCTURED_OUTPUT == "prompt":
+    # every library is validated on its own and printed while the rest is still generated
+    streaming_parser = StreamingListParser(pydantic_object=LibrariesOutput)
+    streaming_chain = prompt_template | model | streaming_parser
+
+    print("\n---- Streamed Output ----")
+    items = []
+    for item in streaming_chain.stream(input=inputs):
+        if isinstance(item, ItemError):
+            print(f"Skipped {item}")
+        else:
+            print_library(item)
+        items.append(item)
+    result: LibrariesOutput = streaming_parser.to_model(items)
+else:
+    result: LibrariesOutput = chain.invoke(input=inputs)
 
 
 print("\n---Format Instructions ---: ")
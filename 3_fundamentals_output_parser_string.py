@@ -1,5 +1,6 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+import response_cache
 from langchain_core.output_parsers import StrOutputParser
 
 MODEL = "gpt-4o-mini"
@@ -8,6 +9,9 @@ chat_model = ChatOpenAI(
     temperature=0.3,        
     verbose=True,    
 )
+# answer repeated prompts from the local response cache
+# (temperature 0.3 samples, so cached answers have to be allowed explicitly)
+chat_model = response_cache.enable(chat_model, allow_sampling=True)
 
 template = "Give me the first {number} prime numbers."
 
@@ -1,16 +1,20 @@
+import time
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.runnables import RunnableParallel
 from langchain_core.output_parsers import StrOutputParser
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 import tools
+import model_registry
+import response_cache
+import rate_limiter
+import prompt_caching
+import structured_output
+import consolidation
+import metrics
+from hedging import HedgedRunnable
+from streaming_parser import StreamingListParser, ItemError
 
-# optional: load environment variables from a .env file
-from dotenv import load_dotenv, find_dotenv
-load_dotenv(find_dotenv())
     
 # ask 3 different LLMs for their favorite libraries for accessing LLMs
 # and then consolidate the responses into a single md table
@@ -34,20 +38,40 @@ def to_string(llm_name: str, result: LibrariesOutput) -> str:
     output_lines.append(f"Results from {llm_name}:")
     output_lines.append("-" * 60)
 
-    libraries = result.model_dump()["libraries"]
-    for library in libraries:
-        output_lines.append(f"Name: {library['name']}")
-        output_lines.append(f"Provider: {library['provider']}")
-        output_lines.append(f"Language: {library['language']}")
-        output_lines.append(f"Version: {library['version']}")
-        output_lines.append(f"Url: {library['url']}")
-        output_lines.append("- " * 30)
+    for library in result.libraries:
+        output_lines.append(library_to_string(library))
     
     return "\n".join(output_lines)        
 
+
+def library_to_string(library: LibraryOutput) -> str:
+    output_lines = []
+    output_lines.append(f"Name: {library.name}")
+    output_lines.append(f"Provider: {library.provider}")
+    output_lines.append(f"Language: {library.language}")
+    output_lines.append(f"Version: {library.version}")
+    output_lines.append(f"Url: {library.url}")
+    output_lines.append("- " * 30)
+    return "\n".join(output_lines)
+
 PROGRAMMING_LANGUAGE = "Python"
 NUMBER_OF_LIBRARIES = 5
 
+# "prompt": JSON schema in the prompt (format instructions) and PydanticOutputParser
+# "native": structured output mode of each provider (tool calling / JSON schema), see structured_output.py
+STRUCTURED_OUTPUT = "prompt"
+
+# print each library as soon as one of the LLMs has generated it (instead of waiting for all answers)
+# (prompt mode only, the native structured output returns the complete object)
+STREAM_LIBRARIES = True
+
+# "local": build the comparison table directly from the answers (see consolidation.py)
+# "llm": send all answers to Claude and let it build the table (one more sequential request)
+CONSOLIDATION = "local"
+
+# optional: also ask for a single answer with hedged requests (see step 3)
+RUN_HEDGED_REQUEST = False
+
 # define prompt template with format instructions (to be filled in by the parser)
 messages = [
     ("system", "What are the most popular programming libraries for accessing LLMs?  Please use the following schema {format_instructions}"),
@@ -59,33 +83,43 @@ parser = PydanticOutputParser(pydantic_object=LibrariesOutput)
 
 prompt_template = ChatPromptTemplate.from_messages(messages=messages).partial(format_instructions=parser.get_format_instructions())
 
+# the provider SDKs are imported when the first client of a provider is created
+# (and a .env file with the API keys is loaded once), see model_registry.py
 MODEL_CLAUDE = "claude-sonnet-4-5-20250929"
-llm_claude = ChatAnthropic(
-    model_name=MODEL_CLAUDE,     
-    temperature=0.3,        
-    verbose=True 
-)
+llm_claude = model_registry.get_chat_model("anthropic", MODEL_CLAUDE, temperature=0.3, verbose=True)
 
 MODEL_OPENAI = "gpt-4o-mini"
-llm_openai = ChatOpenAI(
-    model_name=MODEL_OPENAI,     
-    temperature=0.3,        
-    verbose=True
-)
+llm_openai = model_registry.get_chat_model("openai", MODEL_OPENAI, temperature=0.3, verbose=True)
 
 MODEL_GOOGLE = "gemini-2.5-flash-lite"
-chat_model = ChatGoogleGenerativeAI(
-    model=MODEL_GOOGLE,  
-    temperature=0.3,        
-    verbose=True
-)
+chat_model = model_registry.get_chat_model("google", MODEL_GOOGLE, temperature=0.3, verbose=True)
+
+# answer repeated prompts from the local response cache
+# (temperature 0.3 samples, so cached answers have to be allowed explicitly)
+# and keep the parallel branches within the rate limits of each provider (cache hits don't count)
+# (enable() returns copies, the shared clients of model_registry stay unchanged)
+llm_claude, llm_openai, chat_model = (rate_limiter.enable(response_cache.enable(llm, allow_sampling=True))
+                                      for llm in (llm_claude, llm_openai, chat_model))
+
+# the system message (with the JSON schema of the format instructions) is the same in every request:
+# mark it for provider-side prompt caching (explicit breakpoint for claude, automatic for the others)
+claude_llm, openai_llm, google_llm = (prompt_caching.with_prompt_caching(llm) for llm in (llm_claude, llm_openai, chat_model))
 
 # 1 - create requests for each LLM
 
 # define the chains for each LLM
-claude_chain = prompt_template | llm_claude | parser
-openai_chain = prompt_template | llm_openai | parser
-google_chain = prompt_template | chat_model | parser
+if STRUCTURED_OUTPUT == "native":
+    # the schema is sent through the provider's structured output support instead of the prompt
+    # (a model without native support falls back to the format instructions)
+    claude_chain, openai_chain, google_chain = (
+        structured_output.create_chain(ChatPromptTemplate.from_messages(messages=messages), llm, LibrariesOutput,
+                                       mode="native", wrap_model=prompt_caching.with_prompt_caching)
+        for llm in (llm_claude, llm_openai, chat_model)
+    )
+else:
+    claude_chain = prompt_template | claude_llm | parser
+    openai_chain = prompt_template | openai_llm | parser
+    google_chain = prompt_template | google_llm | parser
 
 # define the parallel chain with named branches claude, openai, and google (which will be the keys in the output dict)
 map_chain = RunnableParallel(
@@ -93,20 +127,47 @@ map_chain = RunnableParallel(
     openai=openai_chain,
     google=google_chain
 )
+# latency, time to first token, tokens and cost of every request, per branch (see metrics.py)
+map_chain = metrics.attach(map_chain)
 
 inputs = {
     "programming_language": PROGRAMMING_LANGUAGE,
     "library_count": NUMBER_OF_LIBRARIES
 }
-result: dict[str, LibrariesOutput] = map_chain.invoke(input=inputs)
-
-result_as_string = ""
-for llm_name, llm_result in result.items():
-    # print(to_string(llm_name, llm_result))
-    result_as_string += to_string(llm_name, llm_result) + "\n"
-
-
-# 2 - consolidate responses into a single table (making a single request to Claude)
+start = time.perf_counter()
+if STREAM_LIBRARIES and STRUCTURED_OUTPUT == "prompt":
+    # same chains with a streaming parser: every library is validated on its own
+    # and the stream of the parallel chain yields {llm_name: library} as soon as one is complete
+    streaming_parser = StreamingListParser(pydantic_object=LibrariesOutput)
+    streaming_map_chain = RunnableParallel(
+        claude=prompt_template | claude_llm | streaming_parser,
+        openai=prompt_template | openai_llm | streaming_parser,
+        google=prompt_template | google_llm | streaming_parser
+    )
+    streaming_map_chain = metrics.attach(streaming_map_chain)
+
+    items: dict[str, list] = {"claude": [], "openai": [], "google": []}
+    for chunk in streaming_map_chain.stream(input=inputs):
+        for llm_name, item in chunk.items():
+            if isinstance(item, ItemError):
+                print(f"{llm_name}: skipped {item}")
+            else:
+                print(f"{llm_name}:\n{library_to_string(item)}")
+            items[llm_name].append(item)
+    result: dict[str, LibrariesOutput] = {llm_name: streaming_parser.to_model(llm_items) for llm_name, llm_items in items.items()}
+else:
+    result: dict[str, LibrariesOutput] = map_chain.invoke(input=inputs)
+requests_duration = time.perf_counter() - start
+
+
+# 2 - consolidate responses into a single table
+
+# local: match the libraries across the LLMs and build the markdown table directly
+start = time.perf_counter()
+table_consolidated = consolidation.to_markdown_table(consolidation.consolidate(result), list(result))
+local_consolidation_duration = time.perf_counter() - start
+
+# llm: making a single request to Claude
 
 template_consolidate_responses = """
 The following data represents the responses of several LLMs to the question: 
@@ -121,12 +182,45 @@ output_parser_consolidate_responses = StrOutputParser()
 chain_consolidate_responses = prompt_consolidate_responses | llm_claude | output_parser_consolidate_responses
 
 
-response_consolidated = chain_consolidate_responses.invoke({
-    "programming_language": PROGRAMMING_LANGUAGE,
-    "responses": result_as_string
-})  
+if CONSOLIDATION == "llm":
+    result_as_string = ""
+    for llm_name, llm_result in result.items():
+        # print(to_string(llm_name, llm_result))
+        result_as_string += to_string(llm_name, llm_result) + "\n"
+
+    start = time.perf_counter()
+    response_consolidated = chain_consolidate_responses.invoke({
+        "programming_language": PROGRAMMING_LANGUAGE,
+        "responses": result_as_string
+    })  
+    consolidation_duration = time.perf_counter() - start
+else:
+    response_consolidated = table_consolidated
+    consolidation_duration = local_consolidation_duration
 
 # print("\n---- Consolidated Response ----")
 # print(response_consolidated)
 
-tools.write_data_to_file(response_consolidated, f"libraries_{PROGRAMMING_LANGUAGE.lower()}.md")
\ No newline at end of file
+tools.write_data_to_file(response_consolidated, f"libraries_{PROGRAMMING_LANGUAGE.lower()}.md")
+
+# end-to-end latency of both steps (the local consolidation is always measured for comparison)
+print(f"Requests: {requests_duration:.2f}s, consolidation ({CONSOLIDATION}): {consolidation_duration:.3f}s, "
+      f"total: {requests_duration + consolidation_duration:.2f}s "
+      f"(local consolidation: {local_consolidation_duration * 1000:.2f} ms)")
+
+# cached vs uncached input tokens of the requests in step 1
+print(f"Prompt caching: {prompt_caching.stats()}")
+
+# per branch: latency and time to first token percentiles, tokens and estimated cost
+for row in metrics.collector.summary():
+    print(row)
+
+
+# 3 - optional: one answer with hedged requests
+# claude is asked first, if it is slower than its usual p90 latency the same request is also sent
+# to openai (and then google), the first parsed result wins and the slower request is cancelled
+
+if RUN_HEDGED_REQUEST:
+    hedged_chain = HedgedRunnable({"claude": claude_chain, "openai": openai_chain, "google": google_chain})
+    print(to_string("hedged", hedged_chain.invoke(input=inputs)))
+    print(hedged_chain.stats())
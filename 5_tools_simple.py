@@ -1,6 +1,7 @@
-from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
+import model_registry
+import tool_runner
 
 """
 1. Tool Definition with @tool decorator:
@@ -64,8 +65,20 @@ USER: sees: "The weather in Paris is sunny with a temperature of 28°C..."
 - FIX: 
     a) Re-attempt the same question to encourage tool usage.
     b) or create before the first question a system prompt that instructs the model to use the tool when relevant.
+- A throwaway first question also hides another cost: Ollama loads the model on its first request
+  (load_duration in the response metadata). model_registry.preload() loads it before the first
+  question instead, without spending a whole model call (see 5_tools_with_system_prompt.py for b).
 """
 
+# forecast data, built once (not on every tool call)
+FORECASTS = {
+    "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
+    "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
+    "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
+    "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
+    "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
+}
+
 # Define the forecast tool
 @tool
 def get_forecast(city: str) -> str:
@@ -78,15 +91,7 @@ def get_forecast(city: str) -> str:
         Weather forecast information as a string
     """
 
-    forecasts = {
-        "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
-        "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
-        "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
-        "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
-        "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
-    }
-    
-    forecast = forecasts.get(city, f"Sorry, no forecast available for {city}")
+    forecast = FORECASTS.get(city, f"Sorry, no forecast available for {city}")
     print(f'   weather forcast for {city}: {forecast}')
     return forecast
 
@@ -96,8 +101,8 @@ MODEL = "llama3.1"
 chat_history = []
     
 def chat_with_tools(user_message: str) -> str:
-    llm = ChatOllama(model=MODEL, temperature=0)
-    llm_with_tools = llm.bind_tools([get_forecast])
+    # shared client with the tool already bound (created once, reused on every turn)
+    llm_with_tools = model_registry.get_chat_model_with_tools("ollama", MODEL, [get_forecast], temperature=0)
     
     chat_history.append(HumanMessage(content=user_message))
     
@@ -106,24 +111,11 @@ def chat_with_tools(user_message: str) -> str:
     
     # check if the model wants to use a tool
     while response.tool_calls:
-        # execute each tool call
         for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-            
-            print(f"\n🔧 Calling tool: {tool_name} with args: {tool_args}")
-            
-            # execute the tool
-            if tool_name == "get_forecast":
-                tool_result = get_forecast.invoke(tool_args)
-            
-            # add tool result to history
-            chat_history.append(
-                ToolMessage(
-                    content=str(tool_result),
-                    tool_call_id=tool_call["id"]
-                )
-            )
+            print(f"\n🔧 Calling tool: {tool_call['name']} with args: {tool_call['args']}")
+
+        # execute all tool calls concurrently and add the results to history (in tool call order)
+        chat_history.extend(tool_runner.run_tool_calls(response.tool_calls, [get_forecast]))
         
         # get final response from LLM with tool results
         response = llm_with_tools.invoke(chat_history)
@@ -136,14 +128,17 @@ def _print_line():
     print("-" * 60) 
 
 if __name__ == "__main__":
+    # load the model into memory now, so the question doesn't pay the load time
+    load_times = model_registry.preload([f"ollama:{MODEL}"], temperature=0)
+    print(f"\nModel loaded in {load_times[f'ollama:{MODEL}']:.2f}s")
+
     question ='What kind of clothes do I need for a short trip to Paris?'
     print(f"\nUser: {question}")
 
     _print_line()
-    print("\nFirst attempt: warming up the tool usage:")
-    chat_with_tools(question)
-
-    _print_line()
-    print("\nSecond attempt:")
     response = chat_with_tools(question)
+    if len(chat_history) == 2:
+        # the model answered without calling the tool: re-attempt the same question (FIX a)
+        print("\nNo tool call, second attempt:")
+        response = chat_with_tools(question)
     print(f"\nAI: {response}\n")
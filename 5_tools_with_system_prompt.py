@@ -1,7 +1,20 @@
-from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.messages.base import BaseMessage
 from langchain_core.tools import tool
+import model_registry
+import prompt_caching
+import tool_runner
+import transcript_export
+
+# forecast data, built once (not on every tool call)
+FORECASTS = {
+    "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
+    "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
+    "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
+    "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
+    "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
+}
+
 
 @tool
 def get_forecast(city: str) -> str:
@@ -13,15 +26,7 @@ def get_forecast(city: str) -> str:
     Returns:
         Weather forecast information as a string
     """
-    forecasts = {
-        "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
-        "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
-        "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
-        "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
-        "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
-    }
-    
-    return forecasts.get(city, f"Sorry, no forecast available for {city}")
+    return FORECASTS.get(city, f"Sorry, no forecast available for {city}")
 
 
 # System prompt that encourages tool usage
@@ -35,14 +40,25 @@ IMPORTANT: When users ask about:
 
 You MUST use the get_forecast tool to check the current weather before providing advice. Never give generic packing advice without checking the actual weather forecast first."""
 
+PROVIDER = "ollama"  # or e.g. "anthropic" with MODEL = "claude-sonnet-4-5-20250929"
 MODEL = "llama3.1"
 
+# mark the static system prompt and the conversation so far for provider-side prompt caching
+# (explicit breakpoints for anthropic, ollama and openai reuse identical prefixes automatically)
+PROMPT_CACHING = True
+
+# optional: write the conversation with turn numbers and role annotations to a file
+# (e.g. "5_tools_with_system_prompt.json", a ".jsonl" file gets one message per line)
+TRANSCRIPT_FILE: str | None = None
+
 # chat history with system prompt
 chat_history = [SystemMessage(content=SYSTEM_PROMPT)]
 
 def chat_with_tools(user_message: str, show_message_history: bool = False) -> str:   
-    llm = ChatOllama(model=MODEL, temperature=0)
-    llm_with_tools = llm.bind_tools([get_forecast])
+    # shared client with the tool already bound (created once, reused on every turn)
+    llm_with_tools = model_registry.get_chat_model_with_tools(PROVIDER, MODEL, [get_forecast], temperature=0)
+    if PROMPT_CACHING:
+        llm_with_tools = prompt_caching.with_prompt_caching(llm_with_tools, cache_conversation=True)
 
     # add user message
     chat_history.append(HumanMessage(content=user_message))
@@ -53,25 +69,16 @@ def chat_with_tools(user_message: str, show_message_history: bool = False) -> st
     
     # check if the model wants to use a tool
     while response.tool_calls:
-        # execute each tool call
         for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-            
-            print(f"\n🔧 Calling tool: {tool_name} with args: {tool_args}")
-            
-            # execute the tool
-            if tool_name == "get_forecast":
-                tool_result = get_forecast.invoke(tool_args)
-                print(f"   weather forecast: {tool_result}")
-            
-            # add tool result to history
-            chat_history.append(
-                ToolMessage(
-                    content=str(tool_result),
-                    tool_call_id=tool_call["id"]
-                )
-            )
+            print(f"\n🔧 Calling tool: {tool_call['name']} with args: {tool_call['args']}")
+
+        # execute all tool calls concurrently, the results are in tool call order
+        tool_messages = tool_runner.run_tool_calls(response.tool_calls, [get_forecast])
+        for tool_message in tool_messages:
+            print(f"   weather forecast: {tool_message.content}")
+
+        # add tool results to history
+        chat_history.extend(tool_messages)
         
         # get final response from LLM with tool results
         response = llm_with_tools.invoke(chat_history)
@@ -81,7 +88,7 @@ def chat_with_tools(user_message: str, show_message_history: bool = False) -> st
         _print_message_history(chat_history)
     
     # Uncomment to see the full JSON response
-    # print(tools.prettyfy_json(response.model_dump_json()))
+    # print(tools.prettyfy_json(response))
     return response.content
 
 
@@ -104,3 +111,9 @@ if __name__ == "__main__":
 
     response = chat_with_tools(question, show_message_history=False)
     print(f"AI: {response}\n")  
+
+    if TRANSCRIPT_FILE:
+        if TRANSCRIPT_FILE.endswith(".jsonl"):
+            transcript_export.write_jsonl([chat_history], TRANSCRIPT_FILE)
+        else:
+            transcript_export.write_json([chat_history], TRANSCRIPT_FILE)
@@ -1,5 +1,5 @@
-from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, AIMessage
+import model_registry
 
 
 """
@@ -46,7 +46,7 @@ class Conversation:
         self.history = []
     
     def chat(self, question: str):
-        llm = ChatOllama(model=MODEL)
+        llm = model_registry.get_chat_model("ollama", MODEL)
         self.history.append(HumanMessage(content=question))
         response = llm.invoke(self.history)
         self.history.append(AIMessage(content=response.content))
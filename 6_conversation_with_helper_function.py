@@ -1,10 +1,10 @@
-from langchain_ollama import ChatOllama
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+import model_registry
 
 chat_history = []
 
 def chat(user_message: str, chat_history: list[BaseMessage]) -> str:
-    llm = ChatOllama(model="llama3.1")
+    llm = model_registry.get_chat_model("ollama", "llama3.1")
     chat_history.append(HumanMessage(content=user_message))
     response = llm.invoke(chat_history)
     chat_history.append(AIMessage(content=response.content))
@@ -1,7 +1,7 @@
-from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+import model_registry
 
 MODEL = "llama3.1"
 chat_history = []
@@ -27,7 +27,7 @@ def _create_chain():
         ("human", "{question}"),                            # current question
     ])
 
-    llm = ChatOllama(model=MODEL)
+    llm = model_registry.get_chat_model("ollama", MODEL)
     output_parser = StrOutputParser()
     chain = prompt | llm | output_parser
     return chain
@@ -1,12 +1,33 @@
-from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+import model_registry
+from memory import SummaryMemory, TokenWindowMemory, prefix_stable_window
 
 MODEL = "llama3.1"
 chat_history = []
 
 MAX_HISTORY = 4  # keep last 4 messages (2 turns)
+EVICT_CHUNK = 8  # "chunked": drop the oldest messages 8 at a time (4 turns)
+
+# memory strategy:
+# - "messages": keep the last MAX_HISTORY messages
+# - "chunked" : keep at least the last MAX_HISTORY messages, evicted EVICT_CHUNK at a time: the prompt
+#               starts with the same messages for several turns, so Ollama reuses its cached
+#               prompt evaluation instead of evaluating the whole window again on every turn
+# - "tokens"  : keep the newest messages that fit into a token budget
+#               (one long answer can't blow the context window, short turns don't waste it)
+# - "summary" : like "tokens", but evicted turns are folded into a running summary in the background
+#               (so the sixth question below still knows about Switzerland)
+MEMORY_MODE = "messages"
+MAX_HISTORY_TOKENS = 100
+EVICT_TO_TOKENS = 50  # a full window is cut down to this, for the same prompt cache reuse as "chunked"
+
+if MEMORY_MODE == "summary":
+    memory = SummaryMemory(model_registry.get_chat_model("ollama", MODEL), max_tokens=MAX_HISTORY_TOKENS,
+                           evict_to=EVICT_TO_TOKENS)
+else:
+    memory = TokenWindowMemory(max_tokens=MAX_HISTORY_TOKENS, evict_to=EVICT_TO_TOKENS)
 
 def chat_with_sliding_window(question: str, chat_history: list[BaseMessage], debug: bool = True) -> str:
     chain = _create_chain()
@@ -24,6 +45,49 @@ def chat_with_sliding_window(question: str, chat_history: list[BaseMessage], deb
 
     return response
 
+def chat_with_chunked_window(question: str, chat_history: list[BaseMessage], debug: bool = True) -> str:
+    chain = _create_chain()
+    window = prefix_stable_window(chat_history, keep=MAX_HISTORY, chunk=EVICT_CHUNK)
+
+    response = chain.invoke({
+        "chat_history": window,  # prefix stable window
+        "question": question,
+    })
+
+    if debug:
+        _print_history(window)  # debug print current window
+
+    chat_history.append(HumanMessage(content=question))
+    chat_history.append(AIMessage(content=response))
+
+    return response
+
+def chat_with_token_window(question: str, memory: TokenWindowMemory, debug: bool = True) -> str:
+    chain = _create_chain()
+
+    response = chain.invoke({
+        "chat_history": memory.messages,  # token budgeted window
+        "question": question,
+    })
+
+    if debug:
+        _print_history(memory.messages)  # debug print current window
+        print(f"  DEBUG: {memory.token_count} of {memory.max_tokens} tokens used")
+        if isinstance(memory, SummaryMemory):
+            print(f"  DEBUG: {memory.saved_tokens} prompt tokens saved compared with the full history")
+
+    memory.add_message(HumanMessage(content=question))
+    memory.add_message(AIMessage(content=response))
+
+    return response
+
+def _chat(question: str, debug: bool = True) -> str:
+    if MEMORY_MODE in ("tokens", "summary"):
+        return chat_with_token_window(question, memory, debug)
+    if MEMORY_MODE == "chunked":
+        return chat_with_chunked_window(question, chat_history, debug)
+    return chat_with_sliding_window(question, chat_history, debug)
+
 def _print_history(history: list[BaseMessage]):
     print("  DEBUG: Current history:")
     if not history:
@@ -41,7 +105,7 @@ def _create_chain():
         ("human", "{question}"),                            # current question
     ])
 
-    llm = ChatOllama(model=MODEL)
+    llm = model_registry.get_chat_model("ollama", MODEL)
     output_parser = StrOutputParser()
     chain = prompt | llm | output_parser
     return chain
@@ -49,25 +113,25 @@ def _create_chain():
 
 if __name__ == "__main__":
     print("---- First Question ----")
-    print(chat_with_sliding_window("What is the capital of France?", chat_history))
+    print(_chat("What is the capital of France?"))
 
     print("\n\n---- Second Question ----")
-    print(chat_with_sliding_window("And Sweden?", chat_history))
+    print(_chat("And Sweden?"))
 
     print("\n\n---- Third Question ----")
-    print(chat_with_sliding_window("And Germany?", chat_history))
+    print(_chat("And Germany?"))
 
     print("\n\n---- Fourth Question ----")
-    print(chat_with_sliding_window("And Switzerland?", chat_history))
+    print(_chat("And Switzerland?"))
 
     print("\n\n---- Fifth Question (triggers sliding window) ----")
     print("Dummy questions to push out old history...")
-    chat_with_sliding_window("Lorem ipsum?", chat_history, debug=False) 
-    chat_with_sliding_window("Lorem ipsum?", chat_history, debug=False)
-    chat_with_sliding_window("Lorem ipsum?", chat_history, debug=False)
-    chat_with_sliding_window("Lorem ipsum?", chat_history, debug=False)
+    _chat("Lorem ipsum?", debug=False) 
+    _chat("Lorem ipsum?", debug=False)
+    _chat("Lorem ipsum?", debug=False)
+    _chat("Lorem ipsum?", debug=False)
     
     print("\n\n---- Sixth Question (check history after sliding) ----")
     print("history does no longer contains any useful infromation")
-    print(chat_with_sliding_window("And Switzerland?", chat_history, debug=False))
+    print(_chat("And Switzerland?", debug=False))
 
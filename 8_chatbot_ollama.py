@@ -1,6 +1,22 @@
-from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.tools import tool
+import conversation_store
+import model_registry
+import prompt_caching
+import streaming
+import tool_cache
+import tool_runner
+
+# forecast data, built once (not on every tool call)
+FORECAST_TTL = 600  # seconds a cached forecast stays valid
+FORECASTS = {
+    "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
+    "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
+    "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
+    "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
+    "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
+}
+
 
 # define the forecast tool
 @tool
@@ -13,15 +29,10 @@ def get_forecast(city: str) -> str:
     Returns:
         Weather forecast information as a string
     """
-    forecasts = {
-        "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
-        "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
-        "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
-        "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
-        "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
-    }
-    
-    return forecasts.get(city, f"Sorry, no forecast available for {city}")
+    return FORECASTS.get(city, f"Sorry, no forecast available for {city}")
+
+# serve repeated forecasts from the process-wide tool cache (shared by all conversations)
+get_forecast = tool_cache.cached(get_forecast, ttl=FORECAST_TTL)
 
 
 # system prompt that encourages tool usage
@@ -36,15 +47,35 @@ IMPORTANT: When users ask about:
 You MUST use the get_forecast tool to check the current weather before providing advice. Never give generic packing advice without checking the actual weather forecast first."""
 
 
+PROVIDER = "ollama"  # or e.g. "anthropic" with MODEL = "claude-sonnet-4-5-20250929"
 MODEL = "llama3.1"
 
+# mark the static system prompt and the conversation so far for provider-side prompt caching
+# (explicit breakpoints for anthropic, ollama and openai reuse identical prefixes automatically)
+PROMPT_CACHING = True
+
+# optional: keep the chat history in a SQLite file, so the conversation survives a restart
+# (e.g. HISTORY_DB = "chat_history.db", only the newest MAX_LOADED_MESSAGES are loaded, see conversation_store.py)
+HISTORY_DB: str | None = None
+SESSION_ID = "default"
+MAX_LOADED_MESSAGES = 50
+
 # chat history with system prompt
-chat_history = [SystemMessage(content=SYSTEM_PROMPT)]
+if HISTORY_DB:
+    chat_history = conversation_store.StoredHistory(conversation_store.SQLiteConversationStore(HISTORY_DB), SESSION_ID,
+                                                    max_messages=MAX_LOADED_MESSAGES, system_prompt=SYSTEM_PROMPT)
+else:
+    chat_history = [SystemMessage(content=SYSTEM_PROMPT)]
+
+# metrics (e.g. time to first token) of every streamed turn
+turn_metrics: list[streaming.TurnMetrics] = []
 
 # chat with tools supported
 def ask(user_message):
-    llm = ChatOllama(model=MODEL)
-    llm_with_tools = llm.bind_tools([get_forecast])
+    # shared client with the tool already bound (created once, reused on every turn)
+    llm_with_tools = model_registry.get_chat_model_with_tools(PROVIDER, MODEL, [get_forecast])
+    if PROMPT_CACHING:
+        llm_with_tools = prompt_caching.with_prompt_caching(llm_with_tools, cache_conversation=True)
 
     # add user message
     chat_history.append(HumanMessage(content=user_message))
@@ -55,25 +86,16 @@ def ask(user_message):
     
     # check if the model wants to use a tool
     while response.tool_calls:
-        # execute each tool call
         for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-            
-            print(f"\n🔧 Calling tool: {tool_name} with args: {tool_args}")
-            
-            # execute the tool
-            if tool_name == "get_forecast":
-                tool_result = get_forecast.invoke(tool_args)
-                print(f"   weather forecast: {tool_result}")
-            
-            # add tool result to history
-            chat_history.append(
-                ToolMessage(
-                    content=str(tool_result),
-                    tool_call_id=tool_call["id"]
-                )
-            )
+            print(f"\n🔧 Calling tool: {tool_call['name']} with args: {tool_call['args']}")
+
+        # execute all tool calls concurrently, the results are in tool call order
+        tool_messages = tool_runner.run_tool_calls(response.tool_calls, [get_forecast])
+        for tool_message in tool_messages:
+            print(f"   weather forecast: {tool_message.content}")
+
+        # add tool results to history
+        chat_history.extend(tool_messages)
         
         # get final response from LLM with tool results
         response = llm_with_tools.invoke(chat_history)
@@ -82,11 +104,28 @@ def ask(user_message):
     return response.content
 
 
+# streaming variant of ask(): yields the tokens as they arrive (also after tool calls)
+def ask_stream(user_message):
+    llm_with_tools = model_registry.get_chat_model_with_tools(PROVIDER, MODEL, [get_forecast])
+    if PROMPT_CACHING:
+        llm_with_tools = prompt_caching.with_prompt_caching(llm_with_tools, cache_conversation=True)
+
+    # add user message
+    chat_history.append(HumanMessage(content=user_message))
+
+    # stream the response, tool calls are executed in between
+    metrics = yield from streaming.stream_turn(llm_with_tools, chat_history, [get_forecast])
+    turn_metrics.append(metrics)
+
+
 def _draw_line() -> None:
     print("=" * 60)     
 
 
 if __name__ == "__main__":
+    # load the model before the first question (Ollama, nothing to load for hosted providers)
+    model_registry.preload([f"{PROVIDER}:{MODEL}"])
+
     _draw_line()
     question_1 = 'What kind of clothes do I need for a short trip to Paris?'
     print(f"\nUser: {question_1}")
@@ -98,3 +137,11 @@ if __name__ == "__main__":
     print(f"\nUser: {question_2}")
     response2 = ask(question_2)
     print(f"AI: {response2}\n")
+
+    _draw_line()
+    question_3 = 'And for Madrid?'
+    print(f"\nUser: {question_3}")
+    print("AI: ", end="")
+    for token in ask_stream(question_3):
+        print(token, end="", flush=True)
+    print(f"\n\n({turn_metrics[-1]})\n")
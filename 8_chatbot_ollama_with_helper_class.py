@@ -1,21 +1,31 @@
-from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.tools import tool
 from langchain_core.messages import ToolCall
+from langchain_core.language_models.chat_models import BaseChatModel
+import compact_history
+import metrics
+import model_registry
+import streaming
+import tool_cache
+import tool_runner
 
 MODEL = "llama3.1"
 
 class Conversation:
-    def __init__(self, use_tools: bool = True, debug: bool = False):
+    def __init__(self, use_tools: bool = True, debug: bool = False, llm: BaseChatModel | None = None,
+                 compact: bool = False):
         self.debug = debug
-        self.chat_history = []
+        # compact: keep only what is needed to replay the history (for many long-lived sessions, see compact_history.py)
+        self.chat_history = compact_history.CompactHistory() if compact else []
+        self.use_tools = use_tools
+        self.turn_metrics: list[streaming.TurnMetrics] = []  # of streamed turns
 
-        # plain llm without tools
-        self.llm = ChatOllama(model=MODEL, temperature=0) 
+        # plain llm without tools (shared by all conversations, unless one is passed in)
+        self.llm = llm or model_registry.get_chat_model("ollama", MODEL, temperature=0)
         
         # llm with tools and system prompt
         if use_tools:
-            self.llm = self.llm.bind_tools([get_forecast]) 
+            self.llm = model_registry.bind_tools(self.llm, [get_forecast])
             self._set_system_prompt()
     
 
@@ -29,9 +39,8 @@ class Conversation:
         
         # check if the model wants to use a tool
         while response.tool_calls:
-            # execute each tool call
-            for tool_call in response.tool_calls:
-                self._make_tool_call_and_add_result_to_history(tool_call)
+            # execute all tool calls concurrently
+            self._make_tool_calls_and_add_results_to_history(response.tool_calls)
             
             # get final response from LLM with tool results
             response = self.llm.invoke(self.chat_history)
@@ -40,26 +49,55 @@ class Conversation:
         return response.content
 
 
-    def _make_tool_call_and_add_result_to_history(self, tool_call: ToolCall):
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
-        
+    async def aask(self, user_message: str):
+        # async variant of ask(): many conversations can share one event loop
+        self.chat_history.append(HumanMessage(content=user_message))
+
+        response = await self.llm.ainvoke(self.chat_history)
+        self.chat_history.append(response)
+
+        while response.tool_calls:
+            await self._amake_tool_calls_and_add_results_to_history(response.tool_calls)
+
+            response = await self.llm.ainvoke(self.chat_history)
+            self.chat_history.append(response)
+
+        return response.content
+
+
+    def ask_stream(self, user_message: str):
+        # streaming variant of ask(): yields the tokens as they arrive (also after tool calls)
+        self.chat_history.append(HumanMessage(content=user_message))
+
+        tools = [get_forecast] if self.use_tools else []
+        metrics = yield from streaming.stream_turn(self.llm, self.chat_history, tools)
+        self.turn_metrics.append(metrics)
+
+        if self.debug:
+            print(f"\n   {metrics}")
+
+
+    def _make_tool_calls_and_add_results_to_history(self, tool_calls: list[ToolCall]):
         if self.debug:
-            print(f"\n🔧 Calling tool: {tool_name} with args: {tool_args}")
+            for tool_call in tool_calls:
+                print(f"\n🔧 Calling tool: {tool_call['name']} with args: {tool_call['args']}")
         
-        # execute the tool
-        if tool_name == "get_forecast":
-            tool_result = get_forecast.invoke(tool_args)
-            if self.debug:
-                print(f"   weather forecast: {tool_result}")
+        # execute the tools (the results are in tool call order, so the history stays deterministic)
+        tool_messages = tool_runner.run_tool_calls(tool_calls, [get_forecast])
+        if self.debug:
+            for tool_message in tool_messages:
+                print(f"   weather forecast: {tool_message.content}")
         
-        # add tool result to history
-        self.chat_history.append(
-            ToolMessage(
-                content=str(tool_result),
-                tool_call_id=tool_call["id"]
-            )
-        )
+        # add tool results to history
+        self.chat_history.extend(tool_messages)
+
+    async def _amake_tool_calls_and_add_results_to_history(self, tool_calls: list[ToolCall]):
+        if self.debug:
+            for tool_call in tool_calls:
+                print(f"\n🔧 Calling tool: {tool_call['name']} with args: {tool_call['args']}")
+
+        tool_messages = await tool_runner.arun_tool_calls(tool_calls, [get_forecast])
+        self.chat_history.extend(tool_messages)
         
     def _set_system_prompt(self):
         SYSTEM_PROMPT = """You are a helpful travel assistant. 
@@ -72,7 +110,19 @@ class Conversation:
 
         You MUST use the get_forecast tool to check the current weather before providing advice. Never give generic packing advice without checking the actual weather forecast first."""
 
-        self.chat_history = [SystemMessage(content=SYSTEM_PROMPT)]
+        self.chat_history.clear()
+        self.chat_history.append(SystemMessage(content=SYSTEM_PROMPT))
+
+
+# forecast data, built once (not on every tool call)
+FORECAST_TTL = 600  # seconds a cached forecast stays valid
+FORECASTS = {
+    "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
+    "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
+    "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
+    "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
+    "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
+}
 
 
 # define the forecast tool
@@ -86,15 +136,10 @@ def get_forecast(city: str) -> str:
     Returns:
         Weather forecast information as a string
     """
-    forecasts = {
-        "Paris": "Temperature: 28°C, Conditions: Sunny, Wind: 10 km/h",
-        "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
-        "London": "Temperature: 15°C, Conditions: Rain, Wind: 8 km/h",
-        "Berlin": "Temperature: 16°C, Conditions: Partly cloudy, Wind: 12 km/h",
-        "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
-    }
-    
-    return forecasts.get(city, f"Sorry, no forecast available for {city}")
+    return FORECASTS.get(city, f"Sorry, no forecast available for {city}")
+
+# serve repeated forecasts from the process-wide tool cache (shared by all conversations)
+get_forecast = tool_cache.cached(get_forecast, ttl=FORECAST_TTL)
 
 
 def chat_without_tools_example():
@@ -117,7 +162,27 @@ def chat_with_tools_example():
     print(question)
     print(f'\n\n{conv.ask(question)}')
 
+    print(f'\n\ntool cache: {tool_cache.shared_cache.stats()}')
+
+
+def chat_with_streaming_example():
+    print("\n--- Chat with tools and streaming ---")
+    conv = Conversation(use_tools=True, debug=True)
+    # collect latency, time to first token and tokens of every model call of this conversation
+    conv.llm = metrics.attach(conv.llm)
+
+    question = "\n> What kind of clothes do I need for a short trip to Madrid?"
+    print(question)
+    print()
+    for token in conv.ask_stream(question):
+        print(token, end="", flush=True)
+    print()
+    print(metrics.collector.to_prometheus())
+
 
 if __name__ == "__main__":
+    # load the model before the first question, the examples' turns don't pay the load time
+    model_registry.preload([f"ollama:{MODEL}"], temperature=0)
     chat_without_tools_example()
-    chat_with_tools_example()
\ No newline at end of file
+    chat_with_tools_example()
+    chat_with_streaming_example()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+
+# run a `prompt | model | parser` chain over a JSONL file of template inputs
+#
+# - inputs are read line by line, at most `concurrency` rows are in flight at any time
+# - every finished row is appended (and flushed) to the output JSONL file right away:
+#   {"id": ..., "input": {...}, "output": ...} or {"id": ..., "input": {...}, "error": "..."}
+# - the output file is the checkpoint: a restarted run skips all rows that already have an
+#   output and retries the failed ones (the last line of a row wins)
+# - progress and throughput are printed every `progress_interval` seconds
+#
+# The row id is the "id" field of the input line if present, else its line number. All other
+# fields are passed to the chain as template variables.
+#
+# usage:
+#   summary = batch_runner.run_batch(chain, "colors.jsonl", "colors_summaries.jsonl", concurrency=16)
+#
+#   python batch_runner.py 2_fundamentals_prompt_template:chain colors.jsonl colors_summaries.jsonl --concurrency 16
+
+CONCURRENCY = 8
+PROGRESS_INTERVAL = 5.0  # seconds
+
+
+def read_inputs(input_path: str) -> Iterator[tuple[Any, dict[str, Any]]]:
+    """(row id, template variables) of each non-empty line of the input file."""
+    with open(input_path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            row_id = row.pop("id", line_number)
+            yield row_id, row
+
+
+def read_finished(output_path: str) -> set[Any]:
+    """Ids of the rows that already have an output, repairs a partially written last line."""
+    if not os.path.exists(output_path):
+        return set()
+
+    finished = set()
+    with open(output_path, "rb+") as file:
+        valid_size = 0
+        for line in file:
+            if not line.endswith(b"\n"):
+                break  # the run crashed while writing this line
+            valid_size += len(line)
+            result = json.loads(line)
+            if "output" in result:
+                finished.add(result["id"])
+            else:
+                finished.discard(result["id"])
+        file.truncate(valid_size)
+    return finished
+
+
+def to_json(output: Any) -> Any:
+    """JSON representation of a chain output (parser result, message or plain value, also nested in lists and dicts)."""
+    if isinstance(output, BaseMessage):
+        return output.content
+    if isinstance(output, BaseModel):
+        return output.model_dump(mode="json")
+    if isinstance(output, (list, tuple)):
+        return [to_json(item) for item in output]
+    if isinstance(output, dict):
+        return {key: to_json(value) for key, value in output.items()}
+    return output
+
+
+class Progress:
+    def __init__(self, total: int, skipped: int, interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.succeeded = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.failed
+
+    def update(self, success: bool) -> None:
+        if success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.skipped - self.done
+        eta = f"{remaining / rate:.0f} s" if rate else "-"
+        print(f"{self.skipped + self.done}/{self.total} rows   failed: {self.failed}   "
+              f"{rate:.1f} rows/s   eta: {eta}", file=sys.stderr, flush=True)
+
+    def summary(self) -> dict[str, Any]:
+        elapsed = time.perf_counter() - self.start
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(self.done / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+async def arun_batch(chain: Runnable, input_path: str, output_path: str, concurrency: int = CONCURRENCY,
+                     progress_interval: float = PROGRESS_INTERVAL) -> dict[str, Any]:
+    """Run the chain over all unfinished rows of the input file, returns a summary of the run."""
+    finished = read_finished(output_path)
+    total = sum(1 for _ in read_inputs(input_path))
+    progress = Progress(total, skipped=len(finished), interval=progress_interval)
+
+    # bounded queue: the input file is never loaded as a whole
+    queue: asyncio.Queue[tuple[Any, dict[str, Any]] | None] = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(output_path, "a", encoding="utf-8") as output_file:
+        def write(result: dict[str, Any]) -> None:
+            output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output_file.flush()
+
+        async def worker() -> None:
+            while (item := await queue.get()) is not None:
+                row_id, inputs = item
+                try:
+                    output = await chain.ainvoke(inputs)
+                    write({"id": row_id, "input": inputs, "output": to_json(output)})
+                    progress.update(success=True)
+                except Exception as error:
+                    write({"id": row_id, "input": inputs, "error": f"{type(error).__name__}: {error}"})
+                    progress.update(success=False)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for row_id, inputs in read_inputs(input_path):
+            if row_id not in finished:
+                await queue.put((row_id, inputs))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    progress.report()
+    return progress.summary()
+
+
+def run_batch(chain: Runnable, input_path: str, output_path: str, concurrency: int = CONCURRENCY,
+              progress_interval: float = PROGRESS_INTERVAL) -> dict[str, Any]:
+    """Blocking version of arun_batch."""
+    return asyncio.run(arun_batch(chain, input_path, output_path, concurrency, progress_interval))
+
+
+def load_chain(spec: str) -> Runnable:
+    """Chain from a 'module:attribute' spec, e.g. '2_fundamentals_prompt_template:chain'."""
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "chain")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a chain over a JSONL file of template inputs.")
+    parser.add_argument("chain", help="module:attribute of the chain, e.g. 2_fundamentals_prompt_template:chain")
+    parser.add_argument("input", help="JSONL file, one object of template variables per line")
+    parser.add_argument("output", help="JSONL file for the results (also the checkpoint of the run)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--progress-interval", type=float, default=PROGRESS_INTERVAL, help="seconds")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    print(run_batch(load_chain(args.chain), args.input, args.output, args.concurrency, args.progress_interval))
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# local stand-in for the Anthropic Messages API, to check prompt caching without an API key
+#
+# It records every request payload and simulates Anthropic's prompt cache: the prompt is read
+# in the order tools, system, messages, and the prefix up to each cache_control breakpoint is
+# stored. A later request with the same prefix reports it as cache_read_input_tokens, a new
+# prefix as cache_creation_input_tokens. Like the real API, a breakpoint also finds cached
+# prefixes ending up to LOOKBACK_BLOCKS blocks before it. Tokens are counted as words.
+#
+# usage:
+#   with AnthropicStubServer() as server:
+#       llm = ChatAnthropic(model="claude-sonnet-4-5-20250929", base_url=server.url, api_key="stub")
+
+LOOKBACK_BLOCKS = 20
+
+
+class AnthropicStubServer:
+    def __init__(self, reply: str = "Pack light clothes, it is sunny.", host: str = "127.0.0.1", port: int = 0):
+        self.reply = reply
+        self.requests: list[dict] = []
+        self.cached_prefixes: set[str] = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "AnthropicStubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "AnthropicStubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def usage(self, request: dict) -> dict:
+        """Input token usage of a request, updates the simulated prompt cache."""
+        blocks = _prompt_blocks(request)
+        tokens = [len(json.dumps(_without_cache_control(block)).split()) for block in blocks]
+        breakpoints = [index for index, block in enumerate(blocks) if "cache_control" in block]
+
+        with self._lock:
+            # the longest prefix that is already cached is read, everything up to the last breakpoint is written
+            read_end = 0
+            for index in breakpoints:
+                for end in range(index, max(-1, index - LOOKBACK_BLOCKS), -1):
+                    if _prefix_hash(blocks, end) in self.cached_prefixes:
+                        read_end = max(read_end, end + 1)
+                        break
+            for index in breakpoints:
+                self.cached_prefixes.add(_prefix_hash(blocks, index))
+        write_end = breakpoints[-1] + 1 if breakpoints else 0
+
+        cache_read = sum(tokens[:read_end])
+        cache_creation = sum(tokens[read_end:write_end]) if write_end > read_end else 0
+        return {
+            "input_tokens": sum(tokens) - cache_read - cache_creation,
+            "output_tokens": len(self.reply.split()),
+            "cache_read_input_tokens": cache_read,
+            "cache_creation_input_tokens": cache_creation,
+        }
+
+    def message_events(self, request: dict) -> list[tuple[str, dict]]:
+        """Server-sent events of a streamed response."""
+        usage = self.usage(request)
+        message = _message(request, content=[], usage={**usage, "output_tokens": 1})
+        events = [
+            ("message_start", {"type": "message_start", "message": message}),
+            ("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+        ]
+        for index, word in enumerate(self.reply.split(" ")):
+            events.append(("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {
+                "type": "text_delta", "text": word if index == 0 else " " + word}}))
+        events += [
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                               "usage": usage}),  # the complete usage, like the current API
+            ("message_stop", {"type": "message_stop"}),
+        ]
+        return events
+
+
+def _message(request: dict, content: list, usage: dict) -> dict:
+    return {
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", "claude-stub"),
+        "content": content,
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": usage,
+    }
+
+
+def _prompt_blocks(request: dict) -> list[dict]:
+    # Anthropic builds the prompt in the order tools, system, messages
+    blocks = list(request.get("tools", []))
+    system = request.get("system")
+    if isinstance(system, str):
+        blocks.append({"type": "text", "text": system})
+    elif system:
+        blocks.extend(system)
+    for message in request.get("messages", []):
+        content = message["content"]
+        if isinstance(content, str):
+            blocks.append({"role": message["role"], "type": "text", "text": content})
+        else:
+            blocks.extend({"role": message["role"], **block} for block in content)
+    return blocks
+
+
+def _without_cache_control(block: dict) -> dict:
+    return {key: value for key, value in block.items() if key != "cache_control"}
+
+
+def _prefix_hash(blocks: list[dict], end: int) -> str:
+    prefix = [_without_cache_control(block) for block in blocks[:end + 1]]
+    return hashlib.sha256(json.dumps(prefix, sort_keys=True).encode()).hexdigest()
+
+
+def _make_handler(stub: AnthropicStubServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.rstrip("/") != "/v1/messages":
+                self._send(json.dumps({"type": "error", "error": {"type": "not_found_error"}}).encode(),
+                           "application/json", status=404)
+                return
+
+            stub.requests.append(request)
+            if request.get("stream"):
+                body = b"".join(
+                    f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+                    for event, data in stub.message_events(request)
+                )
+                self._send(body, "text/event-stream")
+            else:
+                message = _message(request, content=[{"type": "text", "text": stub.reply}], usage=stub.usage(request))
+                self._send(json.dumps(message).encode(), "application/json")
+
+        def _send(self, body: bytes, content_type: str, status: int = 200):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
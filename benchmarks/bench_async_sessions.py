@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_chat_model import FakeChatModel
+from benchmarks.stats import format_latencies
+
+# load benchmark for Conversation.aask: many concurrent sessions on one event loop
+#
+# Every session asks a few questions. The first question of each session triggers a
+# get_forecast tool call, so a turn makes two model calls. The fake chat model injects
+# `latency` seconds per call. For comparison, the same workload runs with the blocking
+# Conversation.ask on a thread pool.
+#
+# run with:
+#   python -m benchmarks.bench_async_sessions --sessions 1000
+
+# scripts start with a digit, so they can't be imported with a plain import statement
+chatbot = importlib.import_module("8_chatbot_ollama_with_helper_class")
+
+QUESTIONS = [
+    "What kind of clothes do I need for a short trip to Paris?",
+    "And what about the evenings?",
+    "Thanks!",
+]
+
+
+def create_llm(latency: float) -> FakeChatModel:
+    return FakeChatModel(latency=latency, tool_call={"name": "get_forecast", "args": {"city": "Paris"}})
+
+
+async def run_session(llm: FakeChatModel, turns: int, latencies: list[float]) -> None:
+    conversation = chatbot.Conversation(use_tools=True, llm=llm)
+    for question in QUESTIONS[:turns]:
+        start = time.perf_counter()
+        await conversation.aask(question)
+        latencies.append(time.perf_counter() - start)
+
+
+def run_session_sync(llm: FakeChatModel, turns: int, latencies: list[float]) -> None:
+    conversation = chatbot.Conversation(use_tools=True, llm=llm)
+    for question in QUESTIONS[:turns]:
+        start = time.perf_counter()
+        conversation.ask(question)
+        latencies.append(time.perf_counter() - start)
+
+
+async def bench_async(sessions: int, turns: int, latency: float) -> tuple[float, list[float]]:
+    llm = create_llm(latency)
+    latencies: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(llm, turns, latencies) for _ in range(sessions)))
+    return time.perf_counter() - start, latencies
+
+
+def bench_threads(sessions: int, turns: int, latency: float, threads: int) -> tuple[float, list[float]]:
+    llm = create_llm(latency)
+    latencies: list[float] = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(run_session_sync, llm, turns, latencies) for _ in range(sessions)]:
+            future.result()
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, elapsed: float, latencies: list[float]) -> None:
+    print(f"{name:<24} turns: {len(latencies):6d}   {len(latencies) / elapsed:9.1f} turns/s   "
+          f"{format_latencies(latencies)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=len(QUESTIONS))
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--threads", type=int, default=32, help="threads of the sync baseline, 0 to skip it")
+    args = parser.parse_args()
+
+    print(f"---- {args.sessions} sessions x {args.turns} turns, {args.latency * 1000:.0f} ms per model call ----")
+    report("async (one event loop)", *asyncio.run(bench_async(args.sessions, args.turns, args.latency)))
+    if args.threads:
+        report(f"sync ({args.threads} threads)", *bench_threads(args.sessions, args.turns, args.latency, args.threads))
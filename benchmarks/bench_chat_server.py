@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import importlib
+import json
+import time
+
+from benchmarks.fake_chat_model import FakeChatModel
+from benchmarks.stats import format_latencies
+from chat_server import AdmissionControl, ChatService, handle_http
+
+# latency of chat_server.py under overload, with and without backpressure
+#
+# `--clients` clients each send `--turns` turns over HTTP (keep-alive), all at once, to a server
+# whose fake model takes `--latency` seconds per call (a turn with a tool call makes two calls).
+# With backpressure, at most --max-concurrency turns run and --max-queue wait, the rest gets
+# a 429 right away and retries after its retry_after. Without backpressure every turn is queued.
+# Reported: the latency of accepted and of rejected requests, and of a turn including its retries.
+#
+# run with:
+#   python -m benchmarks.bench_chat_server --clients 200
+
+# scripts start with a digit, so they can't be imported with a plain import statement
+chatbot = importlib.import_module("8_chatbot_ollama_with_helper_class")
+
+
+async def post(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str, payload: dict) -> tuple[int, dict]:
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+async def client(port: int, session_id: str, turns: int, results: dict[str, list[float]], counters: dict[str, int]) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    expected_turn = 1
+    for turn in range(turns):
+        turn_start = time.perf_counter()
+        while True:
+            start = time.perf_counter()
+            status, response = await post(reader, writer, f"/sessions/{session_id}/messages",
+                                          {"message": f"What should I pack for Paris? ({turn})"})
+            if status != 429:
+                results["accepted"].append(time.perf_counter() - start)
+                break
+            results["rejected"].append(time.perf_counter() - start)
+            await asyncio.sleep(response["retry_after"])
+        results["turn"].append(time.perf_counter() - turn_start)
+        if response["turn"] != expected_turn:
+            counters["out_of_order"] += 1
+        expected_turn += 1
+    writer.close()
+
+
+async def run(clients: int, turns: int, latency: float, admission: AdmissionControl) -> None:
+    llm = FakeChatModel(latency=latency, tool_call={"name": "get_forecast", "args": {"city": "Paris"}})
+    service = ChatService(lambda: chatbot.Conversation(use_tools=True, llm=llm, compact=True), admission=admission)
+    server = await asyncio.start_server(lambda reader, writer: handle_http(service, reader, writer), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    results: dict[str, list[float]] = {"accepted": [], "rejected": [], "turn": []}
+    counters = {"out_of_order": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, f"session-{index}", turns, results, counters) for index in range(clients)))
+    duration = time.perf_counter() - start
+    server.close()
+
+    print(f"  {len(results['turn'])} turns in {duration:.2f}s, {len(results['rejected'])} requests rejected (429), "
+          f"{counters['out_of_order']} turns out of order")
+    print(f"  accepted request   {format_latencies(results['accepted'])}")
+    if results["rejected"]:
+        print(f"  rejected request   {format_latencies(results['rejected'])}")
+    print(f"  turn incl. retries {format_latencies(results['turn'])}")
+    print(f"  server: {service.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="chat_server.py under overload.")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"---- {args.clients} clients x {args.turns} turns, {args.latency * 1000:.0f} ms per model call ----")
+    print(f"backpressure (max concurrency {args.max_concurrency}, queue {args.max_queue}):")
+    asyncio.run(run(args.clients, args.turns, args.latency,
+                    AdmissionControl(args.max_concurrency, args.max_queue, queue_timeout=10.0)))
+    print(f"no backpressure (max concurrency {args.max_concurrency}, unbounded queue):")
+    asyncio.run(run(args.clients, args.turns, args.latency,
+                    AdmissionControl(args.max_concurrency, max_queue=10**9, queue_timeout=10**9)))
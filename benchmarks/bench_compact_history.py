@@ -0,0 +1,107 @@
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from compact_history import CompactHistory
+
+# memory of many long-lived chat sessions: plain message lists vs CompactHistory
+#
+# Every session has the travel assistant system prompt and `--turns` turns like the transcript
+# in 5_tools_with_system_prompt.json: question, AI tool call, tool result, answer, the AI messages
+# with Ollama's response_metadata, usage_metadata and a run id. The retained memory of all
+# sessions is measured with tracemalloc, the prompt assembly time is the time to turn one
+# session's history into the message list sent to the model.
+#
+# run with:
+#   python -m benchmarks.bench_compact_history --sessions 10000
+
+SYSTEM_PROMPT = """You are a helpful travel assistant.
+
+IMPORTANT: When users ask about:
+- What to pack for a trip
+- What clothes to bring
+- Weather conditions
+- Temperature in a city
+
+You MUST use the get_forecast tool to check the current weather before providing advice. Never give generic packing advice without checking the actual weather forecast first."""
+
+ANSWER = ("Based on the current weather forecast for Paris, I would recommend packing layers for your trip. "
+          "It's expected to be around 18°C with partly cloudy conditions and a gentle breeze.\n\n"
+          "* 3-4 tops or shirts (lightweight and breathable)\n* 1-2 lightweight jackets or sweaters\n"
+          "* Comfortable walking shoes or sneakers\n\nEnjoy Paris!")
+
+
+def response_metadata() -> dict:
+    return {
+        "model": "llama3.1", "created_at": "2026-01-16T15:21:33.224738Z", "done": True, "done_reason": "stop",
+        "total_duration": 4311281291, "load_duration": 67451041, "prompt_eval_count": 173,
+        "prompt_eval_duration": 130698791, "eval_count": 194, "eval_duration": 3019835378, "logprobs": None,
+        "model_name": "llama3.1", "model_provider": "ollama",
+    }
+
+
+def ai_message(content: str, tool_calls: list | None = None) -> AIMessage:
+    return AIMessage(
+        content=content, tool_calls=tool_calls or [], response_metadata=response_metadata(),
+        id=f"lc_run--{uuid.uuid4()}-0",
+        usage_metadata={"input_tokens": 173, "output_tokens": 194, "total_tokens": 367},
+    )
+
+
+def turn_messages(turn: int) -> list:
+    call_id = str(uuid.uuid4())
+    return [
+        HumanMessage(content=f"What kind of clothes do I need for a short trip to Paris? (trip {turn})"),
+        ai_message("", [{"name": "get_forecast", "args": {"city": "Paris"}, "id": call_id, "type": "tool_call"}]),
+        ToolMessage(content="Temperature: 18°C, Conditions: Partly cloudy, Wind: 10 km/h", tool_call_id=call_id),
+        ai_message(ANSWER),
+    ]
+
+
+def create_sessions(sessions: int, turns: int, compact: bool) -> list:
+    histories = []
+    for _ in range(sessions):
+        history = CompactHistory() if compact else []
+        history.append(SystemMessage(content=SYSTEM_PROMPT))
+        for turn in range(turns):
+            history.extend(turn_messages(turn))
+        histories.append(history)
+    return histories
+
+
+def measure(sessions: int, turns: int, compact: bool) -> tuple[int, float]:
+    """Retained bytes of all sessions and the prompt assembly time of one session in seconds."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    histories = create_sessions(sessions, turns, compact)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    repeats = 1000
+    start = time.perf_counter()
+    for index in range(repeats):
+        list(histories[index % len(histories)])
+    assembly = (time.perf_counter() - start) / repeats
+    return retained, assembly
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of many chat sessions, plain vs compact history.")
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"---- {args.sessions} sessions, {args.turns} turns ({1 + 4 * args.turns} messages) each ----")
+    results = {}
+    for name, compact in (("list", False), ("compact", True)):
+        retained, assembly = measure(args.sessions, args.turns, compact)
+        results[name] = retained
+        print(f"{name:<8} {retained / 1024 / 1024:8.1f} MiB   {retained / args.sessions / 1024:6.1f} KiB per session   "
+              f"prompt assembly: {assembly * 1_000_000:7.1f} µs per session")
+    print(f"compact history uses {1 - results['compact'] / results['list']:.0%} less memory")
@@ -0,0 +1,75 @@
+import asyncio
+import random
+import time
+from typing import Any
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+
+from benchmarks.fake_chat_model import FakeChatModel
+from benchmarks.stats import format_latencies
+from hedging import HedgedRunnable
+
+# tail latency of a single provider compared with hedged requests across three providers
+#
+# Every fake provider answers in `FAST_LATENCY` seconds, but 10% of the requests take
+# `SLOW_LATENCY` seconds. The hedge delay adapts to the observed p90 of the primary.
+#
+# run with:
+#   python -m benchmarks.bench_hedging
+
+REQUESTS = 300
+CONCURRENCY = 20
+FAST_LATENCY = 0.02
+SLOW_LATENCY = 0.5
+SLOW_SHARE = 0.1
+
+
+class HeavyTailChatModel(FakeChatModel):
+    seed: int = 0
+
+    def model_post_init(self, context: Any) -> None:
+        super().model_post_init(context)
+        self._random = random.Random(self.seed)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        slow = self._random.random() < SLOW_SHARE
+        await asyncio.sleep(SLOW_LATENCY if slow else FAST_LATENCY)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+
+def create_chain(seed: int):
+    prompt = ChatPromptTemplate.from_template("Most popular libraries for {programming_language}?")
+    return prompt | HeavyTailChatModel(seed=seed) | StrOutputParser()
+
+
+async def measure(name: str, runnable) -> list[float]:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def request():
+        async with semaphore:
+            start = time.perf_counter()
+            await runnable.ainvoke({"programming_language": "Python"})
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(request() for _ in range(REQUESTS)))
+    print(f"{name:<14} {format_latencies(latencies)}   max: {max(latencies) * 1000:8.2f} ms")
+    return latencies
+
+
+async def main():
+    print(f"---- {REQUESTS} requests, {SLOW_SHARE:.0%} of them take {SLOW_LATENCY * 1000:.0f} ms ----")
+    await measure("primary only", create_chain(seed=1))
+
+    hedged = HedgedRunnable(
+        {"claude": create_chain(seed=1), "openai": create_chain(seed=2), "google": create_chain(seed=3)},
+        initial_delay=0.1,
+    )
+    await measure("hedged", hedged)
+    print(f"\n{hedged.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
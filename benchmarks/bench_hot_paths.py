@@ -0,0 +1,126 @@
+import argparse
+import importlib
+import json
+import os
+import time
+from collections.abc import Callable
+
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import (CommaSeparatedListOutputParser, JsonOutputParser, PydanticOutputParser,
+                                           StrOutputParser)
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableParallel
+
+import model_registry
+from benchmarks import result_store
+from benchmarks.bench_structured_output import INPUTS, MESSAGES, LibrariesOutput, create_stub_reply
+from benchmarks.fake_chat_model import FakeChatModel
+from benchmarks.ollama_stub import OllamaStubServer
+from benchmarks.stats import percentile
+from streaming_parser import StreamingListParser
+
+# offline microbenchmarks of the hot paths, stored per commit in benchmarks/results/hot_paths.jsonl
+#
+# - conversation_ask: one turn of Conversation.ask with a tool call (two model calls, fake model)
+# - sliding_window: chat_with_sliding_window of 6_..._sliding_window.py against the Ollama stand-in
+#   (ChatOllama, HTTP and JSON included)
+# - map_chain: the claude / openai / google fan-out of 4_chain_parallel.py with fake models of
+#   --latency seconds each, compared with the sum of the three branches (sequential)
+# - the output parsers on a LibrariesOutput answer
+# Values are p50 milliseconds per call (lower is better). After the run, the values are compared
+# with the latest stored run of another commit.
+#
+# run with:
+#   python -m benchmarks.bench_hot_paths
+#   python -m benchmarks.result_store hot_paths --baseline <commit>
+
+RESULTS_NAME = "hot_paths"
+
+# scripts start with a digit, so they can't be imported with a plain import statement
+chatbot = importlib.import_module("8_chatbot_ollama_with_helper_class")
+sliding_window = importlib.import_module("6_conversation_with_helper_function_and_chain_sliding_window")
+
+
+def p50_ms(function: Callable[[], object], repeats: int) -> float:
+    function()  # warm up (imports, first connection, schema conversions)
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return percentile(latencies, 50) * 1000
+
+
+def bench_conversation_ask(repeats: int) -> dict[str, float]:
+    llm = FakeChatModel(tool_call={"name": "get_forecast", "args": {"city": "Paris"}})
+    conversation = chatbot.Conversation(use_tools=True, llm=llm)
+
+    def ask():
+        conversation.ask("What kind of clothes do I need for a short trip to Paris?")
+        del conversation.chat_history[1:]  # same history length in every repeat
+
+    return {"conversation_ask_p50_ms": p50_ms(ask, repeats)}
+
+
+def bench_sliding_window(repeats: int) -> dict[str, float]:
+    with OllamaStubServer() as server:
+        os.environ["OLLAMA_HOST"] = server.url
+        model_registry.clear()  # the shared ChatOllama is created against the stub
+        chat_history = []
+        value = p50_ms(lambda: sliding_window.chat_with_sliding_window("And Sweden?", chat_history, debug=False), repeats)
+        model_registry.clear()
+    return {"sliding_window_p50_ms": value}
+
+
+def bench_map_chain(repeats: int, latency: float) -> dict[str, float]:
+    prompt_template = ChatPromptTemplate.from_messages(MESSAGES)
+    parser = PydanticOutputParser(pydantic_object=LibrariesOutput)
+    prompt_template = prompt_template.partial(format_instructions=parser.get_format_instructions())
+    reply = create_stub_reply()({"format": "json"})  # valid JSON
+    branches = {name: prompt_template | FakeChatModel(latency=latency, reply=reply) | parser
+                for name in ("claude", "openai", "google")}
+    map_chain = RunnableParallel(**branches)
+
+    repeats = max(1, repeats // 10)
+    return {
+        "map_chain_parallel_p50_ms": p50_ms(lambda: map_chain.invoke(INPUTS), repeats),
+        "map_chain_sequential_p50_ms": p50_ms(lambda: [branch.invoke(INPUTS) for branch in branches.values()], repeats),
+    }
+
+
+def bench_parsers(repeats: int) -> dict[str, float]:
+    answer = create_stub_reply()({"format": "json"})
+    markdown_answer = AIMessage(content=f"Here are the libraries:\n```json\n{answer}\n```")
+    names = ", ".join(library["name"] for library in json.loads(answer)["libraries"])
+    parsers = {
+        "parser_pydantic_p50_ms": (PydanticOutputParser(pydantic_object=LibrariesOutput), markdown_answer),
+        "parser_streaming_list_p50_ms": (StreamingListParser(pydantic_object=LibrariesOutput), markdown_answer),
+        "parser_json_p50_ms": (JsonOutputParser(), markdown_answer),
+        "parser_list_p50_ms": (CommaSeparatedListOutputParser(), AIMessage(content=names)),
+        "parser_str_p50_ms": (StrOutputParser(), markdown_answer),
+    }
+    return {name: p50_ms(lambda: parser.invoke(message), repeats) for name, (parser, message) in parsers.items()}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Offline microbenchmarks of the hot paths.")
+    arg_parser.add_argument("--repeats", type=int, default=200)
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake model call of map_chain")
+    arg_parser.add_argument("--no-store", action="store_true", help="don't store the results")
+    args = arg_parser.parse_args()
+
+    values = {
+        **bench_conversation_ask(args.repeats),
+        **bench_sliding_window(args.repeats),
+        **bench_map_chain(args.repeats, args.latency),
+        **bench_parsers(args.repeats),
+    }
+    for name, value in values.items():
+        print(f"{name:<36} {value:10.3f}")
+
+    if not args.no_store:
+        current = result_store.record(RESULTS_NAME, values)
+        baseline = result_store.find_baseline(result_store.load(RESULTS_NAME), current)
+        if baseline is not None:
+            print()
+            result_store.compare(current, baseline)
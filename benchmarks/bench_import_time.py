@@ -0,0 +1,100 @@
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+# cold-start import time of the helper modules, measured with `python -X importtime`
+#
+# Each module is imported in a fresh interpreter. The benchmark reports the cumulative import
+# time and fails (exit code 1) if
+# - a helper module imports a provider SDK at module level (they have to be loaded lazily by
+#   model_registry, on first use)
+# - creating a client from a spec imports another provider's SDK than the requested one
+# - a module takes longer than --budget-ms to import
+# Times vary between machines, the budget is a guard against regressions (e.g. a new top-level
+# import of langchain_anthropic takes a second or more), not a precise target.
+#
+# run with:
+#   python -m benchmarks.bench_import_time
+#   python -m benchmarks.bench_import_time --budget-ms 1500
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROVIDER_SDKS = ("langchain_anthropic", "langchain_openai", "langchain_google_genai", "langchain_groq", "langchain_ollama")
+
+HELPER_MODULES = [
+    "model_registry", "response_cache", "rate_limiter", "prompt_caching", "structured_output", "streaming_parser",
+    "consolidation", "metrics", "hedging", "batch_runner", "memory", "conversation_store", "compact_history",
+    "transcript_export", "tool_cache", "tool_runner", "streaming", "tools",
+]
+
+# (statement, the only provider SDK it may import)
+SPEC_CHECKS = [
+    ("import model_registry; model_registry.get_chat_model_from_spec('ollama:llama3.1')", "langchain_ollama"),
+]
+
+DEFAULT_BUDGET_MS = 2000.0
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(statement: str) -> list[tuple[str, int, int]]:
+    """(module, nesting level, cumulative import time in microseconds) of every module imported by the statement."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    times = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            times.append((match.group(4), len(match.group(3)) // 2, int(match.group(2))))
+    return times
+
+
+def package_time(times: list[tuple[str, int, int]], package: str) -> float:
+    """Milliseconds spent importing the package (and its submodules) at the top level of the statement."""
+    return sum(cumulative for module, level, cumulative in times
+               if level == 0 and (module == package or module.startswith(package + "."))) / 1000
+
+
+def imported_sdks(times: list[tuple[str, int, int]]) -> list[str]:
+    # a package can show up only with its submodules (e.g. if its __init__ imports them lazily)
+    modules = {module for module, _, _ in times}
+    return [sdk for sdk in PROVIDER_SDKS if any(module == sdk or module.startswith(sdk + ".") for module in modules)]
+
+
+def check_module(module: str, budget_ms: float) -> list[str]:
+    times = import_times(f"import {module}")
+    total_ms = package_time(times, module)
+    providers = imported_sdks(times)
+    print(f"{module:<20} {total_ms:8.1f} ms   provider SDKs: {', '.join(providers) or '-'}")
+
+    problems = [f"{module} imports {sdk} at module level" for sdk in providers]
+    if total_ms > budget_ms:
+        problems.append(f"{module} takes {total_ms:.0f} ms to import (budget: {budget_ms:.0f} ms)")
+    return problems
+
+
+def check_spec(statement: str, allowed_sdk: str) -> list[str]:
+    times = import_times(statement)
+    providers = imported_sdks(times)
+    print(f"{statement}\n{'':<20} {package_time(times, allowed_sdk):8.1f} ms   provider SDKs: {', '.join(providers)}")
+    return [f"'{statement}' imports {sdk}" for sdk in providers if sdk != allowed_sdk]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time of the helper modules.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="maximum import time per module")
+    args = parser.parse_args()
+
+    problems = []
+    for module in HELPER_MODULES:
+        problems += check_module(module, args.budget_ms)
+    print()
+    for statement, allowed_sdk in SPEC_CHECKS:
+        problems += check_spec(statement, allowed_sdk)
+
+    if problems:
+        print("\nFAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("\nOK")
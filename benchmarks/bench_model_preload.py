@@ -0,0 +1,80 @@
+import argparse
+import os
+import time
+
+from langchain_core.messages import HumanMessage
+
+import model_registry
+import streaming
+from benchmarks.ollama_stub import OllamaStubServer
+
+# load time paid by the user turns, with and without preloading and keep_alive
+#
+# The Ollama stand-in takes `--load-time` seconds to load a model that isn't loaded and reports it
+# as load_duration. Every scenario sends `--turns` streamed turns with `--pause` seconds of user
+# think time in between, against a fresh server (model not loaded):
+# - cold start: the first turn loads the model
+# - preload: model_registry.preload() at startup and the OLLAMA_KEEP_ALIVE policy, which outlasts
+#   the pauses, no turn loads the model
+# - preload with a short keep_alive: the model is unloaded during every pause (e.g. Ollama's default
+#   of 5 minutes with longer pauses), every turn after the first loads it again
+# Reported per turn: total time and the part of it spent loading the model (TurnMetrics.load_time).
+#
+# run with:
+#   python -m benchmarks.bench_model_preload --load-time 2
+
+MODEL = "llama3.1"
+QUESTIONS = ["What should I pack for Paris?", "And for Stockholm?", "And for Madrid?", "And for Berlin?"]
+
+
+def run(turns: int, load_time: float, latency: float, pause: float, keep_alive: str, preload: bool) -> None:
+    os.environ["OLLAMA_KEEP_ALIVE"] = keep_alive
+    with OllamaStubServer(latency=latency, load_time=load_time) as server:
+        os.environ["OLLAMA_HOST"] = server.url
+        model_registry.clear()  # new client against this server, with this keep_alive
+        start = time.perf_counter()
+        if preload:
+            model_registry.preload([f"ollama:{MODEL}"], temperature=0)
+        startup = time.perf_counter() - start
+
+        llm = model_registry.get_chat_model("ollama", MODEL, temperature=0)
+        chat_history = []
+        rows = []
+        for turn in range(turns):
+            if turn:
+                time.sleep(pause)
+            chat_history.append(HumanMessage(content=QUESTIONS[turn % len(QUESTIONS)]))
+            tokens = streaming.stream_turn(llm, chat_history)
+            while True:
+                try:
+                    next(tokens)
+                except StopIteration as stop:
+                    rows.append(stop.value)
+                    break
+        model_registry.clear()
+
+    print(f"  startup {startup:.2f}s, model loads: {server.loads}")
+    for turn, metrics in enumerate(rows, 1):
+        print(f"  turn {turn}: total {metrics.total_time * 1000:8.1f} ms   model load {metrics.load_time * 1000:8.1f} ms   "
+              f"generation {(metrics.total_time - metrics.load_time) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load time paid by the user turns.")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--load-time", type=float, default=1.0, help="seconds to load the model")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds between turns")
+    args = parser.parse_args()
+
+    # the short keep_alive stands in for a keep_alive shorter than the pauses between turns
+    short_keep_alive = f"{args.pause / 2}s"
+    scenarios = [
+        ("cold start", model_registry.OLLAMA_KEEP_ALIVE, False),
+        (f"preload, keep_alive {model_registry.OLLAMA_KEEP_ALIVE}", model_registry.OLLAMA_KEEP_ALIVE, True),
+        (f"preload, keep_alive {short_keep_alive}", short_keep_alive, True),
+    ]
+    print(f"---- {args.turns} turns, model load {args.load_time:.1f}s, {args.pause:.1f}s between turns ----")
+    for name, keep_alive, preload in scenarios:
+        print(f"{name}:")
+        run(args.turns, args.load_time, args.latency, args.pause, keep_alive, preload)
@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import tool
+from langchain_ollama import ChatOllama
+
+import model_registry
+from benchmarks.ollama_stub import OllamaStubServer
+
+# per-turn overhead of building a fresh ChatOllama + bind_tools() on every message
+# compared with the shared clients of model_registry, measured against a local Ollama stand-in
+#
+# run with:
+#   python -m benchmarks.bench_model_registry
+
+MODEL = "llama3.1"
+TURNS = 200
+
+
+@tool
+def get_forecast(city: str) -> str:
+    """Get weather forecast for a specified city.
+
+    Args:
+        city: The name of the city to get the forecast for
+
+    Returns:
+        Weather forecast information as a string
+    """
+    return f"Temperature: 20°C, Conditions: Sunny, Wind: 10 km/h in {city}"
+
+
+def turn_with_fresh_client(base_url: str, messages: list) -> None:
+    llm = ChatOllama(model=MODEL, temperature=0, base_url=base_url)
+    llm_with_tools = llm.bind_tools([get_forecast])
+    llm_with_tools.invoke(messages)
+
+
+def turn_with_registry(base_url: str, messages: list) -> None:
+    llm_with_tools = model_registry.get_chat_model_with_tools(
+        "ollama", MODEL, [get_forecast], temperature=0, base_url=base_url
+    )
+    llm_with_tools.invoke(messages)
+
+
+def measure(name: str, turn, server: OllamaStubServer, turns: int = TURNS) -> list[float]:
+    messages = [HumanMessage(content="What kind of clothes do I need for a short trip to Paris?")]
+    connections_before = server.connections
+
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        turn(server.url, messages)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{name:<20} mean: {statistics.mean(timings) * 1000:7.3f} ms   "
+          f"p50: {statistics.median(timings) * 1000:7.3f} ms   "
+          f"connections: {server.connections - connections_before}")
+    return timings
+
+
+if __name__ == "__main__":
+    with OllamaStubServer() as server:
+        # warm up imports and the registry once, so only the per-turn cost is measured
+        turn_with_fresh_client(server.url, [HumanMessage(content="hi")])
+        turn_with_registry(server.url, [HumanMessage(content="hi")])
+
+        print(f"---- Per-turn overhead over {TURNS} turns ----")
+        before = measure("fresh client", turn_with_fresh_client, server)
+        after = measure("model registry", turn_with_registry, server)
+
+        saved = statistics.mean(before) - statistics.mean(after)
+        print(f"\nsaved per turn: {saved * 1000:.3f} ms")
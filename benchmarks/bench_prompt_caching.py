@@ -0,0 +1,60 @@
+import importlib
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import HumanMessage
+
+import model_registry
+import prompt_caching
+from benchmarks.anthropic_stub import AnthropicStubServer
+
+# offline check of Anthropic prompt caching for the travel assistant of 5_tools_with_system_prompt.py
+#
+# The same chat (system prompt, get_forecast tool, three questions) runs against a local stand-in
+# of the Anthropic API, once as is and once through prompt_caching.with_prompt_caching(). The
+# outgoing payloads are inspected for cache_control breakpoints, the cached and uncached input
+# tokens come from the usage_metadata of the responses (tokens are counted as words by the stub).
+#
+# run with:
+#   python -m benchmarks.bench_prompt_caching
+
+# scripts start with a digit, so they can't be imported with a plain import statement
+travel_assistant = importlib.import_module("5_tools_with_system_prompt")
+
+MODEL = "claude-sonnet-4-5-20250929"
+QUESTIONS = [
+    "What kind of clothes do I need for a short trip to Paris?",
+    "And for London?",
+    "Thanks, anything else I should bring?",
+]
+
+
+def run_chat(llm, server: AnthropicStubServer) -> None:
+    chat_history = [travel_assistant.SystemMessage(content=travel_assistant.SYSTEM_PROMPT)]
+    for turn, question in enumerate(QUESTIONS, start=1):
+        chat_history.append(HumanMessage(content=question))
+        response = llm.invoke(chat_history)
+        chat_history.append(response)
+
+        payload = server.requests[-1]
+        breakpoints = sum(
+            "cache_control" in block
+            for part in [payload.get("system") or []] + [message["content"] for message in payload["messages"]]
+            if isinstance(part, list)
+            for block in part
+        )
+        usage = prompt_caching.cache_usage(response)
+        print(f"turn {turn}   breakpoints in payload: {breakpoints}   cache read: {usage['cache_read']:4d}   "
+              f"cache write: {usage['cache_creation']:4d}   uncached: {usage['uncached']:4d}")
+
+
+if __name__ == "__main__":
+    with AnthropicStubServer() as server:
+        llm = ChatAnthropic(model=MODEL, base_url=server.url, api_key="stub", max_retries=0)
+        llm_with_tools = model_registry.bind_tools(llm, [travel_assistant.get_forecast])
+
+        print("---- without prompt caching ----")
+        run_chat(llm_with_tools, server)
+
+        print("\n---- with prompt caching (system prompt and conversation) ----")
+        run_chat(prompt_caching.with_prompt_caching(llm_with_tools, cache_conversation=True), server)
+        print(f"\n{prompt_caching.stats()}")
@@ -0,0 +1,88 @@
+import argparse
+import importlib
+import os
+import statistics
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+import model_registry
+from benchmarks.ollama_stub import OllamaStubServer
+from memory import TokenWindowMemory
+
+# prompt evaluation per turn of the sliding windows of 6_..._sliding_window.py
+#
+# The Ollama stand-in keeps the previous prompt and only evaluates the tokens after the shared
+# prefix (like Ollama's prompt cache), at --prompt-tokens-per-second. Every strategy runs --turns
+# turns of a fresh conversation:
+# - sliding window: chat_history[-MAX_HISTORY:], the prefix shifts by one turn on every call
+# - chunked window: prefix_stable_window(), the window start moves EVICT_CHUNK messages at a time
+# - token window, without and with evict_to (the same two behaviors with a token budget)
+# Reported: prompt_eval_count and prompt_eval_duration per turn from the response metadata, and the
+# messages sent as history (how much context the window keeps).
+#
+# run with:
+#   python -m benchmarks.bench_prompt_prefix --turns 40
+
+# scripts start with a digit, so they can't be imported with a plain import statement
+sliding_window = importlib.import_module("6_conversation_with_helper_function_and_chain_sliding_window")
+
+ANSWER = ("Stockholm is the capital of Sweden. It is built on fourteen islands where Lake Malaren meets "
+          "the Baltic Sea, and is known for its old town, its museums and its many parks and bridges.")
+
+
+class PromptEvalRecorder(BaseCallbackHandler):
+    """Collects the prompt evaluation stats of the Ollama responses."""
+
+    def __init__(self):
+        self.counts: list[int] = []
+        self.durations: list[float] = []
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        metadata = response.generations[0][0].message.response_metadata
+        self.counts.append(metadata.get("prompt_eval_count", 0))
+        self.durations.append(metadata.get("prompt_eval_duration", 0) / 1e9)
+
+
+def run(name: str, chat: Callable[[str], object], turns: int, prompt_tokens_per_second: float) -> None:
+    with OllamaStubServer(reply=ANSWER, prompt_tokens_per_second=prompt_tokens_per_second, prompt_cache=True) as server:
+        os.environ["OLLAMA_HOST"] = server.url
+        model_registry.clear()  # the shared ChatOllama is created against the stub
+        recorder = PromptEvalRecorder()
+        model_registry.get_chat_model("ollama", sliding_window.MODEL).callbacks = [recorder]
+        for turn in range(turns):
+            chat(f"What is the capital of country number {turn}?")
+        model_registry.clear()
+
+    # the first turn evaluates the whole prompt with every strategy
+    counts, durations = recorder.counts[1:], recorder.durations[1:]
+    history_sizes = [len(request["messages"]) - 2 for request in server.requests]  # without system prompt and question
+    print(f"{name:<28} {statistics.mean(counts):8.1f} {max(counts):6d} {statistics.median(durations) * 1000:9.1f} "
+          f"{statistics.mean(durations) * 1000:9.1f} {sum(durations):8.2f}s {statistics.mean(history_sizes):9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt evaluation per turn of the sliding windows.")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--max-tokens", type=int, default=300, help="budget of the token windows")
+    args = parser.parse_args()
+
+    print(f"---- {args.turns} turns, {args.prompt_tokens_per_second:.0f} prompt tokens/s, "
+          f"MAX_HISTORY {sliding_window.MAX_HISTORY}, EVICT_CHUNK {sliding_window.EVICT_CHUNK} ----")
+    print(f"{'':<28} {'prompt_eval_count':>15} {'prompt_eval_duration ms':>20} {'total':>9} {'history':>9}")
+    print(f"{'':<28} {'mean':>8} {'max':>6} {'p50':>9} {'mean':>9} {'':>9} {'messages':>9}")
+    strategies = {
+        "sliding window": partial(sliding_window.chat_with_sliding_window, chat_history=[], debug=False),
+        "chunked window": partial(sliding_window.chat_with_chunked_window, chat_history=[], debug=False),
+        "token window": partial(sliding_window.chat_with_token_window, debug=False,
+                                memory=TokenWindowMemory(max_tokens=args.max_tokens)),
+        f"token window, evict_to {args.max_tokens // 2}": partial(
+            sliding_window.chat_with_token_window, debug=False,
+            memory=TokenWindowMemory(max_tokens=args.max_tokens, evict_to=args.max_tokens // 2)),
+    }
+    for name, chat in strategies.items():
+        run(name, chat, args.turns, args.prompt_tokens_per_second)
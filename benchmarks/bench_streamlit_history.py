@@ -0,0 +1,54 @@
+import statistics
+import time
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from streamlit.testing.v1 import AppTest
+
+# page render time of x_chatbot_ollama_with_streamlit.py for growing sessions
+#
+# The session is seeded with N turns (question, tool call, tool result, answer). The first run
+# prepares the render blocks of all messages, the following reruns should take about the same
+# time for 10 and for 500 turns. No model is called, only the page is rendered.
+#
+# run with:
+#   python -m benchmarks.bench_streamlit_history
+
+APP = str(Path(__file__).resolve().parent.parent / "x_chatbot_ollama_with_streamlit.py")
+SESSION_TURNS = [10, 100, 500]
+RERUNS = 5
+
+
+def create_history(turns: int) -> list:
+    messages = [SystemMessage(content="You are a helpful travel assistant.")]
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"What kind of clothes do I need for trip number {turn}?"))
+        messages.append(AIMessage(content="", tool_calls=[
+            {"name": "get_forecast", "args": {"city": "Paris"}, "id": f"call_{turn}", "type": "tool_call"}
+        ]))
+        messages.append(ToolMessage(content="Temperature: 18°C, Conditions: Partly cloudy", tool_call_id=f"call_{turn}"))
+        messages.append(AIMessage(content="**Pack layers:**\n\n* a light jacket\n* a sweater\n* comfortable shoes"))
+    return messages
+
+
+def measure(turns: int) -> tuple[float, float]:
+    app = AppTest.from_file(APP, default_timeout=60)
+    app.session_state["messages"] = create_history(turns)
+
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+
+    timings = []
+    for _ in range(RERUNS):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+    return first_run, statistics.median(timings)
+
+
+if __name__ == "__main__":
+    print("---- Page render time ----")
+    for turns in SESSION_TURNS:
+        first_run, rerun = measure(turns)
+        print(f"{turns:4d} turns   first run: {first_run * 1000:8.1f} ms   rerun (median): {rerun * 1000:8.1f} ms")
@@ -0,0 +1,123 @@
+import argparse
+import json
+import random
+import time
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
+
+import model_registry
+import structured_output
+from benchmarks.ollama_stub import OllamaStubServer
+from benchmarks.stats import format_latencies
+
+# prompt tokens, latency and parse failures of the two structured output modes
+#
+# The LibrariesOutput request of 3_fundamentals_output_parser_pydantic.py runs `--runs` times
+# per mode: "prompt" (JSON schema in the prompt, PydanticOutputParser) and "native" (the
+# provider's structured output). Prompt tokens are taken from usage_metadata.
+#
+# By default it runs against a real model (for ollama: a local server with the model pulled).
+# With --stub it runs offline against the Ollama stand-in: a native request (JSON schema in
+# `format`) is answered with valid JSON, a free text request gets prose around the JSON and,
+# in SIMULATED_FAILURE_SHARE of the answers, a truncated object. The stub checks the wiring
+# and the prompt token difference, only a real model gives real failure rates.
+#
+# run with:
+#   python -m benchmarks.bench_structured_output --stub
+#   python -m benchmarks.bench_structured_output --provider ollama --model llama3.1 --runs 20
+
+SIMULATED_FAILURE_SHARE = 0.1
+
+
+class LibraryOutput(BaseModel):
+    name: str = Field(description="name of a library")
+    provider: str = Field(description="provider of the library")
+    url: str = Field(description="URL of the library")
+    language: str = Field(description="programming language of the library")
+    version: str = Field(description="version of the library")
+
+
+class LibrariesOutput(BaseModel):
+    libraries: list[LibraryOutput] = Field(description="list of libraries")
+
+
+MESSAGES = [
+    ("system", "What are the most popular programming libraries for accessing LLMs?  Please use the following schema {format_instructions}"),
+    ("user", "Programming Language: {programming_language}, Number of Libraries: {library_count}"),
+]
+INPUTS = {"programming_language": "Python", "library_count": 5}
+
+
+class PromptTokenCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.prompt_tokens: list[int] = []
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens.append(usage["input_tokens"])
+
+
+def create_stub_reply(seed: int = 0):
+    random_generator = random.Random(seed)
+    answer = json.dumps(LibrariesOutput(libraries=[
+        LibraryOutput(name=name, provider=provider, url=f"https://pypi.org/project/{name}", language="Python", version="1.0")
+        for name, provider in [("langchain", "LangChain"), ("openai", "OpenAI"), ("anthropic", "Anthropic"),
+                               ("google-genai", "Google"), ("ollama", "Ollama")]
+    ]).model_dump())
+
+    def reply(request: dict) -> str:
+        if request.get("format"):
+            return answer  # constrained decoding
+        if random_generator.random() < SIMULATED_FAILURE_SHARE:
+            return f"Here are the libraries: {answer[:len(answer) // 2]}"
+        return f"Here are the libraries:\n```json\n{answer}\n```"
+
+    return reply
+
+
+def measure(llm, mode: str, runs: int) -> None:
+    counter = PromptTokenCounter()
+    chain = structured_output.create_chain(ChatPromptTemplate.from_messages(MESSAGES), llm, LibrariesOutput, mode=mode)
+    latencies = []
+    failures = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            chain.invoke(INPUTS, config={"callbacks": [counter]})
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+
+    prompt_tokens = sum(counter.prompt_tokens) / len(counter.prompt_tokens) if counter.prompt_tokens else 0
+    print(f"{mode:<7} prompt tokens: {prompt_tokens:7.1f}   parse failures: {failures:3d}/{runs} "
+          f"({failures / runs:5.1%})   {format_latencies(latencies)}")
+
+
+def compare_modes(llm, name: str, runs: int) -> None:
+    print(f"---- {name}, {runs} requests per mode ----")
+    for mode in ("prompt", "native"):
+        measure(llm, mode, runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the structured output modes.")
+    parser.add_argument("--provider", default="ollama")
+    parser.add_argument("--model", default="llama3.1")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--stub", action="store_true", help="run offline against the Ollama stand-in")
+    args = parser.parse_args()
+
+    if args.stub:
+        with OllamaStubServer(reply=create_stub_reply(), latency=0.01) as server:
+            llm = model_registry.get_chat_model("ollama", args.model, base_url=server.url)
+            compare_modes(llm, "ollama stub", args.runs)
+    else:
+        compare_modes(model_registry.get_chat_model(args.provider, args.model), f"{args.provider}/{args.model}", args.runs)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import PrivateAttr
+
+# deterministic stand-in for a chat model, so benchmarks run without any LLM endpoint
+#
+# - every call waits `latency` seconds (time to first token) and then answers `reply`
+# - with `tokens_per_second`, generating the answer takes one word per 1 / tokens_per_second
+#   seconds on top (streamed word by word with stream() / astream())
+# - if `tool_call` is set, a turn starting with a HumanMessage first gets an AIMessage
+#   requesting that tool call, the answer follows after the ToolMessage
+# - `script` replaces both: the calls get its answers in order (a string, an AIMessage or a dict
+#   of AIMessage fields, e.g. {"tool_calls": [...]}), starting over after the last one
+#
+# usage:
+#   llm = FakeChatModel(latency=0.05, tool_call={"name": "get_forecast", "args": {"city": "Paris"}})
+#   llm = FakeChatModel(tokens_per_second=50, script=[{"tool_calls": [...]}, "Pack light clothes."])
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0
+    tokens_per_second: float = 0.0  # 0: the whole answer at once
+    reply: str = "Pack light clothes, it is sunny."
+    tool_call: dict | None = None
+    script: list[Any] | None = None  # str, dict of AIMessage fields or AIMessage
+
+    _calls: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        # the scripted answers don't depend on the tools
+        return self
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                  run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        message = self._next_message(messages)
+        delay = self.latency + self._generation_time(message)
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                         run_manager: AsyncCallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        message = self._next_message(messages)
+        delay = self.latency + self._generation_time(message)
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        message = self._next_message(messages)
+        if self.latency:
+            time.sleep(self.latency)
+        for chunk in self._chunks(message):
+            if self.tokens_per_second and chunk.message.content:
+                time.sleep(1 / self.tokens_per_second)
+            if run_manager and chunk.message.content:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                       run_manager: AsyncCallbackManagerForLLMRun | None = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._next_message(messages)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self._chunks(message):
+            if self.tokens_per_second and chunk.message.content:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    def _next_message(self, messages: list[BaseMessage]) -> AIMessage:
+        with self._lock:
+            call = self._calls
+            self._calls += 1
+
+        if self.script:
+            message = _to_message(self.script[call % len(self.script)], call)
+        elif self.tool_call and isinstance(messages[-1], HumanMessage):
+            message = AIMessage(
+                content="",
+                tool_calls=[{**self.tool_call, "id": f"call_{len(messages)}", "type": "tool_call"}],
+            )
+        else:
+            message = AIMessage(content=self.reply)
+
+        input_tokens = sum(len(str(message.content).split()) for message in messages)
+        output_tokens = max(1, len(str(message.content).split()))
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _generation_time(self, message: AIMessage) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(str(message.content).split()) / self.tokens_per_second
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        # one chunk per word, the tool calls and the usage come with the last chunk
+        words = str(message.content).split(" ") if message.content else []
+        for index, word in enumerate(words):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if index == 0 else " " + word))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+        ))
+
+
+def _to_message(answer: str | dict | AIMessage, call: int) -> AIMessage:
+    if isinstance(answer, AIMessage):
+        return answer.model_copy(deep=True)
+    if isinstance(answer, str):
+        return AIMessage(content=answer)
+    fields = {"content": "", **answer}
+    fields["tool_calls"] = [
+        {"id": f"call_{call}_{index}", "type": "tool_call", **tool_call}
+        for index, tool_call in enumerate(fields.get("tool_calls", []))
+    ]
+    return AIMessage(**fields)
+
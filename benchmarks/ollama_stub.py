@@ -0,0 +1,236 @@
+import json
+import re
+import socket
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# local stand-in for an Ollama server, so ChatOllama can be measured without a real model
+#
+# It speaks just enough of the Ollama HTTP API (/api/chat, /api/generate, /api/tags, /api/version) for
+# ChatOllama to work against it. Every chat request is answered with a fixed reply (or the
+# reply of a function of the request) after an optional artificial latency. A reply function
+# can also return a message dict with tool calls, {"content": "", "tool_calls": [{"name": ..., "args": {...}}]}.
+# With `tokens_per_second`, the words of a streamed reply are sent at that rate.
+# With `load_time`, a request for a model that isn't loaded first waits that long and reports it as
+# load_duration, like Ollama loading the weights. A model stays loaded for the request's keep_alive
+# (default 5 minutes, as Ollama); /api/generate without a prompt only loads the model.
+# The whole prompt is evaluated (prompt_eval_count, one word is one token) at `prompt_tokens_per_second`
+# (prompt_eval_duration, before the first token). With `prompt_cache`, like Ollama's prompt cache, only
+# the part of the prompt after the longest prefix shared with the previous request is evaluated.
+#
+# usage:
+#   with OllamaStubServer(latency=0.01) as server:
+#       llm = ChatOllama(model="llama3.1", base_url=server.url)
+
+
+class OllamaStubServer:
+    def __init__(self, reply: str | Callable[[dict], str | dict] = "Pack light clothes, it is sunny.",
+                 latency: float = 0.0, tokens_per_second: float = 0.0, load_time: float = 0.0,
+                 prompt_tokens_per_second: float = 0.0, prompt_cache: bool = False,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.reply = reply
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.load_time = load_time
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.prompt_cache = prompt_cache
+        self._cached_prompts: dict[str, list[str]] = {}  # model -> tokens of the previous prompt
+        self.loads = 0
+        self._loaded: dict[str, float] = {}  # model -> time.monotonic() when it gets unloaded
+        self._load_lock = threading.Lock()
+        self.requests: list[dict] = []
+        self.connections = 0
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OllamaStubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def load(self, model: str, keep_alive: float | str | None) -> float:
+        """Load the model unless it is loaded, returns the seconds spent loading."""
+        with self._load_lock:
+            now = time.monotonic()
+            load_time = 0.0
+            if self._loaded.get(model, 0.0) <= now:
+                load_time = self.load_time
+                self.loads += 1
+                if load_time:
+                    time.sleep(load_time)
+            self._loaded[model] = time.monotonic() + _keep_alive_seconds(keep_alive)
+            return load_time
+
+    def is_loaded(self, model: str) -> bool:
+        return self._loaded.get(model, 0.0) > time.monotonic()
+
+    def evaluate_prompt(self, request: dict) -> tuple[int, float]:
+        """(prompt_eval_count, prompt_eval_duration in seconds) of a chat request, with the prompt cache if enabled."""
+        model = request.get("model", "llama3.1")
+        tokens = [token for message in request.get("messages", [])
+                  for token in [f"<{message.get('role')}>", *str(message.get("content", "")).split()]]
+        with self._load_lock:
+            cached = self._cached_prompts.get(model, [])
+            self._cached_prompts[model] = tokens
+        shared = 0
+        for cached_token, token in zip(cached if self.prompt_cache else [], tokens):
+            if cached_token != token:
+                break
+            shared += 1
+        # at least the last token is evaluated, to get the logits for the answer
+        count = max(1, len(tokens) - shared)
+        return count, count / self.prompt_tokens_per_second if self.prompt_tokens_per_second else 0.0
+
+    def chat_response(self, request: dict, load_time: float = 0.0,
+                      prompt_eval: tuple[int, float] = (0, 0.0)) -> list[dict]:
+        """Return the response chunks for a /api/chat request (one chunk if not streaming)."""
+        model = request.get("model", "llama3.1")
+        reply = self.reply(request) if callable(self.reply) else self.reply
+        message = reply if isinstance(reply, dict) else {"content": reply}
+        content = message.get("content", "")
+        words = content.split(" ") if content else []
+        chunks = [
+            _chunk(model, word if index == 0 else " " + word)
+            for index, word in enumerate(words)
+        ]
+        final = _chunk(model, "")
+        if message.get("tool_calls"):
+            # Ollama sends the tool calls as one complete message
+            final["message"]["tool_calls"] = [
+                {"function": {"name": call["name"], "arguments": call.get("args", {})}} for call in message["tool_calls"]
+            ]
+        final.update({
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((load_time + prompt_eval[1] + self.latency) * 1e9),
+            "load_duration": int(load_time * 1e9),
+            "prompt_eval_count": prompt_eval[0],
+            "prompt_eval_duration": int(prompt_eval[1] * 1e9),
+            "eval_count": len(words),
+            "eval_duration": int((self.latency + self.generation_time(len(words))) * 1e9),
+        })
+
+        if not request.get("stream", True):
+            final["message"]["content"] = content
+            return [final]
+        return chunks + [final]
+
+    def generation_time(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+
+def _keep_alive_seconds(keep_alive: float | str | None) -> float:
+    # Ollama's keep_alive: seconds or a duration like "10m", negative keeps the model loaded forever
+    if keep_alive is None:
+        return 300.0
+    if isinstance(keep_alive, str):
+        number, unit = re.fullmatch(r"(-?[\d.]+)(ms|s|m|h)?", keep_alive.strip()).groups()
+        seconds = float(number) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}.get(unit, 1)
+    else:
+        seconds = float(keep_alive)
+    return float("inf") if seconds < 0 else seconds
+
+
+def _chunk(model: str, content: str) -> dict:
+    return {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": False,
+    }
+
+
+def _make_handler(stub: OllamaStubServer):
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 so clients can keep the connection alive between requests
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # headers and body are written separately, don't let Nagle delay the body
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stub.connections += 1
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json({"models": [{"name": "llama3.1:latest", "model": "llama3.1:latest"}]})
+            elif self.path == "/api/version":
+                self._send_json({"version": "0.0.0-stub"})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path == "/api/generate" and not request.get("prompt"):
+                load_time = stub.load(request.get("model", "llama3.1"), request.get("keep_alive"))
+                self._send_json({"model": request.get("model", "llama3.1"),
+                                 "created_at": datetime.now(timezone.utc).isoformat(), "response": "",
+                                 "done": True, "done_reason": "load", "load_duration": int(load_time * 1e9)})
+                return
+            if self.path != "/api/chat":
+                self._send_json({"error": "not found"}, status=404)
+                return
+
+            stub.requests.append(request)
+            load_time = stub.load(request.get("model", "llama3.1"), request.get("keep_alive"))
+            prompt_eval = stub.evaluate_prompt(request)
+            if stub.latency or prompt_eval[1]:
+                time.sleep(stub.latency + prompt_eval[1])
+
+            chunks = stub.chat_response(request, load_time, prompt_eval)
+            if stub.tokens_per_second and len(chunks) > 1:
+                self._send_chunked(chunks)
+                return
+            if stub.tokens_per_second:
+                time.sleep(stub.generation_time(chunks[-1]["eval_count"]))
+            body = b"".join(json.dumps(chunk).encode() + b"\n" for chunk in chunks)
+            self._send(body, "application/x-ndjson")
+
+        def _send_chunked(self, chunks: list[dict]):
+            # one line per token at the configured rate (chunked transfer encoding, like Ollama)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in chunks:
+                if chunk["message"]["content"]:
+                    time.sleep(1 / stub.tokens_per_second)
+                line = json.dumps(chunk).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _send_json(self, data: dict, status: int = 200):
+            self._send(json.dumps(data).encode(), "application/json", status)
+
+        def _send(self, body: bytes, content_type: str, status: int = 200):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,111 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# stored benchmark results, to compare the hot paths between commits
+#
+# Every run of a benchmark appends one line to benchmarks/results/<benchmark>.jsonl (machine specific,
+# ignored by git, the comparisons are meant for runs on the same machine): the git
+# commit (with "-dirty" for uncommitted changes), time, Python version and the measured values
+# (lower is better, e.g. milliseconds). compare() sets a run against the latest run of another
+# commit and flags every value that got more than REGRESSION_THRESHOLD slower.
+#
+# usage:
+#   result_store.record("hot_paths", {"conversation_ask_p50_ms": 0.8, ...})
+#   python -m benchmarks.result_store hot_paths                    # latest run vs the previous commit
+#   python -m benchmarks.result_store hot_paths --baseline 91acc89
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+REGRESSION_THRESHOLD = 0.10
+
+
+def git_commit() -> str:
+    """Short hash of HEAD, with '-dirty' if tracked files have uncommitted changes ('unknown' outside git)."""
+    root = Path(__file__).resolve().parent.parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=root).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def record(benchmark: str, values: dict[str, float]) -> dict:
+    """Append a run of the benchmark to its results file, returns the stored entry."""
+    entry = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "values": values,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    with open(RESULTS_DIR / f"{benchmark}.jsonl", "a", encoding="utf-8") as file:
+        file.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def load(benchmark: str) -> list[dict]:
+    """All stored runs of the benchmark, oldest first."""
+    path = RESULTS_DIR / f"{benchmark}.jsonl"
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def find_baseline(runs: list[dict], current: dict, baseline: str | None = None) -> dict | None:
+    """Latest run of the `baseline` commit, or of the latest other commit than the current run's."""
+    for run in reversed(runs):
+        if run is current:
+            continue
+        if baseline is not None:
+            if run["commit"].startswith(baseline):
+                return run
+        elif run["commit"] != current["commit"]:
+            return run
+    return None
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Print current vs baseline values, returns the names of the values that regressed."""
+    print(f"{'':<36} {baseline['commit']:>14} {current['commit']:>14}")
+    regressions = []
+    for name, value in current["values"].items():
+        old = baseline["values"].get(name)
+        if old is None:
+            print(f"{name:<36} {'-':>14} {value:14.3f}")
+            continue
+        change = (value - old) / old if old else 0.0
+        flag = ""
+        if change > REGRESSION_THRESHOLD:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<36} {old:14.3f} {value:14.3f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def compare_latest(benchmark: str, baseline: str | None = None) -> list[str]:
+    runs = load(benchmark)
+    if not runs:
+        print(f"no stored results for {benchmark}")
+        return []
+    current = runs[-1]
+    baseline_run = find_baseline(runs, current, baseline)
+    if baseline_run is None:
+        print(f"no baseline run for {benchmark} (commit {current['commit']})")
+        return []
+    return compare(current, baseline_run)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare stored benchmark results between commits.")
+    parser.add_argument("benchmark", help="name of the results file, e.g. hot_paths")
+    parser.add_argument("--baseline", help="commit to compare with (default: the latest other commit)")
+    args = parser.parse_args()
+    sys.exit(1 if compare_latest(args.benchmark, args.baseline) else 0)
@@ -0,0 +1,18 @@
+import math
+from collections.abc import Sequence
+
+# small helpers shared by the benchmarks
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0..100) of the values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def format_latencies(values: Sequence[float]) -> str:
+    """'p50: ... ms  p99: ... ms' for latencies given in seconds."""
+    return f"p50: {percentile(values, 50) * 1000:8.2f} ms   p99: {percentile(values, 99) * 1000:8.2f} ms"
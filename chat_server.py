@@ -0,0 +1,344 @@
+import argparse
+import asyncio
+import importlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+import model_registry
+
+# asyncio chat service hosting many Conversation sessions (8_chatbot_ollama_with_helper_class.py)
+#
+# - HTTP: POST /sessions/<id>/messages {"message": "..."} answers {"session_id", "answer", ...}
+#         GET /sessions/<id>, DELETE /sessions/<id>, GET /stats
+# - WebSocket (optional, needs the websockets package): ws://host:<ws-port>/sessions/<id>,
+#   every text frame is a user message, the answer comes back as {"type": "answer", ...}
+#
+# Sessions are created on first use and evicted when idle for `idle_timeout` seconds or when
+# there are more than `max_sessions` (least recently used first, never one with a turn in progress).
+# The turns of one session run strictly one after another, in arrival order.
+# In front of the model backend, at most `max_concurrency` turns run at the same time. Up to
+# `max_queue` more wait (at most `queue_timeout` seconds) for a slot. Beyond that a turn is rejected
+# right away, HTTP 429 with a Retry-After header ({"type": "error", "error": "overloaded"} on the
+# WebSocket), so latency stays bounded instead of growing with the backlog.
+# The Ollama model is loaded at startup (model_registry.preload), so the first turn doesn't pay the load time.
+#
+# usage:
+#   python chat_server.py --port 8080 --ws-port 8081 --max-concurrency 8
+#   curl -X POST localhost:8080/sessions/42/messages -d '{"message": "What should I pack for Paris?"}'
+
+MAX_SESSIONS = 1000
+IDLE_TIMEOUT = 30 * 60.0  # seconds
+MAX_CONCURRENCY = 8  # turns running against the model backend
+MAX_QUEUE = 32  # turns waiting for a slot
+QUEUE_TIMEOUT = 10.0  # seconds
+MAX_PENDING_PER_SESSION = 4  # turns of one session waiting for its previous turn
+MAX_BODY_BYTES = 64 * 1024
+SWEEP_INTERVAL = 30.0  # seconds between idle session sweeps
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class Overloaded(Exception):
+    """The turn was rejected, the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionControl:
+    """Concurrency cap with a bounded wait queue in front of the model backend."""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._turn_duration = 1.0  # moving average in seconds, for Retry-After
+
+    async def acquire(self) -> float:
+        """Wait for a slot, returns the seconds waited. Raises Overloaded if the queue is full or too slow."""
+        if self.in_flight >= self.max_concurrency and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("overloaded", self.retry_after())
+
+        start = time.perf_counter()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            self.timed_out += 1
+            raise Overloaded("queue timeout", self.retry_after()) from None
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        return time.perf_counter() - start
+
+    def release(self, duration: float) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+        self._turn_duration = 0.9 * self._turn_duration + 0.1 * duration
+
+    def retry_after(self) -> float:
+        # time until the current backlog has been worked off (the Retry-After header rounds it up to seconds)
+        return max(0.1, (self.queued + self.in_flight) / self.max_concurrency * self._turn_duration)
+
+    def stats(self) -> dict[str, Any]:
+        return {"in_flight": self.in_flight, "queued": self.queued, "rejected": self.rejected,
+                "timed_out": self.timed_out, "turn_duration": round(self._turn_duration, 3)}
+
+
+@dataclass
+class Session:
+    conversation: Any
+    last_used: float = field(default_factory=time.monotonic)
+    pending: int = 0  # turns received and not answered yet
+    turns: int = 0
+    # asyncio.Lock wakes up its waiters in FIFO order: the turns run in arrival order
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ChatService:
+    """Sessions by id with LRU eviction, per-session turn ordering and admission control."""
+
+    def __init__(self, create_conversation: Callable[[], Any], max_sessions: int = MAX_SESSIONS,
+                 idle_timeout: float = IDLE_TIMEOUT, admission: AdmissionControl | None = None,
+                 max_pending_per_session: int = MAX_PENDING_PER_SESSION):
+        self.create_conversation = create_conversation
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.admission = admission or AdmissionControl()
+        self.max_pending_per_session = max_pending_per_session
+        self.evictions = 0
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def session(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(conversation=self.create_conversation())
+            self._sessions[session_id] = session
+            self._evict_lru(keep=session_id)
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    async def ask(self, session_id: str, message: str) -> dict[str, Any]:
+        session = self.session(session_id)
+        if session.pending >= self.max_pending_per_session:
+            self.admission.rejected += 1
+            raise Overloaded("too many pending turns in this session", self.admission.retry_after())
+
+        session.pending += 1
+        try:
+            async with session.lock:
+                queue_wait = await self.admission.acquire()
+                start = time.perf_counter()
+                history_length = len(session.conversation.chat_history)
+                try:
+                    answer = await session.conversation.aask(message)
+                except BaseException:
+                    # roll back the partial turn (the question at least), so a retry doesn't ask it twice
+                    del session.conversation.chat_history[history_length:]
+                    raise
+                finally:
+                    self.admission.release(time.perf_counter() - start)
+                session.turns += 1
+                return {"session_id": session_id, "answer": answer, "turn": session.turns,
+                        "queue_wait_ms": round(queue_wait * 1000, 1),
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+        finally:
+            session.pending -= 1
+            session.last_used = time.monotonic()
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def describe(self, session_id: str) -> dict[str, Any] | None:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        return {"session_id": session_id, "turns": session.turns, "pending": session.pending,
+                "messages": len(session.conversation.chat_history),
+                "idle_seconds": round(time.monotonic() - session.last_used, 1)}
+
+    def evict_idle(self) -> int:
+        deadline = time.monotonic() - self.idle_timeout
+        idle = [session_id for session_id, session in self._sessions.items()
+                if session.last_used < deadline and not session.pending]
+        for session_id in idle:
+            del self._sessions[session_id]
+        self.evictions += len(idle)
+        return len(idle)
+
+    def stats(self) -> dict[str, Any]:
+        return {"sessions": len(self._sessions), "evictions": self.evictions, **self.admission.stats()}
+
+    def _evict_lru(self, keep: str) -> None:
+        # oldest first, a session with a turn in progress (or queued) and the new session `keep` stay:
+        # if all others are busy, there are more than max_sessions until one of them is done
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                return
+            if session_id != keep and not self._sessions[session_id].pending:
+                del self._sessions[session_id]
+                self.evictions += 1
+
+
+# --- HTTP
+
+async def handle_http(service: ChatService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                _write_response(writer, 413, {"error": "request body too large"}, keep_alive=False)
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            status, payload, extra_headers = await route(service, method, urlsplit(target).path, body)
+            keep_alive = headers.get("connection", "").lower() != "close"
+            _write_response(writer, status, payload, extra_headers, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def route(service: ChatService, method: str, path: str, body: bytes) -> tuple[int, dict, dict[str, str]]:
+    parts = [part for part in path.split("/") if part]
+    if parts == ["stats"] and method == "GET":
+        return 200, service.stats(), {}
+    if len(parts) < 2 or parts[0] != "sessions":
+        return 404, {"error": "not found"}, {}
+
+    session_id = parts[1]
+    if len(parts) == 3 and parts[2] == "messages":
+        if method != "POST":
+            return 405, {"error": "use POST"}, {}
+        try:
+            message = json.loads(body)["message"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": 'expected a JSON body {"message": "..."}'}, {}
+        try:
+            return 200, await service.ask(session_id, message), {}
+        except Overloaded as error:
+            return 429, {"error": error.reason, "retry_after": round(error.retry_after, 1)}, \
+                {"Retry-After": str(int(error.retry_after + 0.999))}
+        except Exception as error:
+            return 500, {"error": f"{type(error).__name__}: {error}"}, {}
+
+    if len(parts) == 2 and method == "GET":
+        description = service.describe(session_id)
+        return (200, description, {}) if description else (404, {"error": "unknown session"}, {})
+    if len(parts) == 2 and method == "DELETE":
+        return (200, {"deleted": session_id}, {}) if service.delete(session_id) else (404, {"error": "unknown session"}, {})
+    return 404, {"error": "not found"}, {}
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict, extra_headers: dict[str, str] | None = None,
+                    keep_alive: bool = True) -> None:
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(body)),
+               "Connection": "keep-alive" if keep_alive else "close", **(extra_headers or {})}
+    head = f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+
+# --- WebSocket
+
+async def handle_websocket(service: ChatService, websocket) -> None:
+    parts = [part for part in urlsplit(websocket.request.path).path.split("/") if part]
+    if len(parts) != 2 or parts[0] != "sessions":
+        await websocket.close(1008, "expected /sessions/<id>")
+        return
+
+    async for message in websocket:
+        try:
+            reply = {"type": "answer", **await service.ask(parts[1], str(message))}
+        except Overloaded as error:
+            reply = {"type": "error", "error": "overloaded", "reason": error.reason,
+                     "retry_after": round(error.retry_after, 1)}
+        except Exception as error:
+            reply = {"type": "error", "error": f"{type(error).__name__}: {error}"}
+        await websocket.send(json.dumps(reply))
+
+
+async def serve(service: ChatService, host: str = "127.0.0.1", port: int = 8080, ws_port: int | None = None) -> None:
+    http_server = await asyncio.start_server(lambda reader, writer: handle_http(service, reader, writer), host, port)
+    servers = [http_server.serve_forever()]
+    print(f"HTTP on http://{host}:{port}")
+    if ws_port is not None:
+        # optional dependency, only needed for the WebSocket endpoint
+        from websockets.asyncio.server import serve as serve_websocket
+
+        websocket_server = await serve_websocket(lambda websocket: handle_websocket(service, websocket), host, ws_port)
+        servers.append(websocket_server.serve_forever())
+        print(f"WebSocket on ws://{host}:{ws_port}/sessions/<id>")
+
+    async def sweep() -> None:
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            service.evict_idle()
+
+    await asyncio.gather(*servers, sweep())
+
+
+def create_conversation() -> Any:
+    # scripts start with a digit, so they can't be imported with a plain import statement
+    chatbot = importlib.import_module("8_chatbot_ollama_with_helper_class")
+    # compact history: many long-lived sessions in one process (see compact_history.py)
+    return chatbot.Conversation(use_tools=True, compact=True)
+
+
+def preload_models() -> dict[str, float]:
+    chatbot = importlib.import_module("8_chatbot_ollama_with_helper_class")
+    # same params as the shared client of Conversation
+    return model_registry.preload([f"ollama:{chatbot.MODEL}"], temperature=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session chat service around Conversation.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ws-port", type=int, default=None, help="also serve WebSocket sessions on this port")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds")
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    parser.add_argument("--queue-timeout", type=float, default=QUEUE_TIMEOUT, help="seconds")
+    parser.add_argument("--no-preload", action="store_true", help="don't load the model at startup")
+    args = parser.parse_args()
+
+    if not args.no_preload:
+        for spec, load_time in preload_models().items():
+            print(f"{spec} loaded in {load_time:.2f}s")
+
+    chat_service = ChatService(create_conversation, args.max_sessions, args.idle_timeout,
+                               AdmissionControl(args.max_concurrency, args.max_queue, args.queue_timeout))
+    asyncio.run(serve(chat_service, args.host, args.port, args.ws_port))
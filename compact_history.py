@@ -0,0 +1,152 @@
+import sys
+from collections.abc import Iterable, MutableSequence
+from typing import Any, overload
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+# compact chat history for long-lived sessions
+#
+# Every AIMessage of a chat carries its full response_metadata (durations, model names,
+# done_reason, ...), an id, usage_metadata and an (empty) additional_kwargs dict, and every
+# session holds its own SystemMessage with the same system prompt (see 5_tools_with_system_prompt.json).
+# CompactHistory keeps only what is needed to replay the conversation to the model:
+# - one slotted record per message: type, content, name, tool calls, tool_call_id
+# - response_metadata, ids and additional_kwargs are dropped, token usage is added up per history
+# - system prompts, tool names and message types are interned, the record of a system prompt
+#   is shared by all sessions
+# The BaseMessage objects are rebuilt only when the history is read, i.e. when the prompt is
+# assembled. CompactHistory is a MutableSequence of messages, so it can replace a chat_history list
+# (llm.invoke(history), history.append(message), streaming.stream_turn(llm, history, tools)).
+#
+# usage:
+#   chat_history = CompactHistory([SystemMessage(content=SYSTEM_PROMPT)])
+#   chat_history.append(HumanMessage(content="What is the capital of France?"))
+#   chat_history.append(llm.invoke(chat_history))
+#
+# run the memory benchmark with:
+#   python -m benchmarks.bench_compact_history --sessions 10000
+
+_MESSAGE_CLASSES: dict[str, type[BaseMessage]] = {
+    "system": SystemMessage,
+    "human": HumanMessage,
+    "ai": AIMessage,
+    "tool": ToolMessage,
+}
+
+
+class MessageRecord:
+    """Immutable, slotted replay data of one message."""
+
+    __slots__ = ("type", "content", "name", "tool_calls", "tool_call_id")
+
+    def __init__(self, type: str, content: Any, name: str | None = None,
+                 tool_calls: tuple[tuple[str, dict, str | None], ...] | None = None, tool_call_id: str | None = None):
+        self.type = type
+        self.content = content
+        self.name = name
+        self.tool_calls = tool_calls
+        self.tool_call_id = tool_call_id
+
+    def to_message(self) -> BaseMessage:
+        kwargs: dict[str, Any] = {"content": self.content}
+        if self.name is not None:
+            kwargs["name"] = self.name
+        if self.tool_calls:
+            kwargs["tool_calls"] = [
+                {"name": name, "args": args, "id": call_id, "type": "tool_call"} for name, args, call_id in self.tool_calls
+            ]
+        if self.tool_call_id is not None:
+            kwargs["tool_call_id"] = self.tool_call_id
+        return _MESSAGE_CLASSES[self.type](**kwargs)
+
+
+# system prompt -> its shared record
+_system_records: dict[str, MessageRecord] = {}
+
+
+def to_record(message: BaseMessage) -> MessageRecord:
+    """Compact record of a message (metadata, ids and additional_kwargs are dropped)."""
+    # chunks (e.g. "AIMessageChunk") are stored as the complete message type
+    message_type = message.type.removesuffix("MessageChunk").lower()
+    if message_type not in _MESSAGE_CLASSES:
+        raise ValueError(f"CompactHistory can't store messages of type '{message.type}'")
+
+    if isinstance(message, SystemMessage) and isinstance(message.content, str) and message.name is None:
+        record = _system_records.get(message.content)
+        if record is None:
+            content = sys.intern(message.content)
+            record = _system_records.setdefault(content, MessageRecord("system", content))
+        return record
+
+    content = message.content
+    tool_calls = None
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tool_calls = tuple((sys.intern(call["name"]), call["args"], call.get("id")) for call in message.tool_calls)
+    return MessageRecord(
+        type=sys.intern(message_type),
+        content=content,
+        name=message.name,
+        tool_calls=tool_calls,
+        tool_call_id=getattr(message, "tool_call_id", None),
+    )
+
+
+class CompactHistory(MutableSequence):
+    """Chat history of compact message records, reading it rebuilds the messages."""
+
+    __slots__ = ("_records", "input_tokens", "output_tokens")
+
+    def __init__(self, messages: Iterable[BaseMessage] = ()):
+        self._records: list[MessageRecord] = []
+        # token usage of all AI messages, the only metadata that is kept
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.extend(messages)
+
+    @overload
+    def __getitem__(self, index: int) -> BaseMessage: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[BaseMessage]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [record.to_message() for record in self._records[index]]
+        return self._records[index].to_message()
+
+    def __setitem__(self, index, message):
+        if isinstance(index, slice):
+            self._records[index] = [self._add(item) for item in message]
+        else:
+            self._records[index] = self._add(message)
+
+    def __delitem__(self, index) -> None:
+        del self._records[index]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self):
+        for record in self._records:
+            yield record.to_message()
+
+    def insert(self, index: int, message: BaseMessage) -> None:
+        self._records.insert(index, self._add(message))
+
+    def append(self, message: BaseMessage) -> None:
+        self._records.append(self._add(message))
+
+    def clear(self) -> None:
+        self._records.clear()
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def __repr__(self) -> str:
+        return f"CompactHistory({len(self._records)} messages)"
+
+    def _add(self, message: BaseMessage) -> MessageRecord:
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+        return to_record(message)
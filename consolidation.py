@@ -0,0 +1,140 @@
+import difflib
+import re
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+from urllib.parse import urlparse
+
+# local consolidation of the LibrariesOutput answers of several LLMs into one markdown table
+#
+# Instead of sending all answers back to an LLM, the libraries are matched across providers
+# and the table is built directly (in about a millisecond, and deterministic):
+# - names are normalized ("OpenAI Python SDK", "openai-python" and "openai" become "openai")
+# - libraries with the same normalized URL or a similar normalized name (difflib ratio of at
+#   least FUZZY_MATCH_THRESHOLD) are the same library, for libraries of the same provider also
+#   the names without the provider ("Hugging Face Transformers" and "transformers") are compared
+# - rows are sorted by the number of LLMs naming the library, then by their average rank
+#
+# usage:
+#   result: dict[str, LibrariesOutput] = map_chain.invoke(input=inputs)
+#   table = consolidation.to_markdown_table(consolidation.consolidate(result), list(result))
+
+FUZZY_MATCH_THRESHOLD = 0.85
+
+# words that don't distinguish libraries of the same name
+_NOISE_WORDS = {"python", "py", "sdk", "library", "lib", "client", "api", "official", "the", "for", "js", "package"}
+
+
+class Library(Protocol):
+    name: str
+    provider: str
+    url: str
+    version: str
+
+
+@dataclass
+class LibraryRow:
+    """One library of the consolidated table with the entries of all LLMs that named it."""
+    key: str
+    short_key: str
+    provider_key: str
+    entries: dict[str, Library] = field(default_factory=dict)
+    ranks: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        # the spelling most LLMs used, the first one on a tie
+        names = [entry.name for entry in self.entries.values()]
+        return max(names, key=names.count)
+
+    @property
+    def provider(self) -> str:
+        providers = [entry.provider for entry in self.entries.values()]
+        return max(providers, key=providers.count)
+
+    @property
+    def url(self) -> str:
+        return next(iter(self.entries.values())).url
+
+    @property
+    def average_rank(self) -> float:
+        return sum(self.ranks.values()) / len(self.ranks)
+
+
+def normalize_name(name: str, provider: str = "") -> str:
+    """Lowercase name without separators and noise words, and without the provider's name if given."""
+    words = [word for word in re.split(r"[\s\-_./]+", name.lower()) if word]
+    removed = _NOISE_WORDS | set(re.split(r"[\s\-_./]+", provider.lower())) if provider else _NOISE_WORDS
+    key = "".join(word for word in words if word not in removed)
+    return key or "".join(word for word in words if word not in _NOISE_WORDS) or "".join(words)
+
+
+def normalize_url(url: str) -> str:
+    # only URLs with a path identify a library (not e.g. "https://pypi.org" or "https://github.com")
+    parsed = urlparse(url.strip().lower())
+    host = parsed.netloc.removeprefix("www.")
+    path = parsed.path.rstrip("/")
+    return f"{host}{path}" if host and path else ""
+
+
+def consolidate(results: Mapping[str, Any]) -> list[LibraryRow]:
+    """Match the libraries of all LLMs (llm name -> LibrariesOutput), most often named first."""
+    rows: list[LibraryRow] = []
+    rows_by_url: dict[str, LibraryRow] = {}
+
+    for llm_name, result in results.items():
+        for rank, library in enumerate(result.libraries, start=1):
+            key = normalize_name(library.name)
+            short_key = normalize_name(library.name, library.provider)
+            provider_key = normalize_name(library.provider)
+            url = normalize_url(library.url)
+            row = rows_by_url.get(url) if url else None
+            if row is None:
+                row = _find_similar(rows, key, short_key, provider_key)
+            if row is None:
+                row = LibraryRow(key=key, short_key=short_key, provider_key=provider_key)
+                rows.append(row)
+
+            # an LLM naming the same library twice keeps its first (higher ranked) entry
+            row.entries.setdefault(llm_name, library)
+            row.ranks.setdefault(llm_name, rank)
+            if url:
+                rows_by_url.setdefault(url, row)
+
+    return sorted(rows, key=lambda row: (-len(row.entries), row.average_rank))
+
+
+def to_markdown_table(rows: Sequence[LibraryRow], llm_names: Sequence[str]) -> str:
+    """Markdown table with a column per LLM, a cell shows the version that LLM reported."""
+    header = ["Library", "Provider", "URL", *llm_names]
+    lines = [_table_line(header), _table_line(["---"] * len(header))]
+    for row in rows:
+        cells = [row.name, row.provider, row.url]
+        cells += [f"✓ {row.entries[llm_name].version}" if llm_name in row.entries else "–" for llm_name in llm_names]
+        lines.append(_table_line(cells))
+    return "\n".join(lines) + "\n"
+
+
+def _find_similar(rows: Sequence[LibraryRow], key: str, short_key: str, provider_key: str) -> LibraryRow | None:
+    best_row, best_ratio = None, FUZZY_MATCH_THRESHOLD
+    for row in rows:
+        ratio = _similarity(row.key, key)
+        if row.provider_key == provider_key:
+            ratio = max(ratio, _similarity(row.short_key, short_key))
+        if ratio >= best_ratio:
+            best_row, best_ratio = row, ratio
+    return best_row
+
+
+def _similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    matcher = difflib.SequenceMatcher(None, a, b)
+    # the quick upper bounds rule out most pairs without computing the full ratio
+    if matcher.real_quick_ratio() < FUZZY_MATCH_THRESHOLD or matcher.quick_ratio() < FUZZY_MATCH_THRESHOLD:
+        return 0.0
+    return matcher.ratio()
+
+
+def _table_line(cells: Sequence[str]) -> str:
+    return "| " + " | ".join(str(cell).replace("|", "\\|").replace("\n", " ") for cell in cells) + " |"
@@ -0,0 +1,280 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from typing import Any, Generic, Protocol, TypeVar
+
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage, message_to_dict, messages_from_dict
+
+from memory import TokenCounter, TokenWindowMemory, count_message_tokens
+
+# durable conversation history, one append per turn, only the needed window is loaded
+#
+# The chatbots keep their history in a module-level list (or st.session_state), so a restart
+# loses it and every session's full history stays in RAM. SQLiteConversationStore appends each
+# message to one SQLite file instead (one transaction per turn, WAL journal) and reads back only
+# the newest messages the memory strategy needs:
+# - load_window(session_id, max_messages=...) for a chat_history[-MAX_HISTORY:] style window
+# - load_window(session_id, max_tokens=...) for TokenWindowMemory (token counts are stored)
+# - the session's system prompt is always part of the window, ToolMessages are never
+#   separated from the AIMessage that called the tool
+# Older messages stay on disk only, also the ones StoredHistory drops from its window while the
+# conversation goes on. SessionCache keeps the windows of the most recently used
+# sessions in memory, so one process can serve many sessions with bounded RAM.
+#
+# usage:
+#   store = SQLiteConversationStore("chat_history.db")
+#   chat_history = StoredHistory(store, "user-42", max_messages=20, system_prompt=SYSTEM_PROMPT)
+#   chat_history.append(HumanMessage(content="What is the capital of France?"))  # written immediately
+#
+#   memories = SessionCache(lambda session_id: StoredTokenWindowMemory(store, session_id, max_tokens=2000))
+#   memory = memories.get("user-42")
+
+DEFAULT_PATH = "chat_history.db"
+DEFAULT_MAX_SESSIONS = 1000
+PAGE_SIZE = 100  # messages per query of iter_messages()
+
+T = TypeVar("T")
+
+
+class ConversationStore(Protocol):
+    def append(self, session_id: str, messages: Sequence[BaseMessage]) -> None: ...
+
+    def load_window(self, session_id: str, max_messages: int | None = None,
+                    max_tokens: int | None = None) -> list[tuple[BaseMessage, int]]: ...
+
+
+class SQLiteConversationStore:
+    """Append-only SQLite store of the messages of many sessions."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")  # durable across process crashes with WAL
+        # (session_id, seq) is the primary key: the newest messages of a session are an index range scan
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, type TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL, message TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage]) -> None:
+        """Append messages to the session in one transaction."""
+        rows = [(message.type, count_message_tokens(message), json.dumps(message_to_dict(message)))
+                for message in messages]
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                (next_seq,) = self._connection.execute(
+                    "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                self._connection.executemany(
+                    "INSERT INTO messages (session_id, seq, type, tokens, message) VALUES (?, ?, ?, ?, ?)",
+                    [(session_id, next_seq + index, *row) for index, row in enumerate(rows)],
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def load_window(self, session_id: str, max_messages: int | None = None,
+                    max_tokens: int | None = None) -> list[tuple[BaseMessage, int]]:
+        """Newest (message, token count) pairs of the session within the limits, oldest first.
+
+        The first message of the session is always included if it is a system message (it does
+        not count against the limits). Without limits the whole session is loaded.
+        """
+        with self._lock:
+            system_row = self._connection.execute(
+                "SELECT seq, tokens, message FROM messages WHERE session_id = ? AND seq = 0 AND type = 'system'",
+                (session_id,),
+            ).fetchone()
+            first_seq = 1 if system_row else 0
+
+            # newest first, stops reading as soon as the window is full
+            rows = []
+            tokens_total = 0
+            cursor = self._connection.execute(
+                "SELECT seq, tokens, message FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq DESC",
+                (session_id, first_seq),
+            )
+            for row in cursor:
+                if max_messages is not None and len(rows) >= max_messages:
+                    break
+                if max_tokens is not None and rows and tokens_total + row[1] > max_tokens:
+                    break
+                rows.append(row)
+                tokens_total += row[1]
+            cursor.close()
+
+        rows.reverse()
+        window = _to_pairs(rows)
+        # a ToolMessage whose AIMessage is outside the window would be rejected by the providers
+        while window and isinstance(window[0][0], ToolMessage):
+            window.pop(0)
+        if system_row:
+            window = _to_pairs([system_row]) + window
+        return window
+
+    def iter_messages(self, session_id: str) -> Iterator[BaseMessage]:
+        """All messages of the session, oldest first (read in pages of PAGE_SIZE)."""
+        next_seq = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT seq, tokens, message FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                    (session_id, next_seq, PAGE_SIZE),
+                ).fetchall()
+            if not rows:
+                return
+            for message, _ in _to_pairs(rows):
+                yield message
+            next_seq = rows[-1][0] + 1
+
+    def message_count(self, session_id: str) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return count
+
+    def sessions(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT DISTINCT session_id FROM messages")]
+
+    def delete_session(self, session_id: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class StoredHistory(list):
+    """Chat history list of one session that writes every appended message to the store.
+
+    Only the newest `max_messages` (or `max_tokens`) are kept in the list, when loading and after
+    every append, older messages stay on disk. Like load_window(), the system prompt is always kept
+    and a window never starts with the ToolMessages of a dropped AIMessage.
+    Use it in place of a plain `chat_history = [...]` list, only append() and extend() are persisted.
+    """
+
+    def __init__(self, store: ConversationStore, session_id: str, max_messages: int | None = None,
+                 max_tokens: int | None = None, system_prompt: str | None = None):
+        window = store.load_window(session_id, max_messages=max_messages, max_tokens=max_tokens)
+        super().__init__(message for message, _ in window)
+        self.store = store
+        self.session_id = session_id
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        if not window and system_prompt:
+            self.append(SystemMessage(content=system_prompt))
+
+    def append(self, message: BaseMessage) -> None:
+        self.store.append(self.session_id, [message])
+        super().append(message)
+        self._trim()
+
+    def extend(self, messages: Sequence[BaseMessage]) -> None:
+        messages = list(messages)
+        self.store.append(self.session_id, messages)
+        super().extend(messages)
+        self._trim()
+
+    def _trim(self) -> None:
+        # same window as load_window(): the system prompt doesn't count, the newest message is always kept
+        first = 1 if self and isinstance(self[0], SystemMessage) else 0
+        start = first
+        if self.max_messages is not None:
+            start = max(start, len(self) - self.max_messages)
+        if self.max_tokens is not None:
+            tokens = count_message_tokens(self[-1])
+            index = len(self) - 1
+            while index > start and tokens + count_message_tokens(self[index - 1]) <= self.max_tokens:
+                index -= 1
+                tokens += count_message_tokens(self[index])
+            start = max(start, index)
+        # a ToolMessage whose AIMessage is outside the window would be rejected by the providers
+        while start < len(self) and isinstance(self[start], ToolMessage):
+            start += 1
+        if start > first:
+            del self[first:start]
+
+
+class StoredTokenWindowMemory(TokenWindowMemory):
+    """TokenWindowMemory of one session that is persisted in the store and loaded lazily.
+
+    Only the window that fits into `max_tokens` is read when the memory is created, evicted
+    messages are simply dropped from RAM (they are still on disk).
+    """
+
+    def __init__(self, store: ConversationStore, session_id: str, max_tokens: int = 2000,
+                 system_prompt: str | None = None, token_counter: TokenCounter = count_message_tokens,
+                 evict_to: int | None = None):
+        super().__init__(max_tokens, system_prompt, token_counter, evict_to)
+        self.store = store
+        self.session_id = session_id
+
+        for message, tokens in store.load_window(session_id, max_tokens=max_tokens - self._system_tokens):
+            if token_counter is not count_message_tokens:
+                tokens = token_counter(message)
+            self._window.append((message, tokens))
+            self._window_tokens += tokens
+        self._evict()
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.store.append(self.session_id, [message])
+        super().add_message(message)
+
+    def add_messages(self, messages: list[BaseMessage]) -> None:
+        # one write for the whole turn
+        self.store.append(self.session_id, messages)
+        for message in messages:
+            super().add_message(message)
+
+
+class SessionCache(Generic[T]):
+    """The in-memory objects (history, memory) of the most recently used sessions.
+
+    Sessions beyond `max_sessions` are dropped from memory (least recently used first)
+    and loaded again from the store by `factory` when they come back.
+    """
+
+    def __init__(self, factory: Callable[[str], T], max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.loads = 0
+        self.evictions = 0
+        self._sessions: OrderedDict[str, T] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> T:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+
+            session = self.factory(session_id)
+            self.loads += 1
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            return session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict[str, Any]:
+        return {"sessions": len(self._sessions), "loads": self.loads, "evictions": self.evictions}
+
+
+def _to_pairs(rows: Sequence[tuple[int, int, str]]) -> list[tuple[BaseMessage, int]]:
+    messages = messages_from_dict([json.loads(row[2]) for row in rows])
+    return [(message, row[1]) for message, row in zip(messages, rows)]
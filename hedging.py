@@ -0,0 +1,115 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
+from typing import Any
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from latency import LatencyHistogram
+
+# hedged requests across equivalent chains of different providers
+#
+# The request goes to the primary provider first. If it has not answered once its latency
+# passes the configured percentile of its own latency history, a backup request is sent to
+# the next provider. The first result that parses wins and the other request is cancelled.
+# A failing request (e.g. the parser raises) fires the next backup right away.
+#
+# usage:
+#   hedged_chain = HedgedRunnable({"claude": claude_chain, "openai": openai_chain, "google": google_chain})
+#   result: LibrariesOutput = hedged_chain.invoke(inputs)
+
+HEDGE_PERCENTILE = 90.0
+MIN_SAMPLES = 20  # before that, INITIAL_HEDGE_DELAY is used
+INITIAL_HEDGE_DELAY = 5.0  # seconds
+
+
+class HedgedRunnable(Runnable):
+    def __init__(self, branches: Mapping[str, Runnable], percentile: float = HEDGE_PERCENTILE,
+                 min_samples: int = MIN_SAMPLES, initial_delay: float = INITIAL_HEDGE_DELAY):
+        """`branches` maps provider names to equivalent runnables, the first one is the primary."""
+        if not branches:
+            raise ValueError("HedgedRunnable needs at least one branch")
+        self.branches = dict(branches)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+
+        self.histograms = {name: LatencyHistogram() for name in self.branches}
+        self.wins = {name: 0 for name in self.branches}
+        self.cancellations = {name: 0 for name in self.branches}
+        self.hedges = 0
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait for `name` before a backup request is sent."""
+        histogram = self.histograms[name]
+        if not histogram.count or histogram.count < self.min_samples:
+            return self.initial_delay
+        return histogram.percentile(self.percentile)
+
+    def invoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> Any:
+        # runs its own event loop, so it can be used from sync code and from RunnableParallel threads
+        coroutine = self.ainvoke(input, config, **kwargs)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # called from sync code inside a running event loop (Jupyter, an async server):
+        # asyncio.run() can't be nested, run the coroutine on a private loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+    async def ainvoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> Any:
+        names = list(self.branches)
+        running: dict[asyncio.Task, tuple[str, float]] = {}
+        errors: list[Exception] = []
+
+        def start(name: str) -> None:
+            task = asyncio.ensure_future(self.branches[name].ainvoke(input, config, **kwargs))
+            running[task] = (name, time.perf_counter())
+
+        start(names[0])
+        next_branch = 1
+        try:
+            while running:
+                timeout = None
+                if next_branch < len(names):
+                    # hedge once the latest request passes the latency percentile of its provider
+                    latest_name, latest_start = max(running.values(), key=lambda item: item[1])
+                    timeout = max(0.0, latest_start + self.hedge_delay(latest_name) - time.perf_counter())
+
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    start(names[next_branch])
+                    next_branch += 1
+                    continue
+
+                for task in done:
+                    name, started = running.pop(task)
+                    if task.exception() is None:
+                        self.histograms[name].record(time.perf_counter() - started)
+                        self.wins[name] += 1
+                        return task.result()
+                    errors.append(task.exception())
+
+                # everything in flight failed: don't wait for the hedge delay
+                if not running and next_branch < len(names):
+                    start(names[next_branch])
+                    next_branch += 1
+        finally:
+            # cancel the losers: their latency is unknown (only that it is longer than the winner's),
+            # recording the elapsed time would bias the histogram, and so the hedge delay, low
+            for task, (name, _) in running.items():
+                task.cancel()
+                self.cancellations[name] += 1
+
+        raise ExceptionGroup("all hedged requests failed", errors)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hedges": self.hedges,
+            "wins": dict(self.wins),
+            "cancellations": dict(self.cancellations),
+            f"p{self.percentile:g}": {name: histogram.percentile(self.percentile) for name, histogram in self.histograms.items()},
+        }
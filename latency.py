@@ -0,0 +1,39 @@
+import bisect
+import math
+import threading
+
+# latency histogram shared by hedging.py (hedge delay) and metrics.py (latency percentiles)
+#
+# usage:
+#   histogram = LatencyHistogram()
+#   histogram.record(0.25)
+#   p90 = histogram.percentile(90)
+
+
+class LatencyHistogram:
+    """Latency histogram with log-spaced buckets (bounded memory, about 5% resolution)."""
+
+    def __init__(self, min_latency: float = 0.001, max_latency: float = 600.0, growth: float = 1.05):
+        bucket_count = math.ceil(math.log(max_latency / min_latency, growth)) + 1
+        self.bounds = [min_latency * growth ** index for index in range(bucket_count)]
+        self.counts = [0] * (bucket_count + 1)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+            self.count += 1
+
+    def percentile(self, p: float) -> float | None:
+        """Upper bound of the bucket holding the p-th percentile, None without samples."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, math.ceil(p / 100 * self.count))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.bounds[min(index, len(self.bounds) - 1)]
+        return self.bounds[-1]
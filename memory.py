@@ -0,0 +1,246 @@
+import threading
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage, get_buffer_string
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
+# conversation memory strategies
+#
+# TokenWindowMemory keeps the newest messages that fit into a token budget (instead of
+# a fixed number of messages like chat_history[-MAX_HISTORY:]):
+# - the token count of each message is computed once, when the message is added
+# - the window only ever moves forward, so each turn costs O(1) amortized
+# - the system prompt is always kept
+# - an AIMessage with tool calls is never separated from its ToolMessages
+# - with `evict_to`, a full window is cut down to evict_to tokens at once instead of by one message
+#
+# Evicting in chunks keeps the prompt prefix byte-identical for many turns: Ollama (and other servers
+# with a prompt cache) reuse the evaluation of the longest prefix shared with the previous request, and
+# a window that moves by one message every turn shares nothing but the system prompt.
+# prefix_stable_window() does the same for a fixed number of messages.
+#
+# usage:
+#   memory = TokenWindowMemory(max_tokens=2000, system_prompt="You are a helpful assistant.")
+#   memory.add_message(HumanMessage(content="What is the capital of France?"))
+#   response = llm.invoke(memory.messages)
+#   memory.add_message(response)
+#   window = prefix_stable_window(chat_history, keep=4, chunk=8)
+#
+# SummaryMemory additionally folds the evicted turns into a running summary message
+# on a background worker, so older facts are not lost when they leave the window:
+#   memory = SummaryMemory(llm, max_tokens=2000, system_prompt="You are a helpful assistant.")
+
+TokenCounter = Callable[[BaseMessage], int]
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    """Approximate token count of a single message (about 4 characters per token)."""
+    return count_tokens_approximately([message])
+
+
+def prefix_stable_window(messages: list[BaseMessage], keep: int, chunk: int) -> list[BaseMessage]:
+    """The newest messages, at least `keep` of them, with the start moving forward `chunk` messages at a time.
+
+    Unlike messages[-keep:], the window keeps its first message for `chunk` messages in a row, so
+    consecutive prompts share everything but the newest messages (at most keep + chunk - 1 messages).
+    """
+    if keep < 1 or chunk < 1:
+        raise ValueError(f"keep and chunk must be at least 1, got keep={keep}, chunk={chunk}")
+    start = max(0, len(messages) - keep) // chunk * chunk
+    # don't start with the results of a tool call that was cut off
+    while start < len(messages) and isinstance(messages[start], ToolMessage):
+        start += 1
+    return messages[start:]
+
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You maintain a short running summary of a conversation. "
+               "Keep all facts, names and decisions that may be needed later. Answer with the summary only."),
+    ("human", "Current summary:\n{summary}\n\nNew messages:\n{messages}\n\nUpdated summary:"),
+])
+
+
+class TokenWindowMemory:
+    def __init__(self, max_tokens: int = 2000, system_prompt: str | None = None,
+                 token_counter: TokenCounter = count_message_tokens, evict_to: int | None = None):
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        # once over budget, evict down to this many tokens (a lower value evicts in larger chunks)
+        if evict_to is not None and evict_to < 0:
+            raise ValueError(f"evict_to must not be negative, got {evict_to}")
+        self.evict_to = max_tokens if evict_to is None else min(evict_to, max_tokens)
+
+        self.system_message = SystemMessage(content=system_prompt) if system_prompt else None
+        self._system_tokens = token_counter(self.system_message) if self.system_message else 0
+
+        # (message, token count) pairs of the current window, oldest first
+        self._window: deque[tuple[BaseMessage, int]] = deque()
+        self._window_tokens = 0
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        """Messages to send to the LLM: the system prompt followed by the current window."""
+        window = [message for message, _ in self._window]
+        if self.system_message:
+            return [self.system_message, *window]
+        return window
+
+    @property
+    def token_count(self) -> int:
+        """Tokens of all messages returned by `messages` (system prompt included)."""
+        return self._system_tokens + self._window_tokens
+
+    def add_message(self, message: BaseMessage) -> None:
+        tokens = self.token_counter(message)
+        self._window.append((message, tokens))
+        self._window_tokens += tokens
+        self._evict()
+
+    def add_messages(self, messages: list[BaseMessage]) -> None:
+        for message in messages:
+            self.add_message(message)
+
+    def clear(self) -> None:
+        self._window.clear()
+        self._window_tokens = 0
+
+    def _evict(self) -> list[BaseMessage]:
+        # drop the oldest messages until the window fits the budget again (down to evict_to),
+        # the newest message (group) is always kept even if it is larger than the budget
+        evicted = []
+        if self.token_count <= self.max_tokens:
+            return evicted
+        while self.token_count > self.evict_to:
+            group_size = self._oldest_group_size()
+            if group_size >= len(self._window):
+                break
+
+            for _ in range(group_size):
+                message, tokens = self._window.popleft()
+                self._window_tokens -= tokens
+                evicted.append(message)
+
+        if evicted:
+            self._on_evict(evicted)
+        return evicted
+
+    def _oldest_group_size(self) -> int:
+        # an AIMessage with tool calls and the ToolMessages answering it are evicted together
+        oldest = self._window[0][0]
+        if not (isinstance(oldest, AIMessage) and oldest.tool_calls):
+            return 1
+
+        size = 1
+        while size < len(self._window) and isinstance(self._window[size][0], ToolMessage):
+            size += 1
+        return size
+
+    def _on_evict(self, messages: list[BaseMessage]) -> None:
+        # hook for subclasses, called with the messages that left the window (oldest first)
+        pass
+
+
+class SummaryMemory(TokenWindowMemory):
+    """TokenWindowMemory that folds evicted turns into a running summary.
+
+    Summarizing runs on a background worker, so it never blocks a turn: `messages`
+    always uses the latest finished summary and does not wait for a pending one.
+    """
+
+    def __init__(self, llm: Runnable, max_tokens: int = 2000, system_prompt: str | None = None,
+                 token_counter: TokenCounter = count_message_tokens, evict_to: int | None = None):
+        super().__init__(max_tokens, system_prompt, token_counter, evict_to)
+        self.summary_chain = SUMMARY_PROMPT | llm | StrOutputParser()
+
+        self._summary_message: SystemMessage | None = None
+        self._summary_tokens = 0
+        self._lock = threading.Lock()
+        # one worker, so the evicted chunks are folded into the summary in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-memory")
+        self._pending: list[Future] = []
+        self.last_error: Exception | None = None
+
+        # tokens of the full, unwindowed history (to report the savings)
+        self._full_history_tokens = 0
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        with self._lock:
+            summary_message = self._summary_message
+        window = super().messages
+        if summary_message is None:
+            return window
+        if self.system_message:
+            return [self.system_message, summary_message, *window[1:]]
+        return [summary_message, *window]
+
+    @property
+    def summary(self) -> str | None:
+        with self._lock:
+            return self._summary_message.content if self._summary_message else None
+
+    @property
+    def token_count(self) -> int:
+        return super().token_count + self._summary_tokens
+
+    @property
+    def full_history_token_count(self) -> int:
+        """Tokens the prompt would have if the full history was sent instead."""
+        return self._system_tokens + self._full_history_tokens
+
+    @property
+    def saved_tokens(self) -> int:
+        """Prompt tokens saved by the window + summary compared with sending the full history."""
+        return self.full_history_token_count - self.token_count
+
+    @property
+    def pending_summaries(self) -> int:
+        self._pending = [future for future in self._pending if not future.done()]
+        return len(self._pending)
+
+    def add_message(self, message: BaseMessage) -> None:
+        super().add_message(message)
+        self._full_history_tokens += self._window[-1][1]
+
+    def clear(self) -> None:
+        self.wait()
+        super().clear()
+        with self._lock:
+            self._summary_message = None
+            self._summary_tokens = 0
+        self._full_history_tokens = 0
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until all pending summaries are finished (e.g. before shutting down)."""
+        for future in list(self._pending):
+            future.result(timeout=timeout)
+        self._pending.clear()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _on_evict(self, messages: list[BaseMessage]) -> None:
+        self._pending = [future for future in self._pending if not future.done()]
+        self._pending.append(self._executor.submit(self._fold_into_summary, messages))
+
+    def _fold_into_summary(self, messages: list[BaseMessage]) -> None:
+        try:
+            summary = self.summary_chain.invoke({
+                "summary": self.summary or "(no summary yet)",
+                "messages": get_buffer_string(messages),
+            })
+        except Exception as error:
+            # keep the previous summary, the conversation goes on without the new one
+            self.last_error = error
+            return
+
+        summary_message = SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+        summary_tokens = self.token_counter(summary_message)
+        with self._lock:
+            self._summary_message = summary_message
+            self._summary_tokens = summary_tokens
@@ -0,0 +1,310 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable
+
+from latency import LatencyHistogram
+
+# aggregated metrics of all model calls of a chain, collected by a LangChain callback handler
+#
+# For every model call the handler records wall latency, time to first token (streamed calls),
+# the time the server spent loading the model (Ollama's load_duration, part of the latency),
+# input / output tokens, the estimated cost and the step it belongs to:
+# - the branch name of a RunnableParallel (claude, openai, google in 4_chain_parallel.py)
+# - else the `run_name` of the nearest named chain, or metadata={"step": ...} in the config
+# - else the model name
+# Latencies are kept in log-bucket histograms per (model, step), so memory stays bounded no
+# matter how many calls are made. Every call can additionally be appended to a JSONL file,
+# the aggregates are available as a dict or in the Prometheus text format.
+#
+# usage:
+#   map_chain = metrics.attach(map_chain)
+#   conversation.llm = metrics.attach(conversation.llm)
+#   print(metrics.collector.to_prometheus())
+
+# USD per million tokens (input, output), models without a price are reported with a cost of 0
+PRICES = {
+    "claude-sonnet-4-5-20250929": (3.00, 15.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "openai/gpt-oss-120b": (0.15, 0.75),
+    "llama3.1": (0.0, 0.0),  # local
+}
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# runs that never end (e.g. a stream the caller stopped reading) are forgotten after this many seconds
+OPEN_RUN_TTL = 3600.0
+
+# generic runnable names that say nothing about the step
+_GENERIC_CHAIN_NAMES = ("RunnableSequence", "RunnableParallel", "RunnableLambda", "RunnableBinding",
+                        "RunnablePassthrough", "RunnableAssign", "RunnableWithFallbacks", "ChatPromptTemplate")
+
+
+@dataclass
+class _Series:
+    """Aggregates of one (model, step)."""
+    calls: int = 0
+    errors: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    latency_sum: float = 0.0
+    time_to_first_token_sum: float = 0.0
+    load_time_sum: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    time_to_first_token: LatencyHistogram = field(default_factory=LatencyHistogram)
+    load_time: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+@dataclass
+class _Call:
+    model: str
+    step: str
+    start: float
+    first_token: float | None = None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Collects latency, time to first token, tokens and cost of every model call."""
+
+    def __init__(self, jsonl_path: str | None = None, prices: dict[str, tuple[float, float]] | None = None):
+        self.jsonl_path = jsonl_path
+        self.prices = PRICES if prices is None else prices
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, str], _Series] = {}
+        # open runs in start order, so the ones that never ended can be pruned from the front
+        self._calls: OrderedDict[UUID, _Call] = OrderedDict()
+        # run id -> (parent run id, step, start)
+        self._chains: OrderedDict[UUID, tuple[UUID | None, str | None, float]] = OrderedDict()
+
+    # --- chains: remember the step names of the enclosing runs
+
+    def on_chain_start(self, serialized: dict[str, Any] | None, inputs: Any, *, run_id: UUID,
+                       parent_run_id: UUID | None = None, tags: list[str] | None = None,
+                       metadata: dict[str, Any] | None = None, **kwargs: Any) -> None:
+        with self._lock:
+            self._prune_open_runs()
+            self._chains[run_id] = (parent_run_id, _step_name(kwargs.get("name"), tags, metadata), time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._chains.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._chains.pop(run_id, None)
+
+    # --- model calls
+
+    def on_chat_model_start(self, serialized: dict[str, Any], messages: list, *, run_id: UUID,
+                            parent_run_id: UUID | None = None, tags: list[str] | None = None,
+                            metadata: dict[str, Any] | None = None, **kwargs: Any) -> None:
+        self._start_call(run_id, parent_run_id, tags, metadata, kwargs)
+
+    def on_llm_start(self, serialized: dict[str, Any], prompts: list[str], *, run_id: UUID,
+                     parent_run_id: UUID | None = None, tags: list[str] | None = None,
+                     metadata: dict[str, Any] | None = None, **kwargs: Any) -> None:
+        self._start_call(run_id, parent_run_id, tags, metadata, kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        call = self._calls.get(run_id)
+        if call is not None and call.first_token is None:
+            call.first_token = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        end = time.perf_counter()
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+
+        input_tokens = output_tokens = 0
+        load_time = 0.0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+                load_time += model_load_time(message)
+        input_price, output_price = self.prices.get(call.model, (0.0, 0.0))
+        cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+        record = {
+            "timestamp": time.time(),
+            "model": call.model,
+            "step": call.step,
+            "latency": round(end - call.start, 6),
+            "time_to_first_token": round(call.first_token - call.start, 6) if call.first_token else None,
+            "load_time": round(load_time, 6),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": round(cost, 8),
+        }
+        with self._lock:
+            series = self._series.setdefault((call.model, call.step), _Series())
+            series.calls += 1
+            series.input_tokens += input_tokens
+            series.output_tokens += output_tokens
+            series.cost += cost
+            series.latency.record(end - call.start)
+            series.latency_sum += end - call.start
+            if call.first_token:
+                series.time_to_first_token.record(call.first_token - call.start)
+                series.time_to_first_token_sum += call.first_token - call.start
+            if load_time > 0:
+                # only providers that report a load time (Ollama), so the percentiles aren't diluted by zeros
+                series.load_time.record(load_time)
+                series.load_time_sum += load_time
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(record) + "\n")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+            if call is not None:
+                self._series.setdefault((call.model, call.step), _Series()).errors += 1
+
+    # --- export
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Aggregates per (model, step) with latency and time to first token percentiles in seconds."""
+        with self._lock:
+            series_items = list(self._series.items())
+        rows = []
+        for (model, step), series in series_items:
+            rows.append({
+                "model": model,
+                "step": step,
+                "calls": series.calls,
+                "errors": series.errors,
+                "input_tokens": series.input_tokens,
+                "output_tokens": series.output_tokens,
+                "cost": round(series.cost, 6),
+                **{f"latency_p{quantile * 100:g}": series.latency.percentile(quantile * 100) for quantile in QUANTILES},
+                **{f"time_to_first_token_p{quantile * 100:g}": series.time_to_first_token.percentile(quantile * 100)
+                   for quantile in QUANTILES},
+                **{f"load_time_p{quantile * 100:g}": series.load_time.percentile(quantile * 100) for quantile in QUANTILES},
+                "load_time_total": round(series.load_time_sum, 6),
+                "loads": series.load_time.count,
+            })
+        return rows
+
+    def to_prometheus(self, prefix: str = "llm") -> str:
+        """Aggregates in the Prometheus text exposition format (summaries and counters)."""
+        with self._lock:
+            series_items = list(self._series.items())
+
+        lines = []
+        counters = [
+            ("calls_total", "Model calls", lambda series: series.calls),
+            ("errors_total", "Failed model calls", lambda series: series.errors),
+            ("input_tokens_total", "Input tokens", lambda series: series.input_tokens),
+            ("output_tokens_total", "Output tokens", lambda series: series.output_tokens),
+            ("cost_usd_total", "Estimated cost in USD", lambda series: series.cost),
+        ]
+        for name, help_text, value in counters:
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter"]
+            lines += [f"{prefix}_{name}{{{_labels(model, step)}}} {value(series)}" for (model, step), series in series_items]
+
+        summaries = [
+            ("latency_seconds", "Wall latency of a model call", "latency", "latency_sum"),
+            ("time_to_first_token_seconds", "Time to the first streamed token", "time_to_first_token",
+             "time_to_first_token_sum"),
+            ("load_seconds", "Time the server spent loading the model (calls that report it)", "load_time",
+             "load_time_sum"),
+        ]
+        for name, help_text, histogram_field, sum_field in summaries:
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} summary"]
+            for (model, step), series in series_items:
+                histogram: LatencyHistogram = getattr(series, histogram_field)
+                if not histogram.count:
+                    continue
+                labels = _labels(model, step)
+                for quantile in QUANTILES:
+                    lines.append(f'{prefix}_{name}{{{labels},quantile="{quantile}"}} {histogram.percentile(quantile * 100)}')
+                lines.append(f"{prefix}_{name}_sum{{{labels}}} {getattr(series, sum_field)}")
+                lines.append(f"{prefix}_{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the aggregates for the node exporter's textfile collector (atomically replaced)."""
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary_path, path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def _start_call(self, run_id: UUID, parent_run_id: UUID | None, tags: list[str] | None,
+                    metadata: dict[str, Any] | None, kwargs: dict[str, Any]) -> None:
+        metadata = metadata or {}
+        invocation_params = kwargs.get("invocation_params") or {}
+        model = (metadata.get("ls_model_name") or invocation_params.get("model")
+                 or invocation_params.get("model_name") or invocation_params.get("_type") or "unknown")
+        with self._lock:
+            step = _step_name(None, tags, metadata) or self._enclosing_step(parent_run_id) or model
+            self._prune_open_runs()
+            self._calls[run_id] = _Call(model=model, step=step, start=time.perf_counter())
+
+    def _prune_open_runs(self) -> None:
+        # called with the lock held
+        deadline = time.perf_counter() - OPEN_RUN_TTL
+        while self._chains and next(iter(self._chains.values()))[2] < deadline:
+            self._chains.popitem(last=False)
+        while self._calls and next(iter(self._calls.values())).start < deadline:
+            self._calls.popitem(last=False)
+
+    def _enclosing_step(self, run_id: UUID | None) -> str | None:
+        while run_id is not None and run_id in self._chains:
+            run_id, step, _ = self._chains[run_id]
+            if step:
+                return step
+        return None
+
+
+def model_load_time(message: Any) -> float:
+    """Seconds the server spent loading the model for this response (Ollama's load_duration, 0.0 if not reported)."""
+    metadata = getattr(message, "response_metadata", None) or {}
+    return (metadata.get("load_duration") or 0) / 1e9
+
+
+def _step_name(name: str | None, tags: list[str] | None, metadata: dict[str, Any] | None) -> str | None:
+    if metadata and metadata.get("step"):
+        return metadata["step"]
+    for tag in tags or ():
+        if tag.startswith("map:key:"):
+            return tag.removeprefix("map:key:")
+    if name and not name.startswith(_GENERIC_CHAIN_NAMES):
+        return name
+    return None
+
+
+def _labels(model: str, step: str) -> str:
+    return f'model="{_escape(model)}",step="{_escape(step)}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# process-wide collector, used by attach() if no other collector is given
+collector = MetricsCallbackHandler()
+
+
+def attach(runnable: Runnable, handler: MetricsCallbackHandler | None = None) -> Runnable:
+    """The runnable (chain, model, model with tools) with the metrics handler in its config."""
+    return runnable.with_config(callbacks=[handler or collector])
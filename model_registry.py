@@ -0,0 +1,207 @@
+import functools
+import importlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+
+# process-wide registry of long-lived chat model clients
+#
+# Creating a ChatOllama (or any other chat model) on every user message pays for the
+# client construction, the tool schema conversion of bind_tools() and a cold HTTP connection.
+# The registry creates each client once per (provider, model, params) and hands out the same
+# instance afterwards, so the underlying HTTP client keeps its connections alive between turns.
+#
+# Provider SDKs are imported on first use only, so a short-lived job pays the import time of the
+# providers it actually calls (langchain_anthropic, langchain_openai and langchain_google_genai
+# take a second or more each). The .env file is looked up once, when the first client is created.
+#
+# Ollama loads a model into memory on its first request and unloads it after `keep_alive` (5 minutes
+# by default), so the first turn after startup or after a pause pays the load time (load_duration in
+# the response metadata, seconds for an 8B model). The Ollama clients get OLLAMA_KEEP_ALIVE unless
+# keep_alive is passed, and preload() loads the configured models at startup, before the first user turn.
+#
+# usage:
+#   llm = model_registry.get_chat_model("ollama", "llama3.1", temperature=0)
+#   llm = model_registry.get_chat_model_from_spec("anthropic:claude-sonnet-4-5-20250929", temperature=0.3)
+#   llm_with_tools = model_registry.get_chat_model_with_tools("ollama", "llama3.1", [get_forecast], temperature=0)
+#   model_registry.preload(["ollama:llama3.1"], temperature=0)
+
+# provider name -> (module, class name), the module is imported on first use only
+PROVIDERS = {
+    "ollama": ("langchain_ollama", "ChatOllama"),
+    "anthropic": ("langchain_anthropic", "ChatAnthropic"),
+    "openai": ("langchain_openai", "ChatOpenAI"),
+    "google": ("langchain_google_genai", "ChatGoogleGenerativeAI"),
+    "groq": ("langchain_groq", "ChatGroq"),
+}
+
+# keep idle connections to the local Ollama server open across turns
+# (httpx closes idle connections after 5 seconds by default, shorter than a typical user think time)
+OLLAMA_KEEPALIVE_EXPIRY = 300.0
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# bound runnables kept by bind_tools(), e.g. for callers that pass a new model per session
+MAX_BOUND_MODELS = 256
+
+# how long the Ollama server keeps a model loaded after a request: seconds or a duration like "30m",
+# negative keeps it loaded until the server stops (the OLLAMA_KEEP_ALIVE environment variable overrides it)
+OLLAMA_KEEP_ALIVE = "30m"
+
+_lock = threading.Lock()
+_models: dict[tuple, BaseChatModel] = {}
+# least recently used first, at most MAX_BOUND_MODELS (each entry keeps its model alive)
+_bound_models: OrderedDict[tuple, tuple[Runnable, BaseChatModel]] = OrderedDict()
+
+
+def get_chat_model(provider: str, model: str, **params: Any) -> BaseChatModel:
+    """Return the shared chat model client for (provider, model, params), creating it on first use."""
+    key = (provider, model, _freeze(params))
+    llm = _models.get(key)
+    if llm is not None:
+        return llm
+
+    with _lock:
+        llm = _models.get(key)
+        if llm is None:
+            llm = _create_chat_model(provider, model, params)
+            _models[key] = llm
+    return llm
+
+
+def get_chat_model_from_spec(spec: str, **params: Any) -> BaseChatModel:
+    """Shared chat model for a 'provider:model' spec, e.g. 'ollama:llama3.1:8b' or 'groq:openai/gpt-oss-120b'."""
+    provider, model = parse_spec(spec)
+    return get_chat_model(provider, model, **params)
+
+
+def parse_spec(spec: str) -> tuple[str, str]:
+    """(provider, model) of a 'provider:model' spec, the model name may contain ':' and '/'."""
+    provider, separator, model = spec.partition(":")
+    if not separator or not model:
+        raise ValueError(f"Invalid model spec '{spec}', expected 'provider:model', e.g. 'ollama:llama3.1'")
+    return provider, model
+
+
+@functools.cache
+def load_env() -> str:
+    """Load the nearest .env file into the environment once per process, returns its path ('' if none)."""
+    from dotenv import find_dotenv, load_dotenv
+
+    # find_dotenv walks up from this module's directory
+    path = find_dotenv()
+    if path:
+        load_dotenv(path)
+    return path
+
+
+def preload(specs: Sequence[str], **params: Any) -> dict[str, float]:
+    """Load the models of the 'provider:model' specs into memory (Ollama), returns the load time in seconds per spec.
+
+    Hosted providers have nothing to load, their load time is 0.0. The models are loaded concurrently,
+    with the keep_alive of the shared client, so they stay loaded for the turns that follow.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(specs))) as executor:
+        load_times = executor.map(lambda spec: _preload(get_chat_model_from_spec(spec, **params)), specs)
+        return dict(zip(specs, load_times))
+
+
+def bind_tools(llm: BaseChatModel, tools: Sequence[BaseTool], **kwargs: Any) -> Runnable:
+    """Return a cached `llm.bind_tools(tools)` runnable, the tool schemas are converted only once."""
+    # tools are keyed by what the LLM sees, name, description and args schema (not identity):
+    # a script re-executed by streamlit or a cached wrapper of a tool creates a new tool object
+    # with the same schema, a tool edited between reruns gets a new entry
+    key = (id(llm), tuple((tool.name, tool.description, _freeze(_args_schema(tool))) for tool in tools), _freeze(kwargs))
+    with _lock:
+        entry = _bound_models.get(key)
+        if entry is None:
+            # keep a reference to llm, so its id can't be reused while cached
+            entry = (llm.bind_tools(list(tools), **kwargs), llm)
+            _bound_models[key] = entry
+            if len(_bound_models) > MAX_BOUND_MODELS:
+                _bound_models.popitem(last=False)
+        else:
+            _bound_models.move_to_end(key)
+    return entry[0]
+
+
+def get_chat_model_with_tools(provider: str, model: str, tools: Sequence[BaseTool], **params: Any) -> Runnable:
+    """Return the shared chat model for (provider, model, params) with the given tools bound."""
+    return bind_tools(get_chat_model(provider, model, **params), tools)
+
+
+def provider_name(llm: BaseChatModel) -> str:
+    """Provider of a chat model as named in PROVIDERS (the LangChain llm type for other models)."""
+    module = type(llm).__module__
+    for provider, (module_name, _) in PROVIDERS.items():
+        if module.startswith(module_name):
+            return provider
+    return llm._llm_type
+
+
+def clear() -> None:
+    """Drop all cached clients (e.g. in tests or after changing the environment)."""
+    with _lock:
+        _models.clear()
+        _bound_models.clear()
+
+
+def _create_chat_model(provider: str, model: str, params: dict[str, Any]) -> BaseChatModel:
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider '{provider}', expected one of {sorted(PROVIDERS)}")
+
+    # API keys may come from a .env file
+    load_env()
+    module_name, class_name = PROVIDERS[provider]
+    chat_model_class = getattr(importlib.import_module(module_name), class_name)
+
+    if provider == "ollama":
+        params = {"keep_alive": os.environ.get("OLLAMA_KEEP_ALIVE", OLLAMA_KEEP_ALIVE),
+                  "client_kwargs": _ollama_client_kwargs(), **params}
+
+    return chat_model_class(model=model, **params)
+
+
+def _preload(llm: BaseChatModel) -> float:
+    if provider_name(llm) != "ollama":
+        return 0.0
+    # a generate request without a prompt only loads the model (and resets its keep_alive timer)
+    response = llm._client.generate(model=llm.model, keep_alive=llm.keep_alive)
+    return (response.load_duration or 0) / 1e9
+
+
+def _ollama_client_kwargs() -> dict[str, Any]:
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_keepalive_connections=OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+        )
+    }
+
+
+def _args_schema(tool: BaseTool) -> Any:
+    schema = tool.tool_call_schema
+    return schema if isinstance(schema, dict) else schema.model_json_schema()
+
+
+def _freeze(value: Any) -> Any:
+    # turn params into something hashable, so they can be part of the cache key
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(item) for item in value))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
@@ -0,0 +1,156 @@
+import threading
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, convert_to_messages
+from langchain_core.outputs import LLMResult
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from model_registry import provider_name
+
+# provider-side prompt caching of static prompt prefixes
+#
+# The system prompt (with the format instructions of a parser, or the SYSTEM_PROMPT of the travel
+# assistant) is sent again on every request. Providers can cache a prompt prefix that is
+# byte-identical to an earlier request:
+# - anthropic: only prefixes marked with a cache_control breakpoint are cached, with_prompt_caching()
+#   marks the leading system messages (and optionally the newest message for multi-turn chats)
+# - openai: prefixes of 1024+ tokens are cached automatically
+# - ollama: the server reuses the KV cache of the longest common prefix of the last request
+# So the message order has to stay prefix-stable: system prompt first, then the history in the
+# same order, new messages only appended at the end.
+# Anthropic only caches prefixes of at least 1024 tokens (2048 for Haiku), a shorter marked
+# prefix is sent uncached without an error.
+#
+# Cached and uncached input tokens are read from the `usage_metadata` of each response.
+#
+# usage:
+#   llm_claude = ChatAnthropic(model="claude-sonnet-4-5-20250929")
+#   chain = prompt_template | prompt_caching.with_prompt_caching(llm_claude) | parser
+#   print(prompt_caching.stats())
+
+CACHE_CONTROL = {"type": "ephemeral"}  # 5 minutes, refreshed by each cache hit
+
+# providers that need explicit cache breakpoints in the request
+EXPLICIT_CACHE_PROVIDERS = ("anthropic",)
+
+
+def mark_static_prefix(messages: list[BaseMessage], cache_conversation: bool = False) -> list[BaseMessage]:
+    """Copy of the messages with a cache breakpoint after the leading system messages.
+
+    With `cache_conversation`, the newest message gets a second breakpoint, so the next turn of a
+    chat reads the whole history up to there from the cache.
+    """
+    messages = list(messages)
+    prefix_end = 0
+    while prefix_end < len(messages) and isinstance(messages[prefix_end], SystemMessage):
+        prefix_end += 1
+    if prefix_end:
+        messages[prefix_end - 1] = _with_cache_control(messages[prefix_end - 1])
+
+    # the AI response is not part of the next request prefix yet, it is added after this call
+    if cache_conversation and len(messages) > prefix_end and not isinstance(messages[-1], AIMessage):
+        messages[-1] = _with_cache_control(messages[-1])
+    return messages
+
+
+def with_prompt_caching(llm: BaseChatModel | Runnable, cache_conversation: bool = False,
+                        provider: str | None = None) -> Runnable:
+    """Chat model (or model with bound tools) that marks its static prompt prefix for caching.
+
+    Models of providers that cache automatically are returned unchanged, apart from the cache
+    usage accounting.
+    """
+    model = _chat_model_of(llm)
+    if provider is None and isinstance(model, BaseChatModel):
+        provider = provider_name(model)
+    runnable = llm
+    if provider in EXPLICIT_CACHE_PROVIDERS:
+        mark = RunnableLambda(lambda value: _mark_input(value, cache_conversation), name="mark_static_prefix")
+        runnable = mark | llm
+    return runnable.with_config(callbacks=[usage])
+
+
+def cache_usage(message: AIMessage) -> dict[str, int]:
+    """Cached, newly cached and uncached input tokens of a single response."""
+    usage_metadata = message.usage_metadata or {}
+    details = usage_metadata.get("input_token_details") or {}
+    cache_read = details.get("cache_read") or 0
+    cache_creation = ((details.get("cache_creation") or 0) + (details.get("ephemeral_5m_input_tokens") or 0)
+                      + (details.get("ephemeral_1h_input_tokens") or 0))
+    input_tokens = usage_metadata.get("input_tokens", 0)
+    return {
+        "cache_read": cache_read,
+        "cache_creation": cache_creation,
+        "uncached": input_tokens - cache_read - cache_creation,
+    }
+
+
+class CacheUsageCallbackHandler(BaseCallbackHandler):
+    """Sums up the cache usage of all responses of the models wrapped by with_prompt_caching()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.totals = {"cache_read": 0, "cache_creation": 0, "uncached": 0}
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if isinstance(message, AIMessage) and message.usage_metadata:
+                    with self._lock:
+                        self.requests += 1
+                        for key, tokens in cache_usage(message).items():
+                            self.totals[key] += tokens
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            input_tokens = sum(self.totals.values())
+            return {
+                "requests": self.requests,
+                "input_tokens": input_tokens,
+                **{f"{key}_tokens": tokens for key, tokens in self.totals.items()},
+                "cache_hit_rate": round(self.totals["cache_read"] / input_tokens, 3) if input_tokens else 0.0,
+            }
+
+
+# process-wide cache usage of all models wrapped by with_prompt_caching()
+usage = CacheUsageCallbackHandler()
+
+
+def stats() -> dict[str, Any]:
+    return usage.stats()
+
+
+def _mark_input(value: Any, cache_conversation: bool) -> Any:
+    if isinstance(value, str):
+        return value  # a single user message, no static prefix
+    messages = value.to_messages() if isinstance(value, PromptValue) else convert_to_messages(value)
+    return mark_static_prefix(messages, cache_conversation)
+
+
+def _with_cache_control(message: BaseMessage) -> BaseMessage:
+    content = message.content
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [block if isinstance(block, dict) else {"type": "text", "text": block} for block in content]
+    if not blocks:
+        return message
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return message.model_copy(update={"content": blocks})
+
+
+def _chat_model_of(llm: BaseChatModel | Runnable) -> BaseChatModel | Runnable:
+    # llm.bind_tools() returns a RunnableBinding around the chat model,
+    # llm.with_structured_output() and llm | parser a RunnableSequence starting with it
+    while not isinstance(llm, BaseChatModel):
+        inner = getattr(llm, "bound", None) or getattr(llm, "first", None)
+        if inner is None:
+            break
+        llm = inner
+    return llm
@@ -0,0 +1,278 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from model_registry import provider_name
+
+# process-wide client-side rate limits per (provider, model)
+#
+# Parallel branches (RunnableParallel, batch jobs, threads, asyncio tasks) of the same model share
+# one limiter, so a fan-out waits in our process instead of running into 429 responses:
+# - requests per minute and tokens per minute, each as a token bucket
+# - a request reserves its estimated tokens (prompt + expected completion) before it is sent,
+#   the reservation is corrected with the real `usage_metadata` when the response arrives
+# - a waiting request re-checks the buckets at least every POLL_INTERVAL, so tokens given back by a
+#   correction are used right away, the time a request waits is recorded as queue wait
+# - cache hits (see response_cache.py) don't count, LangChain only asks the limiter on a cache miss
+#
+# usage:
+#   chat_model = rate_limiter.enable(ChatOpenAI(model="gpt-4o-mini"))
+#   print(rate_limiter.stats())
+
+DEFAULT_OUTPUT_TOKENS = 256  # expected completion length if the model has no max tokens setting
+POLL_INTERVAL = 0.25  # seconds
+
+
+@dataclass(frozen=True)
+class Limits:
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+
+
+# conservative defaults (lowest paid / free tiers), pass `limits` to enable() for your own account
+DEFAULT_LIMITS = {
+    "anthropic": Limits(requests_per_minute=50, tokens_per_minute=30_000),
+    "openai": Limits(requests_per_minute=500, tokens_per_minute=200_000),
+    "google": Limits(requests_per_minute=15, tokens_per_minute=250_000),
+    "groq": Limits(requests_per_minute=30, tokens_per_minute=8_000),
+    "ollama": Limits(),  # local server, no limits
+}
+
+# model fields limiting the completion length, used for the pre-call estimate
+_MAX_OUTPUT_FIELDS = ("max_tokens", "max_output_tokens", "num_predict")
+
+
+class TokenBucket:
+    """Token bucket refilled continuously up to `per_minute` tokens, corrections may push it into debt."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.refill_rate = per_minute / 60.0  # tokens per second
+        self.tokens = per_minute
+        self._clock = clock
+        self._updated = clock()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (a request above capacity waits for a full bucket)."""
+        self._refill()
+        needed = min(amount, self.capacity)
+        return max(0.0, (needed - self.tokens) / self.refill_rate)
+
+    def take(self, amount: float) -> None:
+        """Take (or give back, if negative) tokens."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """RPM and TPM limits of one (provider, model), shared by all threads and event loops."""
+
+    def __init__(self, limits: Limits, clock: Callable[[], float] = time.monotonic):
+        self.limits = limits
+        self._requests = TokenBucket(limits.requests_per_minute, clock) if limits.requests_per_minute else None
+        self._tokens = TokenBucket(limits.tokens_per_minute, clock) if limits.tokens_per_minute else None
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.queued = 0  # requests that had to wait
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.estimated_tokens = 0
+        self.used_tokens = 0
+
+    def try_acquire(self, tokens: int) -> float:
+        """Take one request and `tokens` estimated tokens if both are available, else return the seconds to wait."""
+        with self._lock:
+            wait = 0.0
+            if self._requests:
+                wait = max(wait, self._requests.wait_time(1))
+            if self._tokens:
+                wait = max(wait, self._tokens.wait_time(tokens))
+            if wait == 0.0:
+                if self._requests:
+                    self._requests.take(1)
+                if self._tokens:
+                    self._tokens.take(tokens)
+            return wait
+
+    def acquire(self, tokens: int) -> float:
+        """Block until the request may be sent, returns the queue wait in seconds."""
+        start = time.perf_counter()
+        while (wait := self.try_acquire(tokens)) > 0:
+            time.sleep(min(wait, POLL_INTERVAL))
+        return self._record(tokens, time.perf_counter() - start)
+
+    async def aacquire(self, tokens: int) -> float:
+        start = time.perf_counter()
+        while (wait := self.try_acquire(tokens)) > 0:
+            await asyncio.sleep(min(wait, POLL_INTERVAL))
+        return self._record(tokens, time.perf_counter() - start)
+
+    def correct(self, estimated_tokens: int, used_tokens: int) -> None:
+        """Replace the estimate of a finished request with its real token usage."""
+        with self._lock:
+            self.used_tokens += used_tokens
+            if self._tokens:
+                self._tokens.take(used_tokens - estimated_tokens)
+
+    def _record(self, tokens: int, wait: float) -> float:
+        with self._lock:
+            self.requests += 1
+            self.estimated_tokens += tokens
+            if wait > 0.001:
+                self.queued += 1
+                self.queue_wait_total += wait
+                self.queue_wait_max = max(self.queue_wait_max, wait)
+        return wait
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "queued": self.queued,
+                "queue_wait_total": round(self.queue_wait_total, 3),
+                "queue_wait_avg": round(self.queue_wait_total / self.requests, 3) if self.requests else 0.0,
+                "queue_wait_max": round(self.queue_wait_max, 3),
+                "estimated_tokens": self.estimated_tokens,
+                "used_tokens": self.used_tokens,
+            }
+
+
+@dataclass
+class _Reservation:
+    tokens: int
+    acquired: bool = False
+
+
+# estimate of the model call that is about to be sent (set by the callback, read by the limiter hook)
+_current_reservation: ContextVar[_Reservation | None] = ContextVar("rate_limit_reservation", default=None)
+
+
+class ModelRateLimiter(BaseRateLimiter):
+    """LangChain `rate_limiter` hook of a chat model, acquires the shared RateLimiter."""
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+
+    # LangChain's chat models always acquire with blocking=True
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        reservation = _current_reservation.get()
+        tokens = reservation.tokens if reservation else DEFAULT_OUTPUT_TOKENS
+        self.limiter.acquire(tokens)
+        if reservation:
+            reservation.acquired = True
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        reservation = _current_reservation.get()
+        tokens = reservation.tokens if reservation else DEFAULT_OUTPUT_TOKENS
+        await self.limiter.aacquire(tokens)
+        if reservation:
+            reservation.acquired = True
+        return True
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """Estimates the tokens of each model call before it is sent and corrects them afterwards."""
+
+    # inline: the estimate has to be set in the context of the model call itself
+    run_inline = True
+
+    def __init__(self, limiter: RateLimiter, expected_output_tokens: int):
+        self.limiter = limiter
+        self.expected_output_tokens = expected_output_tokens
+        self._reservations: dict[UUID, _Reservation] = {}
+
+    def on_chat_model_start(self, serialized: dict[str, Any], messages: list[list[BaseMessage]], *,
+                            run_id: UUID, **kwargs: Any) -> None:
+        tokens = sum(count_tokens_approximately(message_list) for message_list in messages)
+        reservation = _Reservation(tokens=tokens + self.expected_output_tokens)
+        self._reservations[run_id] = reservation
+        _current_reservation.set(reservation)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        reservation = self._reservations.pop(run_id, None)
+        if reservation is None or not reservation.acquired:
+            return  # answered from the cache
+        used_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    used_tokens += usage["total_tokens"]
+        if used_tokens:
+            self.limiter.correct(reservation.tokens, used_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # a failed request keeps its estimate, most providers count rejected requests as well
+        self._reservations.pop(run_id, None)
+
+
+_lock = threading.Lock()
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+
+
+def get_limiter(provider: str, model: str, limits: Limits | None = None) -> RateLimiter:
+    """Return the shared RateLimiter of (provider, model), creating it on first use."""
+    key = (provider, model)
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(limits or DEFAULT_LIMITS.get(provider, Limits()))
+            _limiters[key] = limiter
+    return limiter
+
+
+def enable(llm: BaseChatModel, limits: Limits | None = None) -> BaseChatModel:
+    """Copy of the chat model with the shared rate limiter of its provider and model name attached.
+
+    The model itself is left alone: it may be the shared client of model_registry, used by other callers.
+    `limits` only takes effect for the first model of a (provider, model), later ones share its limiter.
+    """
+    provider = provider_name(llm)
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or llm._llm_type
+    limiter = get_limiter(provider, model, limits)
+
+    handler = RateLimitCallbackHandler(limiter, _expected_output_tokens(llm))
+    if llm.callbacks is None:
+        callbacks = [handler]
+    elif isinstance(llm.callbacks, list):
+        callbacks = [callback for callback in llm.callbacks
+                     if not isinstance(callback, RateLimitCallbackHandler)] + [handler]
+    else:
+        callbacks = llm.callbacks.copy()
+        callbacks.add_handler(handler)
+    return llm.model_copy(update={"rate_limiter": ModelRateLimiter(limiter), "callbacks": callbacks})
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    """Queue wait and token counters of all limiters, keyed by 'provider/model'."""
+    with _lock:
+        limiters = dict(_limiters)
+    return {f"{provider}/{model}": limiter.stats() for (provider, model), limiter in limiters.items()}
+
+
+def _expected_output_tokens(llm: BaseChatModel) -> int:
+    for field in _MAX_OUTPUT_FIELDS:
+        value = getattr(llm, field, None)
+        if isinstance(value, int) and value > 0:
+            return value
+    return DEFAULT_OUTPUT_TOKENS
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+
+# persistent exact-match cache for LLM responses
+#
+# Scripts like 4_chain_parallel.py re-send identical prompts on every run. With the cache
+# enabled, a repeated request is answered from a single SQLite file instead:
+# - key: provider, model, sampling params and the canonicalized message list
+# - every entry has a time to live, the file is kept below `max_bytes` (least recently used first)
+# - calls with temperature > 0 (or the provider's default temperature) bypass the cache,
+#   unless `allow_sampling=True` is passed explicitly
+# - works with every chat model (Ollama, Anthropic, OpenAI, Google, Groq) through LangChain's `cache` hook
+#
+# usage:
+#   chat_model = response_cache.enable(ChatOpenAI(model="gpt-4o-mini", temperature=0))
+
+DEFAULT_PATH = ".llm_response_cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600.0  # seconds
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+# model fields that change the sampled output (part of the cache key if set)
+SAMPLING_PARAMS = (
+    "temperature", "top_p", "top_k", "max_tokens", "num_predict", "max_output_tokens", "seed",
+    "frequency_penalty", "presence_penalty", "repeat_penalty", "stop", "reasoning", "reasoning_effort",
+)
+
+# message fields that differ between runs without changing the prompt
+_VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+class ResponseCache:
+    """SQLite store for serialized LLM responses with per-entry TTL and size-based LRU eviction."""
+
+    def __init__(self, path: str = DEFAULT_PATH, default_ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str, ttl: float | None = None) -> None:
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), expires_at, now),
+            )
+            self._evict(now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses, "bypassed": self.bypassed}
+
+    def _evict(self, now: float) -> None:
+        self._connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        (size,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if size <= self.max_bytes:
+            return
+
+        # drop the least recently used entries until the store fits again
+        to_free = size - self.max_bytes
+        for key, entry_size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            to_free -= entry_size
+            if to_free <= 0:
+                break
+
+
+class ModelResponseCache(BaseCache):
+    """LangChain cache hook of one chat model, stores its responses in a shared ResponseCache."""
+
+    def __init__(self, store: ResponseCache, llm: BaseChatModel, allow_sampling: bool = False,
+                 ttl: float | None = None):
+        self.store = store
+        self.ttl = ttl
+        self.model_key = model_key(llm)
+        self.enabled = allow_sampling or _is_deterministic(llm)
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        if not self.enabled:
+            self.store.bypassed += 1
+            return None
+        value = self.store.get(self._key(prompt, llm_string))
+        return _loads(value) if value is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.enabled:
+            self.store.put(self._key(prompt, llm_string), _dumps(return_val), self.ttl)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        key = {"model": self.model_key, "llm": llm_string, "messages": canonicalize_prompt(prompt)}
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+_default_store: ResponseCache | None = None
+
+
+def default_store() -> ResponseCache:
+    """The process-wide ResponseCache in DEFAULT_PATH, opened on first use."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ResponseCache()
+    return _default_store
+
+
+def enable(llm: BaseChatModel, store: ResponseCache | None = None, allow_sampling: bool = False,
+           ttl: float | None = None) -> BaseChatModel:
+    """Copy of the chat model (any provider) with the response cache attached.
+
+    The model itself is left alone: it may be the shared client of model_registry, used by other callers.
+    """
+    cache = ModelResponseCache(store or default_store(), llm, allow_sampling=allow_sampling, ttl=ttl)
+    return llm.model_copy(update={"cache": cache})
+
+
+def model_key(llm: BaseChatModel) -> dict[str, Any]:
+    """Provider, model and sampling params of a chat model."""
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None)
+    params = {name: getattr(llm, name) for name in SAMPLING_PARAMS if getattr(llm, name, None) is not None}
+    return {"provider": llm._llm_type, "model": model, "params": params}
+
+
+def canonicalize_prompt(prompt: str) -> Any:
+    """Serialized message list without ids and metadata, so equal conversations get equal keys."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    return _strip_volatile_fields(messages)
+
+
+def _strip_volatile_fields(value: Any, in_kwargs: bool = False) -> Any:
+    # the serialized constructor {"lc": 1, "id": [..., "HumanMessage"], "kwargs": {...}} keeps its
+    # class path, only the message fields inside "kwargs" (and tool calls within) lose their ids
+    if isinstance(value, dict):
+        if "lc" in value and "kwargs" in value:
+            return {**value, "kwargs": _strip_volatile_fields(value["kwargs"], in_kwargs=True)}
+        return {
+            key: _strip_volatile_fields(item, in_kwargs)
+            for key, item in value.items()
+            if not (in_kwargs and key in _VOLATILE_MESSAGE_FIELDS)
+        }
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [_strip_volatile_fields(item, in_kwargs) for item in value]
+    return value
+
+
+def _dumps(generations: RETURN_VAL_TYPE) -> str:
+    return json.dumps([
+        {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+        for generation in generations
+    ])
+
+
+def _loads(value: str) -> RETURN_VAL_TYPE:
+    return [
+        ChatGeneration(message=messages_from_dict([item["message"]])[0], generation_info=item["generation_info"])
+        for item in json.loads(value)
+    ]
+
+
+def _is_deterministic(llm: BaseChatModel) -> bool:
+    # no temperature set means the provider default, which is > 0 for all providers used here
+    temperature = getattr(llm, "temperature", None)
+    return temperature is not None and temperature <= 0
@@ -0,0 +1,70 @@
+import time
+from collections.abc import Generator, Sequence
+from dataclasses import dataclass
+
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.messages.utils import message_chunk_to_message
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+
+import tool_runner
+from metrics import model_load_time
+
+# streaming version of the tool loop used by the chatbots
+#
+# Instead of waiting for the whole answer with invoke(), the tokens are yielded as they
+# arrive, also for the final answer after one or more tool call rounds. The time to first
+# token (TTFT) of every turn and the time the server spent loading the model (Ollama's
+# load_duration) are measured and returned when the stream is exhausted.
+#
+# usage:
+#   chat_history.append(HumanMessage(content=question))
+#   metrics = yield from streaming.stream_turn(llm_with_tools, chat_history, [get_forecast])
+
+
+@dataclass
+class TurnMetrics:
+    time_to_first_token: float | None = None  # seconds until the first content token, None if there was none
+    total_time: float = 0.0  # seconds for the whole turn, tool calls included
+    load_time: float = 0.0  # seconds of total_time the server spent loading the model
+    model_calls: int = 0
+    tool_calls: int = 0
+
+    def __str__(self) -> str:
+        ttft = "-" if self.time_to_first_token is None else f"{self.time_to_first_token:.2f}s"
+        return (f"time to first token: {ttft}, total: {self.total_time:.2f}s, model load: {self.load_time:.2f}s, "
+                f"model calls: {self.model_calls}, tool calls: {self.tool_calls}")
+
+
+def stream_turn(llm: Runnable, chat_history: list[BaseMessage],
+                tools: Sequence[BaseTool] = ()) -> Generator[str, None, TurnMetrics]:
+    """Stream one turn: yield the content tokens, run requested tools, append all messages to chat_history."""
+    metrics = TurnMetrics()
+    start = time.perf_counter()
+
+    while True:
+        response = None
+        for chunk in llm.stream(chat_history):
+            response = chunk if response is None else response + chunk
+            token = chunk.text
+            if token:
+                if metrics.time_to_first_token is None:
+                    metrics.time_to_first_token = time.perf_counter() - start
+                yield token
+        if response is None:
+            # nothing to append: an empty message would end the turn as if the model had answered
+            raise RuntimeError("The model returned an empty stream, no message was added to the chat history")
+        metrics.model_calls += 1
+        metrics.load_time += model_load_time(response)
+
+        response = message_chunk_to_message(response) if isinstance(response, AIMessageChunk) else response
+        chat_history.append(response)
+
+        # check if the model wants to use a tool
+        if not response.tool_calls:
+            break
+        chat_history.extend(tool_runner.run_tool_calls(response.tool_calls, tools))
+        metrics.tool_calls += len(response.tool_calls)
+
+    metrics.total_time = time.perf_counter() - start
+    return metrics
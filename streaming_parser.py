@@ -0,0 +1,161 @@
+import json
+import typing
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import BaseTransformOutputParser, PydanticOutputParser
+from pydantic import BaseModel, ValidationError
+
+# streaming parser for pydantic schemas with a list of items, like LibrariesOutput
+#
+# PydanticOutputParser waits for the complete answer before it returns anything. This parser
+# scans the token stream and yields each item of the list as soon as its JSON object closes:
+# - every item is validated on its own, a broken item is yielded as an ItemError and the
+#   following items are still parsed
+# - the format instructions are the same as those of PydanticOutputParser
+# - invoke() returns the list of all items, stream() yields them one by one
+#
+# usage:
+#   parser = StreamingListParser(pydantic_object=LibrariesOutput)
+#   for item in (prompt_template | llm | parser).stream(inputs):
+#       print(item)
+#   result: LibrariesOutput = parser.to_model(items)
+
+
+@dataclass
+class ItemError:
+    """An item of the list that could not be parsed or validated."""
+    index: int
+    raw: str
+    error: Exception
+
+    def __str__(self) -> str:
+        return f"item {self.index} is invalid: {self.error}"
+
+
+class _ItemScanner:
+    """Incremental JSON scanner that cuts the objects of one list out of a growing text."""
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.text = ""
+        self.position = 0
+        self.stack: list[str] = []  # open containers, "{" or "["
+        self.target_depth: int | None = None  # stack depth of the item list once it is found
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+        self.last_string = ""
+        self.item_start = 0
+
+    def feed(self, text: str) -> list[str]:
+        """Add text, returns the raw JSON of all items completed by it."""
+        self.text += text
+        items = []
+        for position in range(self.position, len(self.text)):
+            char = self.text[position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    self.last_string = self.text[self.string_start:position]
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = position + 1
+            elif char in "{[":
+                self.stack.append(char)
+                if char == "[" and self.target_depth is None and self._is_item_list():
+                    self.target_depth = len(self.stack)
+                elif char == "{" and self.target_depth is not None and len(self.stack) == self.target_depth + 1:
+                    self.item_start = position
+            elif char in "}]" and self.stack:
+                if (char == "}" and self.target_depth is not None
+                        and len(self.stack) == self.target_depth + 1):
+                    items.append(self.text[self.item_start:position + 1])
+                if char == "]" and len(self.stack) == self.target_depth:
+                    self.target_depth = -1  # the list is complete, ignore everything after it
+                self.stack.pop()
+        self.position = len(self.text)
+        return items
+
+    def _is_item_list(self) -> bool:
+        # {"libraries": [ ... ]} or a bare top-level list [ ... ]
+        if len(self.stack) == 1:
+            return True
+        return len(self.stack) == 2 and self.stack[0] == "{" and self.last_string == self.field_name
+
+
+class StreamingListParser(BaseTransformOutputParser[Any]):
+    """Parses a model with a single list field item by item, while the answer is generated."""
+
+    pydantic_object: type[BaseModel]
+
+    @property
+    def field_name(self) -> str:
+        return self._list_field()[0]
+
+    @property
+    def item_model(self) -> type[BaseModel]:
+        return self._list_field()[1]
+
+    def get_format_instructions(self) -> str:
+        return PydanticOutputParser(pydantic_object=self.pydantic_object).get_format_instructions()
+
+    def parse(self, text: str) -> list[BaseModel | ItemError]:
+        """All items of a complete answer."""
+        return self._parse_items(_ItemScanner(self.field_name).feed(text), start_index=0)
+
+    def to_model(self, items: list[BaseModel | ItemError]) -> BaseModel:
+        """The complete pydantic object of the valid items (ItemErrors are skipped)."""
+        return self.pydantic_object(**{self.field_name: [item for item in items if not isinstance(item, ItemError)]})
+
+    @property
+    def _type(self) -> str:
+        return "streaming_list"
+
+    def _transform(self, input: Iterator[str | BaseMessage]) -> Iterator[BaseModel | ItemError]:
+        scanner = _ItemScanner(self.field_name)
+        index = 0
+        for chunk in input:
+            raw_items = scanner.feed(_chunk_text(chunk))
+            yield from self._parse_items(raw_items, index)
+            index += len(raw_items)
+
+    async def _atransform(self, input: AsyncIterator[str | BaseMessage]) -> AsyncIterator[BaseModel | ItemError]:
+        scanner = _ItemScanner(self.field_name)
+        index = 0
+        async for chunk in input:
+            raw_items = scanner.feed(_chunk_text(chunk))
+            for item in self._parse_items(raw_items, index):
+                yield item
+            index += len(raw_items)
+
+    def _parse_items(self, raw_items: list[str], start_index: int) -> list[BaseModel | ItemError]:
+        items = []
+        for index, raw in enumerate(raw_items, start=start_index):
+            try:
+                items.append(self.item_model.model_validate(json.loads(raw)))
+            except (ValueError, ValidationError) as error:
+                items.append(ItemError(index=index, raw=raw, error=error))
+        return items
+
+    def _list_field(self) -> tuple[str, type[BaseModel]]:
+        for name, field in self.pydantic_object.model_fields.items():
+            if typing.get_origin(field.annotation) is list:
+                (item_type,) = typing.get_args(field.annotation)
+                if isinstance(item_type, type) and issubclass(item_type, BaseModel):
+                    return name, item_type
+        raise ValueError(f"{self.pydantic_object.__name__} has no list field of pydantic models")
+
+
+def _chunk_text(chunk: str | BaseMessage) -> str:
+    if isinstance(chunk, BaseMessage):
+        return chunk.text
+    return chunk
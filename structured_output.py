@@ -0,0 +1,68 @@
+from collections.abc import Callable
+from typing import Any, Literal
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+# structured output with the provider's native mode instead of a JSON schema in the prompt
+#
+# PydanticOutputParser pastes the whole JSON schema of the output model into the prompt
+# (format instructions) and parses the free text answer. With mode="native", the model gets
+# the schema through its own structured output support instead:
+# - ollama: JSON schema constrained decoding (`format`)
+# - openai, anthropic, google, groq: tool calling / JSON schema response format
+# The answer is then valid JSON of the schema by construction. A model without native support
+# falls back to the format instructions parser ("prompt" mode).
+#
+# usage:
+#   prompt_template = ChatPromptTemplate.from_messages([("system", "... {format_instructions}"), ...])
+#   chain = structured_output.create_chain(prompt_template, llm, LibrariesOutput, mode="native")
+#   result: LibrariesOutput = chain.invoke(inputs)
+
+Mode = Literal["native", "prompt"]
+MODES: tuple[Mode, ...] = ("native", "prompt")
+
+# fills the {format_instructions} variable of the prompt in native mode (the schema is sent separately)
+NATIVE_FORMAT_INSTRUCTIONS = "{name} (it is provided as the structured output format of this request)"
+
+
+def create_chain(prompt_template: ChatPromptTemplate, llm: BaseChatModel, schema: type[BaseModel],
+                 mode: Mode = "native", wrap_model: Callable[[Runnable], Runnable] | None = None) -> Runnable:
+    """prompt_template | model returning `schema` objects, the prompt needs a {format_instructions} variable.
+
+    `wrap_model` is applied to the model part of the chain, e.g. prompt_caching.with_prompt_caching.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown structured output mode '{mode}', expected one of {MODES}")
+
+    model = native_model(llm, schema) if mode == "native" else None
+    if model is not None:
+        format_instructions = NATIVE_FORMAT_INSTRUCTIONS.format(name=schema.__name__)
+    else:
+        parser = PydanticOutputParser(pydantic_object=schema)
+        format_instructions = parser.get_format_instructions()
+        model = llm | parser
+
+    if wrap_model is not None:
+        model = wrap_model(model)
+    return prompt_template.partial(format_instructions=format_instructions) | model
+
+
+def native_model(llm: BaseChatModel, schema: type[BaseModel]) -> Runnable | None:
+    """`llm` with the provider's native structured output for `schema`, None if not supported."""
+    try:
+        structured_llm = llm.with_structured_output(schema)
+    except NotImplementedError:
+        return None
+    return structured_llm | RunnableLambda(lambda result: _check_result(result, schema), name="check_structured_output")
+
+
+def _check_result(result: Any, schema: type[BaseModel]) -> BaseModel:
+    # tool calling returns None if the model answered without calling the schema tool
+    if not isinstance(result, schema):
+        raise OutputParserException(f"Model returned no {schema.__name__}, got: {result!r}")
+    return result
@@ -0,0 +1,35 @@
+import asyncio
+
+from chat_server import ChatService
+
+
+class FakeConversation:
+    def __init__(self):
+        self.chat_history = []
+
+    async def aask(self, user_message: str) -> str:
+        self.chat_history.append(user_message)
+        return "answer"
+
+
+def test_new_session_is_kept_when_all_other_sessions_are_pending():
+    service = ChatService(FakeConversation, max_sessions=1)
+    busy = service.session("a")
+    busy.pending = 1  # turn in flight
+
+    new = service.session("b")
+
+    assert service.session("b") is new
+    assert service.session("a") is busy
+    assert service.stats()["sessions"] == 2
+    assert service.evictions == 0
+
+
+def test_lru_session_is_evicted_once_it_is_idle():
+    service = ChatService(FakeConversation, max_sessions=1)
+    asyncio.run(service.ask("a", "hello"))
+    asyncio.run(service.ask("b", "hello"))
+
+    assert service.describe("a") is None
+    assert service.describe("b")["turns"] == 1
+    assert service.evictions == 1
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+# process-wide TTL cache for tool results
+#
+# Users ask about the same cities over and over. A cached tool answers repeated calls from
+# the cache instead of running the tool again, for every Conversation in the process:
+# - key: the tool's function (module and qualified name, so two tools with the same name but a
+#   different implementation don't share results) + its args
+# - with normalize=True, the case and whitespace of string args are folded ("  paris " and "Paris"
+#   are the same call). Only for tools that treat such args the same, the tool still gets the
+#   original args
+# - every tool has its own time to live (a forecast is only valid for a while)
+# - at most `max_size` results are kept, the least recently used one is evicted first
+# - hits and misses are counted
+#
+# usage:
+#   get_forecast = tool_cache.cached(get_forecast, ttl=600)
+#   search = tool_cache.cached(search, normalize=True)  # case-insensitive tool
+#   llm_with_tools = llm.bind_tools([get_forecast])
+#   print(tool_cache.shared_cache.stats())
+
+DEFAULT_TTL = 300.0  # seconds
+DEFAULT_MAX_SIZE = 1024
+
+_MISSING = object()
+
+
+class ToolResultCache:
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, default_ttl: float = DEFAULT_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> (expires at, result), least recently used first
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(tool_id: str, args: dict[str, Any], normalize: bool = False) -> tuple:
+        return (tool_id, _freeze(args, normalize))
+
+    def get(self, key: tuple) -> Any:
+        """Return the cached result or `_MISSING`, counting the hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                # expired
+                del self._entries[key]
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key: tuple, result: Any, ttl: float | None = None) -> None:
+        expires_at = self.clock() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# shared by all conversations in the process
+shared_cache = ToolResultCache()
+
+
+def cached(tool: BaseTool, ttl: float | None = None, cache: ToolResultCache | None = None,
+           normalize: bool = False) -> BaseTool:
+    """Wrap a tool, so its results are served from the cache while they are younger than `ttl`.
+
+    The wrapper has the same name, description and args schema as the tool, so the LLM sees no difference.
+    `normalize` folds case and whitespace of string args in the cache key, only use it for tools that do the same.
+    """
+    cache = shared_cache if cache is None else cache
+    tool_id = _tool_id(tool)
+
+    def run(**kwargs: Any) -> Any:
+        key = cache.make_key(tool_id, kwargs, normalize)
+        result = cache.get(key)
+        if result is _MISSING:
+            result = tool.invoke(kwargs)
+            cache.put(key, result, ttl)
+        return result
+
+    async def arun(**kwargs: Any) -> Any:
+        key = cache.make_key(tool_id, kwargs, normalize)
+        result = cache.get(key)
+        if result is _MISSING:
+            result = await tool.ainvoke(kwargs)
+            cache.put(key, result, ttl)
+        return result
+
+    return StructuredTool.from_function(
+        func=run,
+        # only async tools get a coroutine, sync tools keep running in a thread when awaited
+        coroutine=arun if getattr(tool, "coroutine", None) is not None else None,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
+
+
+def _tool_id(tool: BaseTool) -> str:
+    # the implementing function, not the object: a script re-executed by streamlit creates a new
+    # tool object for the same function, which should keep using the cached results
+    function = getattr(tool, "func", None) or getattr(tool, "coroutine", None)
+    if function is not None:
+        return f"{function.__module__}.{function.__qualname__}"
+    return f"{type(tool).__module__}.{type(tool).__qualname__}:{tool.name}"
+
+
+def _freeze(value: Any, normalize: bool) -> Any:
+    # make dicts and lists hashable, with normalize fold case and whitespace of strings
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold() if normalize else value
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item, normalize)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item, normalize) for item in value)
+    return value
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from langchain_core.messages import ToolCall, ToolMessage
+from langchain_core.tools import BaseTool
+
+# execute all tool calls of one AIMessage concurrently
+#
+# A turn that asks about five cities makes five get_forecast calls. Instead of running them
+# one after another, they run at the same time:
+# - sync tools on a shared thread pool (run_tool_calls)
+# - async tools on asyncio (arun_tool_calls, or inside a worker thread for run_tool_calls)
+# Each call has its own timeout, and the ToolMessages are returned in the original tool_call
+# order, so the chat history stays deterministic.
+#
+# usage:
+#   while response.tool_calls:
+#       chat_history.extend(tool_runner.run_tool_calls(response.tool_calls, [get_forecast]))
+#       response = llm_with_tools.invoke(chat_history)
+
+TOOL_TIMEOUT = 30.0  # seconds per tool call
+MAX_WORKERS = 16
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="tool-call")
+
+
+def run_tool_calls(tool_calls: Sequence[ToolCall], tools: Sequence[BaseTool],
+                   timeout: float = TOOL_TIMEOUT, timeouts: dict[str, float] | None = None) -> list[ToolMessage]:
+    """Run the tool calls concurrently on the thread pool, results in tool_call order.
+
+    `timeouts` overrides the timeout for single tools by name. A call that times out or raises
+    is answered with an error ToolMessage, the other calls are not affected.
+    (a timed out sync tool can't be interrupted, it finishes in the background)
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    started = []
+    for tool_call in tool_calls:
+        future = _executor.submit(_invoke_tool, tools_by_name, tool_call)
+        started.append((tool_call, future, time.monotonic()))
+
+    results = []
+    for tool_call, future, start in started:
+        call_timeout = _timeout_for(tool_call, timeout, timeouts)
+        remaining = max(0.0, start + call_timeout - time.monotonic())
+        try:
+            content = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            results.append(_error_message(tool_call, f"tool call timed out after {call_timeout}s"))
+            continue
+        except Exception as error:
+            results.append(_error_message(tool_call, str(error)))
+            continue
+        results.append(ToolMessage(content=str(content), tool_call_id=tool_call["id"]))
+
+    return results
+
+
+async def arun_tool_calls(tool_calls: Sequence[ToolCall], tools: Sequence[BaseTool],
+                          timeout: float = TOOL_TIMEOUT, timeouts: dict[str, float] | None = None) -> list[ToolMessage]:
+    """Async version of run_tool_calls: async tools run on the event loop, sync tools in a thread."""
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    async def run(tool_call: ToolCall) -> ToolMessage:
+        call_timeout = _timeout_for(tool_call, timeout, timeouts)
+        try:
+            content = await asyncio.wait_for(_ainvoke_tool(tools_by_name, tool_call), timeout=call_timeout)
+        except TimeoutError:
+            return _error_message(tool_call, f"tool call timed out after {call_timeout}s")
+        except Exception as error:
+            return _error_message(tool_call, str(error))
+        return ToolMessage(content=str(content), tool_call_id=tool_call["id"])
+
+    # gather keeps the order of its arguments
+    return list(await asyncio.gather(*(run(tool_call) for tool_call in tool_calls)))
+
+
+def _invoke_tool(tools_by_name: dict[str, BaseTool], tool_call: ToolCall):
+    tool = _get_tool(tools_by_name, tool_call)
+    if getattr(tool, "coroutine", None) is not None:
+        # async tool called from sync code: give it its own event loop in this worker thread
+        return asyncio.run(tool.ainvoke(tool_call["args"]))
+    return tool.invoke(tool_call["args"])
+
+
+async def _ainvoke_tool(tools_by_name: dict[str, BaseTool], tool_call: ToolCall):
+    tool = _get_tool(tools_by_name, tool_call)
+    # BaseTool.ainvoke runs sync tools in the default thread pool executor
+    return await tool.ainvoke(tool_call["args"])
+
+
+def _get_tool(tools_by_name: dict[str, BaseTool], tool_call: ToolCall) -> BaseTool:
+    tool = tools_by_name.get(tool_call["name"])
+    if tool is None:
+        raise ValueError(f"unknown tool '{tool_call['name']}'")
+    return tool
+
+
+def _timeout_for(tool_call: ToolCall, timeout: float, timeouts: dict[str, float] | None) -> float:
+    if timeouts and tool_call["name"] in timeouts:
+        return timeouts[tool_call["name"]]
+    return timeout
+
+
+def _error_message(tool_call: ToolCall, error: str) -> ToolMessage:
+    return ToolMessage(content=f"Error: {error}", tool_call_id=tool_call["id"], status="error")
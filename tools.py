@@ -1,15 +1,15 @@
 import json
+from collections.abc import Iterable
 from langchain_core.messages.ai import AIMessage
 
+import prompt_caching
 
-def prettyfy_json(response: AIMessage) -> str:
-    # get raw json string from response
-    raw_json = _response_to_json(response)
 
-    # load json string into a Python object
-    data = json.loads(raw_json)
+def prettyfy_json(response: AIMessage) -> str:
+    # dump the response to JSON compatible Python objects (no JSON string round trip)
+    data = response.model_dump(mode="json")
 
-    # dump it back out, *pretty‑printed*
+    # serialize it once, *pretty‑printed*
     return json.dumps(
         data,
         indent=4,                 # 4‑space indentation (default is 2 in Python 3.10+)
@@ -18,17 +18,24 @@ def prettyfy_json(response: AIMessage) -> str:
         separators=(', ', ': ')   # pretty separators (comma+space, colon+space)
     )    
 
-def _response_to_json(response: AIMessage) -> str:
-    return response.model_dump_json()
-
 
 def print_token_usage(response: AIMessage) -> None:
     print(f"Prompt Tokens    : {response.usage_metadata['input_tokens']}")
     print(f"Completion Tokens: {response.usage_metadata['output_tokens']}")
     print(f"Total Tokens     : {response.usage_metadata['total_tokens']}")        
+    # prompt caching: part of the prompt tokens read from (or written to) the provider's cache
+    # (prompt_caching.cache_usage also knows Anthropic's per-TTL cache write counts)
+    usage = prompt_caching.cache_usage(response)
+    if usage["cache_read"] or usage["cache_creation"]:
+        print(f"  Cached (read)  : {usage['cache_read']}")
+        print(f"  Cached (write) : {usage['cache_creation']}")
     print()
 
 
-def write_data_to_file(data: str, filename: str) -> None:
+def write_data_to_file(data: str | Iterable[str], filename: str) -> None:
+    # data can also be an iterable of chunks (e.g. transcript_export.iter_json), written one by one
     with open(filename, 'w', encoding='utf-8') as file:
-        file.write(data)
\ No newline at end of file
+        if isinstance(data, str):
+            file.write(data)
+        else:
+            file.writelines(data)
\ No newline at end of file
@@ -0,0 +1,82 @@
+import json
+from collections.abc import Iterable
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+# streaming export of conversations to JSONL or pretty JSON (like 5_tools_with_system_prompt.json)
+#
+# Every message is dumped to a dict and serialized once, straight into the file, with its turn
+# number and a role annotation ("_comment"). Conversations can be any iterables (e.g. generators
+# reading a conversation store), only one message is held at a time, never the whole document.
+#
+# usage:
+#   transcript_export.write_json([chat_history], "5_tools_with_system_prompt.json")
+#   transcript_export.write_jsonl(conversations, "conversations.jsonl")  # one message per line
+
+Conversation = Iterable[BaseMessage]
+
+
+def role_annotation(message: BaseMessage) -> str:
+    """Short description of the message's role in the conversation."""
+    if message.type == "system":
+        return "System prompt"
+    if message.type == "human":
+        return "User question"
+    if message.type == "tool":
+        return "Tool response"
+    if isinstance(message, AIMessage) and message.tool_calls:
+        return "Model deciding to use tool"
+    return "Model response"
+
+
+def message_record(message: BaseMessage, turn: int) -> dict[str, Any]:
+    """Export dict of a message: turn number, role annotation and all message fields."""
+    return {"turn": turn, "_comment": role_annotation(message), **message.model_dump(mode="json")}
+
+
+def iter_jsonl(conversations: Iterable[Conversation]) -> Iterator[str]:
+    """One JSON line per message, with the index of its conversation."""
+    for conversation_index, conversation in enumerate(conversations):
+        for turn, message in enumerate(conversation):
+            record = {"conversation": conversation_index, **message_record(message, turn)}
+            yield _dumps(record) + "\n"
+
+
+def iter_json(conversations: Iterable[Conversation], indent: int = 2) -> Iterator[str]:
+    """Chunks of a pretty-printed JSON list of conversations (each a list of messages)."""
+    message_indent = " " * (indent * 2)
+    yield "["
+    for conversation_index, conversation in enumerate(conversations):
+        yield ("," if conversation_index else "") + "\n" + " " * indent + "["
+        turn = -1
+        for turn, message in enumerate(conversation):
+            text = _dumps(message_record(message, turn), indent=indent)
+            yield ("," if turn else "") + "\n" + message_indent + text.replace("\n", "\n" + message_indent)
+        yield ("\n" + " " * indent if turn >= 0 else "") + "]"
+    yield "\n]\n"
+
+
+def write_jsonl(conversations: Iterable[Conversation], file: str | Path | IO[str]) -> None:
+    with _open(file) as output:
+        output.writelines(iter_jsonl(conversations))
+
+
+def write_json(conversations: Iterable[Conversation], file: str | Path | IO[str], indent: int = 2) -> None:
+    with _open(file) as output:
+        output.writelines(iter_json(conversations, indent))
+
+
+def _dumps(record: dict[str, Any], indent: int | None = None) -> str:
+    return json.dumps(record, indent=indent, ensure_ascii=False)
+
+
+@contextmanager
+def _open(file: str | Path | IO[str]) -> Iterator[IO[str]]:
+    if isinstance(file, (str, Path)):
+        with open(file, "w", encoding="utf-8") as output:
+            yield output
+    else:
+        yield file
@@ -1,4 +1,3 @@
-from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
 from langchain_core.messages.ai import AIMessage
 from langchain_core.messages.human import HumanMessage
@@ -7,6 +6,10 @@ from langchain_core.tools import tool
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import ToolCall
 import streamlit as st
+import model_registry
+import streaming
+import tool_cache
+import tool_runner
 
 # chatbot with memory (using st.session_state for chat history) and tool support
 #
@@ -16,13 +19,14 @@ import streamlit as st
 #
 # TIP:
 # - using the flag USE_TOOLS (in the source code) you can enable/disable tool usage
-# - all kind of messages (HumanMessage, AIMessage, SystemMessage, ToolMessage) are supported. Filter them manuall in display_chat_history()
+# - all kind of messages (HumanMessage, AIMessage, SystemMessage, ToolMessage) are supported. Filter them manuall in _create_render_block()
 
 class Conversation:
     def __init__(self, llm: BaseChatModel, use_tools: bool = True):
         self._init_chat_history()
+        self.use_tools = use_tools
         if use_tools:
-            self.llm = llm.bind_tools([get_forecast]) # llm with tools
+            self.llm = model_registry.bind_tools(llm, [get_forecast]) # llm with tools (cached across reruns)
             self._set_system_prompt()
         else:
             self.llm = llm  # plain llm without tools
@@ -30,6 +34,8 @@ class Conversation:
     def _init_chat_history(self):
         if "messages" not in st.session_state:
             st.session_state.messages = []
+        if "turn_metrics" not in st.session_state:
+            st.session_state.turn_metrics = [] # time to first token etc. of every turn
 
     def ask(self, user_message: str):        
         # add user message
@@ -41,9 +47,8 @@ class Conversation:
 
         # check if the model wants to use a tool
         while response.tool_calls:
-            # execute each tool call
-            for tool_call in response.tool_calls:
-                self._make_tool_call_and_add_result_to_history(tool_call)
+            # execute all tool calls concurrently
+            self._make_tool_calls_and_add_results_to_history(response.tool_calls)
             
             # get final response from LLM with tool results
             response = self.llm.invoke(st.session_state.messages)
@@ -51,22 +56,18 @@ class Conversation:
 
         return response.content
 
+    def ask_stream(self, user_message: str):
+        # streaming variant of ask(): yields the tokens as they arrive (also after tool calls)
+        st.session_state.messages.append(HumanMessage(content=user_message))
 
-    def _make_tool_call_and_add_result_to_history(self, tool_call: ToolCall):
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
-        
-        # execute the tool
-        if tool_name == "get_forecast":
-            tool_result = get_forecast.invoke(tool_args)
-        
-            # add tool result to history
-            st.session_state.messages.append(
-                ToolMessage(
-                    content=str(tool_result),
-                    tool_call_id=tool_call["id"]
-                )
-            )
+        tools = [get_forecast] if self.use_tools else []
+        metrics = yield from streaming.stream_turn(self.llm, st.session_state.messages, tools)
+        st.session_state.turn_metrics.append(metrics)
+
+
+    def _make_tool_calls_and_add_results_to_history(self, tool_calls: list[ToolCall]):
+        # execute the tools and add the results to history (in tool call order)
+        st.session_state.messages.extend(tool_runner.run_tool_calls(tool_calls, [get_forecast]))
         
     def _set_system_prompt(self):
         SYSTEM_PROMPT = """You are a helpful travel assistant.
@@ -87,6 +88,17 @@ For all other questions (math, general knowledge, coding, etc.), answer directly
             st.session_state.messages.insert(0, SystemMessage(content=SYSTEM_PROMPT))
 
     
+# forecast data, built once (not on every tool call)
+FORECAST_TTL = 600  # seconds a cached forecast stays valid
+FORECASTS = {
+    "Paris": "Temperature: 18°C, Conditions: Partly cloudy, Wind: 10 km/h",
+    "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
+    "London": "Temperature: 15°C, Conditions: Foggy, Wind: 8 km/h",
+    "Berlin": "Temperature: 16°C, Conditions: Sunny, Wind: 12 km/h",
+    "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
+}
+
+
 # define the forecast tool
 @tool
 def get_forecast(city: str) -> str:
@@ -98,15 +110,10 @@ def get_forecast(city: str) -> str:
     Returns:
         Weather forecast information as a string
     """
-    forecasts = {
-        "Paris": "Temperature: 18°C, Conditions: Partly cloudy, Wind: 10 km/h",
-        "Stockholm": "Temperature: 12°C, Conditions: Rainy, Wind: 15 km/h",
-        "London": "Temperature: 15°C, Conditions: Foggy, Wind: 8 km/h",
-        "Berlin": "Temperature: 16°C, Conditions: Sunny, Wind: 12 km/h",
-        "Madrid": "Temperature: 24°C, Conditions: Clear skies, Wind: 5 km/h"
-    }
-    
-    return forecasts.get(city, f"Sorry, no forecast available for {city}")
+    return FORECASTS.get(city, f"Sorry, no forecast available for {city}")
+
+# serve repeated forecasts from the process-wide tool cache (shared by all conversations)
+get_forecast = tool_cache.cached(get_forecast, ttl=FORECAST_TTL)
 
 
 def initial_ui(use_tools: bool):
@@ -118,27 +125,85 @@ def initial_ui(use_tools: bool):
         st.write("Ask me anything!")
 
 
+# rendering of the chat history
+# - the render blocks of a message are prepared once and reused on every rerun
+# - only the last RECENT_TURNS turns are rendered on every rerun, older turns are paged
+#   behind a toggle, so the render time stays flat while a session grows to hundreds of turns
+RECENT_TURNS = 10
+PAGE_SIZE = 20
+
+
 def display_chat_history():
-    for message in st.session_state.messages:
+    history = _update_render_cache()
+    blocks = history["blocks"]
+    turn_starts = history["turn_starts"]
+
+    if history["system_prompt"]:
+        with st.expander("⚙️ System Prompt"):
+            st.markdown(history["system_prompt"])
+
+    older_turns = max(0, len(turn_starts) - RECENT_TURNS)
+    if older_turns and st.toggle(f"Show {older_turns} earlier turns"):
+        pages = (older_turns + PAGE_SIZE - 1) // PAGE_SIZE
+        page = st.number_input("Page", min_value=1, max_value=pages, value=pages) if pages > 1 else 1
+        first_turn = (page - 1) * PAGE_SIZE
+        last_turn = min(page * PAGE_SIZE, older_turns)
+        _render_blocks(blocks[turn_starts[first_turn]:turn_starts[last_turn]])
+
+    recent_start = turn_starts[older_turns] if turn_starts else len(blocks)
+    _render_blocks(blocks[recent_start:])
+
+
+def _update_render_cache() -> dict:
+    # prepare the render blocks of new messages only (messages don't change once they are in the history)
+    messages = st.session_state.messages
+    history = st.session_state.get("rendered_history")
+    if history is None or len(messages) < len(history["blocks"]):
+        history = {"blocks": [], "turn_starts": [], "system_prompt": None}
+        st.session_state.rendered_history = history
+
+    for index in range(len(history["blocks"]), len(messages)):
+        message = messages[index]
         if isinstance(message, SystemMessage):
-            with st.chat_message("assistant", avatar="⚙️"):
-                st.markdown(f"**System Prompt:**\n\n{message.content}")
-        elif isinstance(message, ToolMessage):
-            with st.chat_message("assistant", avatar="🔧"):
-                st.markdown(f"**Tool Result:**\n\n{message.content}")
+            history["system_prompt"] = message.content
         elif isinstance(message, HumanMessage):
-            with st.chat_message("user"):
-                st.markdown(message.content)
-        elif isinstance(message, AIMessage):
-            with st.chat_message("assistant"):
-                # show tool calls if present
-                if hasattr(message, 'tool_calls') and message.tool_calls:
-                    st.markdown("🔧 **Using tool:**")
-                    for tool_call in message.tool_calls:
-                        st.code(f"{tool_call['name']}({tool_call['args']})", language="python")
-                # show the actual response content if it exists
-                if message.content:
-                    st.markdown(message.content)
+            history["turn_starts"].append(index)
+        history["blocks"].append(_create_render_block(message))
+
+    return history
+
+
+def _create_render_block(message) -> tuple[str, str | None, list[tuple[str, str]]] | None:
+    # (role, avatar, [(kind, text), ...]) with kind "markdown" or "code"
+    if isinstance(message, ToolMessage):
+        return ("assistant", "🔧", [("markdown", f"**Tool Result:**\n\n{message.content}")])
+    if isinstance(message, HumanMessage):
+        return ("user", None, [("markdown", message.content)])
+    if isinstance(message, AIMessage):
+        parts = []
+        # show tool calls if present
+        if message.tool_calls:
+            parts.append(("markdown", "🔧 **Using tool:**"))
+            parts.extend(("code", f"{tool_call['name']}({tool_call['args']})") for tool_call in message.tool_calls)
+        # show the actual response content if it exists
+        if message.content:
+            parts.append(("markdown", message.content))
+        return ("assistant", None, parts)
+    # the system prompt is shown separately
+    return None
+
+
+def _render_blocks(blocks: list) -> None:
+    for block in blocks:
+        if block is None:
+            continue
+        role, avatar, parts = block
+        with st.chat_message(role, avatar=avatar):
+            for kind, text in parts:
+                if kind == "code":
+                    st.code(text, language="python")
+                else:
+                    st.markdown(text)
 
 
 def run_conversation(conversation: Conversation, use_tools: bool):
@@ -146,8 +211,13 @@ def run_conversation(conversation: Conversation, use_tools: bool):
     if not prompt:
         return
     
-    conversation.ask(prompt)
-    st.rerun() # trigger a rerun to display the updated history
+    # show the question and render the answer live while it is generated
+    # (no st.rerun() needed, the next rerun displays the new messages from the history)
+    with st.chat_message("user"):
+        st.markdown(prompt)
+    with st.chat_message("assistant"):
+        st.write_stream(conversation.ask_stream(prompt))
+        st.caption(str(st.session_state.turn_metrics[-1]))
 
 
 def _create_prompt_input(use_tools: bool):
@@ -161,7 +231,8 @@ if __name__ == "__main__":
     USE_TOOLS = True
     initial_ui(USE_TOOLS)
 
-    conv = Conversation(ChatOllama(model="llama3.1"), use_tools=USE_TOOLS)
+    # the registry keeps the client alive across streamlit reruns
+    conv = Conversation(model_registry.get_chat_model("ollama", "llama3.1"), use_tools=USE_TOOLS)
  
     display_chat_history()
     run_conversation(conv, use_tools=USE_TOOLS)
\ No newline at end of file
@@ -1,9 +1,10 @@
-from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage
 from langchain_core.messages.ai import AIMessage
 from langchain_core.messages.human import HumanMessage
 from langchain_core.language_models.chat_models import BaseChatModel
 import streamlit as st
+import model_registry
+import streaming
 
 # simple chatbot (using st.session_state for chat history)
 #
@@ -21,9 +22,17 @@ class Conversation:
         response = self.llm.invoke(st.session_state.messages)
         self._append_to_chat_history(response)
 
+    def ask_stream(self, user_message: str):
+        # streaming variant of ask(): yields the tokens as they arrive
+        self._append_to_chat_history(HumanMessage(content=user_message))
+        metrics = yield from streaming.stream_turn(self.llm, st.session_state.messages)
+        st.session_state.turn_metrics.append(metrics)
+
     def _init_chat_history(self) -> None:
         if "messages" not in st.session_state:
             st.session_state.messages = []
+        if "turn_metrics" not in st.session_state:
+            st.session_state.turn_metrics = [] # time to first token etc. of every turn
 
     def _append_to_chat_history(self, message) -> None:
         st.session_state.messages.append(message)
@@ -42,11 +51,15 @@ def display_chat_history() -> None:
 def start_conversation(conversation: Conversation) -> None:
     prompt = st.chat_input("Ask me about ...")
     if prompt:
-        conversation.ask(prompt)
-        st.rerun() # to refresh the chat display
+        # render the answer live while it is generated
+        with st.chat_message("user"):
+            st.write(prompt)
+        with st.chat_message("assistant"):
+            st.write_stream(conversation.ask_stream(prompt))
 
 
 if __name__ == "__main__":
-    conversation = Conversation(ChatOllama(model="llama3.1"))
+    # the registry keeps the client alive across streamlit reruns
+    conversation = Conversation(model_registry.get_chat_model("ollama", "llama3.1"))
     display_chat_history()
     start_conversation(conversation)
\ No newline at end of file